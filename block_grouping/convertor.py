@@ -60,7 +60,9 @@ def union(parent, a, b):
 def parse_pddl_file(filepath):
     with open(filepath, 'r') as f:
         content = f.read()
+    return parse_pddl(content)
 
+def parse_pddl(content):
     # Extract objects section
     objects_section = extract_section(content, "(:objects", ")")
     # Find object names that look like b1, b2, etc.
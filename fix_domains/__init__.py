@@ -0,0 +1,2 @@
+"""Cross-domain tooling for the PDDL to JSON converters."""
+from fix_domains.api import convert, converter, domains
@@ -0,0 +1,58 @@
+"""
+In-process conversion API.
+
+    from fix_domains import convert
+    problem = convert("tpp", pddl_text)      # str or bytes -> dict
+
+convert() never touches the filesystem and never prints: it uses a private copy
+of each converter in which print is a no-op, so diagnostics are dropped without
+swapping sys.stdout (which would not be thread-safe). The converters keep no
+mutable module state and their compiled patterns are immutable, so convert()
+can be called from any number of threads; the per-domain copies are created
+once, under a lock.
+
+Large tpp and pathways inputs given as bytes are converted by the fluent-based
+builders directly off the buffer (see fix_domains.pddl_mmap), with the same result.
+"""
+import threading
+
+from fix_domains import registry
+from fix_domains import pddl_mmap
+from fix_domains import fluent_converters
+
+_quiet_modules = {}
+_lock = threading.Lock()
+
+def _discard(*args, **kwargs):
+    pass
+
+def _quiet_converter(domain):
+    module = _quiet_modules.get(domain)
+    if module is None:
+        with _lock:
+            module = _quiet_modules.get(domain)
+            if module is None:
+                module = registry.import_converter(domain)
+                # Module globals shadow builtins, so this silences the converter only.
+                module.print = _discard
+                _quiet_modules[domain] = module
+    return module
+
+def domains():
+    """Names of the domains convert() accepts."""
+    return sorted(registry.DOMAINS)
+
+def converter(domain):
+    """Returns the quiet text -> dict function of a domain."""
+    if domain not in registry.DOMAINS:
+        raise ValueError(f"Unknown domain '{domain}'. Known domains: {', '.join(domains())}")
+    return getattr(_quiet_converter(domain), registry.DOMAINS[domain]["parse"])
+
+def convert(domain, pddl):
+    """Converts one PDDL problem, given as str or UTF-8 bytes, into the domain's JSON structure."""
+    parse = converter(domain)
+    if isinstance(pddl, (bytes, bytearray, memoryview)):
+        if domain in fluent_converters.BUILDERS and len(pddl) >= pddl_mmap.MMAP_THRESHOLD:
+            return pddl_mmap.convert_buffer(domain, pddl)
+        pddl = bytes(pddl).decode()
+    return parse(pddl)
@@ -0,0 +1,132 @@
+"""
+Reading PDDL problems straight out of archives.
+
+Supported inputs: .tar.gz / .tgz, .tar.xz, .tar (read as a stream, member by
+member, so the archive is never extracted or seeked), .zip, and single
+.pddl.gz files. Every source is turned into (name, data) pairs with data as
+bytes, in archive order.
+
+Members are problem files ending in .pddl or .pddl.gz; domain files
+(domain*.pddl, which benchmark sets usually ship next to the problems) and
+everything else are skipped, in directories as in archives.
+
+Members are named by their file name alone, as the converters name their
+outputs after it. Two problems with the same name (e.g. a/pfile1.pddl and
+b/pfile1.pddl in one archive), or whose names give the same output file of the
+domain, would overwrite each other's output. Tools that write outputs call
+check_outputs() before converting anything; tools that only read (e.g. the
+fingerprint index) use iter_located(), which also says where each problem
+came from.
+"""
+import os
+import gzip
+import tarfile
+import zipfile
+
+from fix_domains import registry
+
+TAR_SUFFIXES = (".tar.gz", ".tgz", ".tar.xz", ".txz", ".tar.bz2", ".tar")
+ZIP_SUFFIXES = (".zip",)
+GZIP_SUFFIXES = (".pddl.gz",)
+
+def is_archive(path):
+    return path.lower().endswith(TAR_SUFFIXES + ZIP_SUFFIXES + GZIP_SUFFIXES)
+
+def is_problem_member(name):
+    """True for problem files inside an archive (plain or gzipped .pddl, not domain files)."""
+    base = os.path.basename(name).lower()
+    if not (base.endswith(".pddl") or base.endswith(".pddl.gz")):
+        return False
+    return not base.startswith("domain")
+
+def member_name(name):
+    """File name of a member as the converters would see it: no directories, no .gz."""
+    base = os.path.basename(name)
+    return base[:-3] if base.lower().endswith(".gz") else base
+
+def _decompress(name, data):
+    return gzip.decompress(data) if name.lower().endswith(".gz") else data
+
+def _tar_members(path, read):
+    # "r|*" reads the archive as a forward-only stream with any compression.
+    with tarfile.open(path, mode="r|*") as tar:
+        for member in tar:
+            if member.isfile() and is_problem_member(member.name):
+                data = _decompress(member.name, tar.extractfile(member).read()) if read else None
+                yield member.name, data
+
+def _zip_members(path, read):
+    with zipfile.ZipFile(path) as archive:
+        for info in archive.infolist():
+            if not info.is_dir() and is_problem_member(info.filename):
+                data = _decompress(info.filename, archive.read(info)) if read else None
+                yield info.filename, data
+
+def _iter_path(path, read=True):
+    """
+    Yields (location, name, data) for every problem in an archive, a .pddl.gz
+    or a plain .pddl file. location is the file path, or archive:member for
+    archive members; data is None unless read.
+    """
+    lower = path.lower()
+    if lower.endswith(TAR_SUFFIXES + ZIP_SUFFIXES):
+        members = _tar_members if lower.endswith(TAR_SUFFIXES) else _zip_members
+        for member, data in members(path, read):
+            yield f"{path}:{member}", member_name(member), data
+    elif lower.endswith(GZIP_SUFFIXES):
+        data = None
+        if read:
+            with gzip.open(path, 'rb') as f:
+                data = f.read()
+        yield path, member_name(path), data
+    else:
+        data = None
+        if read:
+            with open(path, 'rb') as f:
+                data = f.read()
+        yield path, os.path.basename(path), data
+
+def iter_members(path):
+    """Yields (name, data) for every problem in an archive, a .pddl.gz or a plain .pddl file."""
+    for _, name, data in _iter_path(path):
+        yield name, data
+
+def _iter_inputs(inputs, read=True):
+    for path in inputs:
+        if os.path.isdir(path):
+            files = [os.path.join(path, f) for f in os.listdir(path) if is_problem_member(f)]
+            for file_path in sorted(files, key=registry.natural_key):
+                yield from _iter_path(file_path, read)
+        else:
+            yield from _iter_path(path, read)
+
+def iter_located(inputs):
+    """
+    Yields (location, name, data) for a mix of inputs: archives, .pddl(.gz)
+    files and directories (whose problem files are read in natural order).
+    location is unique per problem even where names repeat.
+    """
+    return _iter_inputs(inputs)
+
+def iter_sources(inputs):
+    """Yields (name, data) for a mix of inputs, as iter_located() does."""
+    for _, name, data in _iter_inputs(inputs):
+        yield name, data
+
+def check_outputs(inputs, domain):
+    """
+    Raises ValueError if two problems in inputs would be written to the same
+    output file of the domain. Only names are read (archives are listed, not
+    extracted), so this is meant to run before anything is converted.
+    """
+    seen = {}
+    collisions = []
+    for location, name, _ in _iter_inputs(inputs, read=False):
+        key = registry.output_filename(domain, name)
+        if key in seen:
+            collisions.append(f"{location} and {seen[key]} both give {key}")
+        else:
+            seen[key] = location
+    if collisions:
+        raise ValueError("Problems would overwrite each other's output: " + "; ".join(collisions)
+                         + "; convert them into separate output directories")
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Batch conversion of many problems of one domain across worker processes.
+
+Inputs can be directories, .pddl files or archives (see fix_domains.archives):
+members are read from the archive in the main process, streamed to the workers
+as bytes and converted there, so nothing is extracted to disk. At most a few
+members per worker are in flight at a time, which keeps memory bounded for
+archives with tens of thousands of problems. Each problem is written to
+<output_dir>/<name the domain's converter would use>, optionally compact and/or
+compressed (see fix_domains.output). With --manifest, size statistics of every
+problem are taken from the same parse and written as a manifest next to the
+outputs (see fix_domains.instance_stats). With --catalog, every converted
+problem is also added to a SQLite catalog (see fix_domains.catalog). The
+fingerprints of fix_domains.fingerprint need a second parse of every file, so
+they are only added to the manifest and catalog with --fingerprint. With
+--timeout and/or --memory_mb, every file is converted under that budget in a
+worker that is killed when it runs over (see fix_domains.watchdog); the failed
+files are listed with the stage they were in, in <output_dir>/failures.json.
+With --validate, every result is checked against the domain's schema (see
+fix_domains.schema) before it is written; invalid problems are reported as
+failed and not written.
+
+Usage:
+    python -m fix_domains.batch tpp benchmarks/tpp.tar.xz --output_dir tpp_json --workers 8
+    python -m fix_domains.batch drone drone/problems_pddl extra.zip --compact --compress gzip
+    python -m fix_domains.batch tpp tpp_problem/problems_pddl --output_dir tpp_json --manifest json csv
+    python -m fix_domains.batch drone big_instances/ --output_dir out --timeout 30 --memory_mb 2048
+    python -m fix_domains.batch red_car red_car_problem/problems_pddl --output_dir red_car_json --validate
+"""
+import os
+import io
+import json
+import argparse
+import contextlib
+import concurrent.futures
+
+from fix_domains import registry
+from fix_domains import archives
+from fix_domains import output
+from fix_domains import instance_stats
+from fix_domains import catalog
+from fix_domains import watchdog
+from fix_domains import schema
+
+# Members queued per worker before the reader waits for results.
+IN_FLIGHT_PER_WORKER = 4
+
+def convert_member(domain, name, data, output_dir, compact=False, compression="none", stats=False, validate=False,
+                   fingerprint=False, keep_result=False):
+    """
+    Converts one problem given as bytes and writes its JSON. Returns
+    (name, output path, error, stats, result); stats is None unless requested,
+    and includes the PDDL's fingerprint only with fingerprint. result is the
+    converted problem with keep_result (e.g. for the catalog), else None. With
+    validate, a result that fails the domain's schema is an error and is not
+    written.
+    """
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = registry.get_parser(domain)(data.decode())
+        if validate:
+            schema.check(domain, result)
+        output_path = output.output_path(os.path.join(output_dir, registry.output_filename(domain, name)), compression)
+        output.write_problem(result, output_path, registry.DOMAINS[domain]["indent"], compact, compression)
+        result_stats = instance_stats.source_stats(domain, result, data, fingerprint) if stats else None
+        return name, output_path, None, result_stats, result if keep_result else None
+    except Exception as e:
+        return name, None, f"{type(e).__name__}: {e}", None, None
+
+def convert_sources(domain, inputs, output_dir, workers=None, compact=False, compression="none", stats=False,
+                    validate=False, fingerprint=False, keep_result=False):
+    """
+    Converts every problem found in inputs and returns an iterator of (name,
+    output path, error, stats, result) as conversions finish (see convert_member). workers=1 converts in
+    this process. Bad arguments and inputs whose outputs would collide raise
+    ValueError here, before anything is converted.
+    """
+    if domain not in registry.DOMAINS:
+        raise ValueError(f"Unknown domain '{domain}'. Known domains: {', '.join(sorted(registry.DOMAINS))}")
+    output.check_compression(compression)
+    archives.check_outputs(inputs, domain)
+    os.makedirs(output_dir, exist_ok=True)
+    options = (compact, compression, stats, validate, fingerprint, keep_result)
+    return _convert_sources(domain, archives.iter_sources(inputs), output_dir, workers, options)
+
+def _convert_sources(domain, sources, output_dir, workers, options):
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        for name, data in sources:
+            yield convert_member(domain, name, data, output_dir, *options)
+        return
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = set()
+        for name, data in sources:
+            if len(pending) >= workers * IN_FLIGHT_PER_WORKER:
+                done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+            pending.add(pool.submit(convert_member, domain, name, data, output_dir, *options))
+        for future in concurrent.futures.as_completed(pending):
+            yield future.result()
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert many PDDL problems of one domain, from directories or archives")
+    parser.add_argument("domain", choices=sorted(registry.DOMAINS), help="Domain of the problems")
+    parser.add_argument("inputs", nargs="+",
+                        help="Directories, .pddl files or archives (.tar.gz, .tar.xz, .zip, .pddl.gz)")
+    parser.add_argument("--output_dir", default="problems_json", help="Directory for the JSON files")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: one per CPU)")
+    parser.add_argument("--compact", action="store_true", help="Write minified JSON instead of indented")
+    parser.add_argument("--compress", choices=output.COMPRESSIONS, default="none",
+                        help="Compress each output file (zstd needs the zstandard package)")
+    parser.add_argument("--manifest", nargs="*", choices=instance_stats.MANIFEST_FORMATS,
+                        help="Also write a size-statistics manifest (json and/or csv; default both)")
+    parser.add_argument("--catalog", help="Also add every converted problem to this SQLite catalog")
+    parser.add_argument("--catalog_payload", action="store_true", help="Store the problems themselves in the catalog")
+    parser.add_argument("--timeout", type=float, help="Seconds a single file may take before its worker is killed")
+    parser.add_argument("--memory_mb", type=int, help="Address-space limit of each worker, in MB")
+    parser.add_argument("--validate", action="store_true",
+                        help="Check every result against the domain's schema; invalid ones are not written")
+    parser.add_argument("--fingerprint", action="store_true",
+                        help="Also fingerprint every problem for the manifest and catalog (a second parse per file)")
+    args = parser.parse_args()
+
+    with_stats = args.manifest is not None or args.catalog is not None
+    # The catalog takes the converted problems as they are, instead of reading the outputs back.
+    keep_results = args.catalog is not None
+    converted = 0
+    failed = 0
+    entries = []
+    failures = []
+    try:
+        if args.timeout or args.memory_mb:
+            results = watchdog.convert_sources(args.domain, args.inputs, args.output_dir, args.workers, args.timeout,
+                                               args.memory_mb, args.compact, args.compress, with_stats, failures,
+                                               args.validate, args.fingerprint, keep_results)
+        else:
+            results = convert_sources(args.domain, args.inputs, args.output_dir, args.workers, args.compact,
+                                      args.compress, with_stats, args.validate, args.fingerprint, keep_results)
+    except ValueError as e:
+        parser.error(str(e))
+    conn = catalog.connect(args.catalog) if args.catalog else None
+    for name, output_path, error, stats, result in results:
+        if error:
+            failed += 1
+            print(f"Failed {name}: {error}")
+        else:
+            converted += 1
+            entries.append((name, os.path.basename(output_path), stats))
+            if conn is not None:
+                if result is None:
+                    # The watchdog lost the result with statistics that ran out of time; the output is written.
+                    result = output.load_problem(output_path)
+                catalog.add_problem(conn, args.domain, name, result, stats, args.catalog_payload)
+    if conn is not None:
+        conn.commit()
+        conn.close()
+    if failures:
+        with open(os.path.join(args.output_dir, "failures.json"), 'w') as f:
+            json.dump(failures, f, indent=2)
+    if args.manifest is not None:
+        rows = instance_stats.manifest_rows(args.domain, entries)
+        instance_stats.write_manifest(rows, args.output_dir, args.manifest or instance_stats.MANIFEST_FORMATS)
+    print(f"Converted {converted} problems to {args.output_dir}" + (f", {failed} failed" if failed else ""))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Benchmarks the domain converters.
+
+Every converter is run over its problems_pddl instances (and, optionally, over
+extra instances such as the generated ones) and the following is reported:
+  - per file: wall time (best and mean over --repeat runs), MB/s and peak memory
+    (tracemalloc, measured in a separate run so it does not skew the timings)
+  - per domain: total time, files/s, MB/s and the largest peak memory
+
+Results are printed as a table and written as JSON to --output.
+
+Example:
+    python -m fix_domains.benchmark --domains tpp pathways --repeat 5
+    python -m fix_domains.benchmark --scale 10 100   # also synthetic 10x and 100x instances
+"""
+import os
+import io
+import sys
+import json
+import time
+import argparse
+import tempfile
+import tracemalloc
+import contextlib
+import statistics
+
+from fix_domains import registry
+from fix_domains import generators
+
+MB = 1024 * 1024
+
+def convert_once(parse, path, indent):
+    """Reads, parses and serializes one file. Returns the size of the JSON output."""
+    with open(path, 'r') as f:
+        text = f.read()
+    # Some converters print diagnostics (e.g. unmatched object lines); keep them out of the report.
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = parse(text)
+    return len(json.dumps(result, indent=indent))
+
+def benchmark_file(domain, path, repeat=3, measure_memory=True):
+    """Benchmarks the conversion of a single file and returns its result record."""
+    parse = registry.get_parser(domain)
+    indent = registry.DOMAINS[domain]["indent"]
+    size = os.path.getsize(path)
+    if os.path.abspath(path).startswith(registry.REPO_ROOT + os.sep):
+        path_label = os.path.relpath(path, registry.REPO_ROOT)
+    else:
+        path_label = path
+    record = {
+        "domain": domain,
+        "file": path_label,
+        "bytes": size,
+        "output_bytes": None,
+        "best_s": None,
+        "mean_s": None,
+        "mb_per_s": None,
+        "peak_memory_bytes": None,
+        "error": None
+    }
+    times = []
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            record["output_bytes"] = convert_once(parse, path, indent)
+            times.append(time.perf_counter() - start)
+        if measure_memory:
+            tracemalloc.start()
+            try:
+                convert_once(parse, path, indent)
+                record["peak_memory_bytes"] = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+    except Exception as e:
+        record["error"] = f"{type(e).__name__}: {e}"
+        return record
+
+    record["best_s"] = min(times)
+    record["mean_s"] = statistics.mean(times)
+    if record["best_s"] > 0:
+        record["mb_per_s"] = size / MB / record["best_s"]
+    return record
+
+def summarize_domain(domain, records):
+    """Aggregates the file records of one domain."""
+    done = [r for r in records if r["error"] is None]
+    total_time = sum(r["best_s"] for r in done)
+    total_bytes = sum(r["bytes"] for r in done)
+    peaks = [r["peak_memory_bytes"] for r in done if r["peak_memory_bytes"] is not None]
+    return {
+        "domain": domain,
+        "files": len(records),
+        "errors": len(records) - len(done),
+        "bytes": total_bytes,
+        "total_s": total_time,
+        "files_per_s": len(done) / total_time if total_time > 0 else None,
+        "mb_per_s": total_bytes / MB / total_time if total_time > 0 else None,
+        "max_peak_memory_bytes": max(peaks) if peaks else None,
+        "slowest_file": max(done, key=lambda r: r["best_s"])["file"] if done else None
+    }
+
+def flag_slow_domains(summaries, factor=5.0):
+    """
+    Marks domains whose throughput is more than `factor` times below the median
+    MB/s of all domains, so pathological converters stand out in the table.
+    """
+    rates = [s["mb_per_s"] for s in summaries if s["mb_per_s"]]
+    median = statistics.median(rates) if rates else 0
+    for s in summaries:
+        s["slow"] = bool(s["mb_per_s"] and median and s["mb_per_s"] * factor < median)
+    return summaries
+
+def collect_inputs(domains, extra_dirs):
+    """
+    Returns (domain, path) pairs: the problems_pddl files of every domain plus
+    the .pddl files found in <extra_dir>/<domain>/ for each extra directory.
+    """
+    inputs = []
+    for domain in domains:
+        for path in registry.problem_files(domain):
+            inputs.append((domain, path))
+        for extra in extra_dirs:
+            extra_domain_dir = os.path.join(extra, domain)
+            if os.path.isdir(extra_domain_dir):
+                for path in registry.problem_files(domain, extra_domain_dir):
+                    inputs.append((domain, path))
+    return inputs
+
+def run_benchmark(domains=None, extra_dirs=(), repeat=3, measure_memory=True, verbose=False):
+    """Benchmarks the given domains (all by default) and returns the results dict."""
+    domains = list(domains) if domains else sorted(registry.DOMAINS)
+    records = []
+    for domain, path in collect_inputs(domains, extra_dirs):
+        record = benchmark_file(domain, path, repeat=repeat, measure_memory=measure_memory)
+        records.append(record)
+        if verbose:
+            print_file_record(record)
+    summaries = [summarize_domain(d, [r for r in records if r["domain"] == d]) for d in domains]
+    flag_slow_domains(summaries)
+    return {
+        "python": sys.version.split()[0],
+        "repeat": repeat,
+        "files": records,
+        "domains": summaries
+    }
+
+def format_bytes(n):
+    if n is None:
+        return "-"
+    if n >= MB:
+        return f"{n / MB:.1f}M"
+    return f"{n / 1024:.1f}K"
+
+def format_rate(x):
+    return "-" if x is None else f"{x:.2f}"
+
+def print_file_record(r):
+    if r["error"]:
+        print(f"{r['file']:<60} ERROR {r['error']}")
+        return
+    print(f"{r['file']:<60} {format_bytes(r['bytes']):>8} {r['best_s'] * 1000:>10.2f}ms "
+          f"{format_rate(r['mb_per_s']):>8} MB/s {format_bytes(r['peak_memory_bytes']):>8} peak")
+
+def print_summary(results):
+    header = f"{'domain':<22}{'files':>6}{'size':>9}{'time':>11}{'files/s':>10}{'MB/s':>9}{'peak':>9}  slowest file"
+    print(header)
+    print("-" * len(header))
+    for s in sorted(results["domains"], key=lambda s: s["mb_per_s"] or 0):
+        marker = "  << SLOW" if s.get("slow") else ""
+        errors = f" ({s['errors']} errors)" if s["errors"] else ""
+        print(f"{s['domain']:<22}{s['files']:>6}{format_bytes(s['bytes']):>9}{s['total_s'] * 1000:>9.1f}ms"
+              f"{format_rate(s['files_per_s']):>10}{format_rate(s['mb_per_s']):>9}"
+              f"{format_bytes(s['max_peak_memory_bytes']):>9}  {s['slowest_file']}{errors}{marker}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the PDDL to JSON converters")
+    parser.add_argument("--domains", nargs="*", help="Domains to benchmark (default: all)")
+    parser.add_argument("--extra_dir", action="append", default=[],
+                        help="Directory with <domain>/*.pddl instances to benchmark as well (repeatable)")
+    parser.add_argument("--scale", nargs="*", type=float, default=[],
+                        help="Also benchmark synthetic instances this many times larger than the largest shipped one")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per file (best is reported)")
+    parser.add_argument("--no_memory", action="store_true", help="Skip the tracemalloc peak-memory run")
+    parser.add_argument("--output", default="benchmark_results.json", help="Where to write the JSON results")
+    parser.add_argument("--verbose", action="store_true", help="Print every file as it is benchmarked")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as generated_dir:
+        extra_dirs = list(args.extra_dir)
+        if args.scale:
+            for domain in args.domains or sorted(registry.DOMAINS):
+                for scale in args.scale:
+                    generators.generate_scaled(domain, scale, generated_dir)
+            extra_dirs.append(generated_dir)
+        results = run_benchmark(args.domains, extra_dirs, args.repeat, not args.no_memory, args.verbose)
+    print_summary(results)
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Single-file bundle of converted problems with random access by name.
+
+Layout (all integers little-endian):
+
+    header   magic b"PDDLBNDL", version (u32), index offset (u64), index length (u64)
+    payloads one encoded problem after the other (compact JSON, optionally
+             gzip/xz/zstd compressed per problem; see fix_domains.output)
+    index    JSON object {"<domain>/<instance>": [offset, length], ...}
+
+The reader memory-maps the bundle and only parses the index up front; loading
+a problem decodes just its own bytes, so opening one problem out of tens of
+thousands costs the same as opening it from a bundle of one.
+
+Instance names are the converters' output names without .json (pfile1,
+problem3, Problem12, ...).
+
+Usage:
+    python -m fix_domains.bundle pack all.bundle                      # every domain, shipped problems
+    python -m fix_domains.bundle pack tpp.bundle --domains tpp --input_dir generated/tpp --compress gzip
+    python -m fix_domains.bundle list all.bundle
+    python -m fix_domains.bundle get all.bundle tpp/pfile3
+"""
+import io
+import os
+import mmap
+import json
+import struct
+import argparse
+import contextlib
+
+from fix_domains import registry
+from fix_domains import output
+
+MAGIC = b"PDDLBNDL"
+VERSION = 1
+HEADER = struct.Struct("<8sIQQ")
+
+def instance_key(domain, pddl_path):
+    """Bundle key of a problem: <domain>/<output name without .json>."""
+    return f"{domain}/{os.path.splitext(registry.output_filename(domain, pddl_path))[0]}"
+
+class BundleWriter:
+    """Appends encoded problems to a bundle file; the index is written on close."""
+
+    def __init__(self, path):
+        self._f = open(path, 'wb')
+        self._f.write(HEADER.pack(MAGIC, VERSION, 0, 0))
+        self.index = {}
+
+    def add_bytes(self, key, data):
+        if key in self.index:
+            raise ValueError(f"Duplicate bundle key '{key}'")
+        self.index[key] = [self._f.tell(), len(data)]
+        self._f.write(data)
+
+    def add(self, key, result, compression="none"):
+        self.add_bytes(key, output.dumps_problem(result, compression=compression))
+
+    def close(self):
+        if self._f.closed:
+            return
+        index = json.dumps(self.index, separators=(',', ':')).encode()
+        index_offset = self._f.tell()
+        self._f.write(index)
+        self._f.seek(0)
+        self._f.write(HEADER.pack(MAGIC, VERSION, index_offset, len(index)))
+        self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class Bundle:
+    """Read-only, memory-mapped view of a bundle."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, index_offset, index_length = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            self._map.close()
+            raise ValueError(f"{path} is not a problem bundle")
+        if version != VERSION:
+            self._map.close()
+            raise ValueError(f"{path} has bundle version {version}, this reader supports {VERSION}")
+        self.index = json.loads(self._map[index_offset:index_offset + index_length])
+
+    def keys(self):
+        return list(self.index)
+
+    def __contains__(self, key):
+        return key in self.index
+
+    def __len__(self):
+        return len(self.index)
+
+    def raw(self, key):
+        """Encoded bytes of one problem (a zero-copy view into the map)."""
+        if key not in self.index:
+            raise KeyError(f"'{key}' is not in bundle {self.path}")
+        offset, length = self.index[key]
+        return memoryview(self._map)[offset:offset + length]
+
+    def load(self, key):
+        """Decodes one problem without touching the others."""
+        view = self.raw(key)
+        try:
+            return output.loads_problem(bytes(view))
+        finally:
+            view.release()
+
+    def close(self):
+        self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def pack(path, domains, input_dir=None, compression="none"):
+    """
+    Converts the problems of the given domains and packs them into a bundle.
+    input_dir, if given, holds the problems of a single domain instead of its problems_pddl.
+    Returns the number of problems packed.
+    """
+    output.check_compression(compression)
+    with BundleWriter(path) as writer:
+        for domain in domains:
+            parse = registry.get_parser(domain)
+            for pddl_path in registry.problem_files(domain, input_dir):
+                with open(pddl_path, 'r') as f:
+                    text = f.read()
+                with contextlib.redirect_stdout(io.StringIO()):
+                    result = parse(text)
+                writer.add(instance_key(domain, pddl_path), result, compression)
+        return len(writer.index)
+
+def main():
+    parser = argparse.ArgumentParser(description="Pack converted problems into one indexed file and read them back")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    pack_parser = sub.add_parser("pack", help="Convert problems and pack them into a bundle")
+    pack_parser.add_argument("bundle", help="Bundle file to write")
+    pack_parser.add_argument("--domains", nargs="*", help="Domains to pack (default: all)")
+    pack_parser.add_argument("--input_dir", help="Read the problems of the (single) domain from this directory")
+    pack_parser.add_argument("--compress", choices=output.COMPRESSIONS, default="none",
+                             help="Compress each problem inside the bundle")
+
+    list_parser = sub.add_parser("list", help="List the problems of a bundle")
+    list_parser.add_argument("bundle")
+
+    get_parser = sub.add_parser("get", help="Print one problem of a bundle as JSON")
+    get_parser.add_argument("bundle")
+    get_parser.add_argument("key", help="<domain>/<instance>, e.g. tpp/pfile3")
+
+    args = parser.parse_args()
+    if args.command == "pack":
+        domains = args.domains or sorted(registry.DOMAINS)
+        if args.input_dir and len(domains) != 1:
+            parser.error("--input_dir needs exactly one domain in --domains")
+        count = pack(args.bundle, domains, args.input_dir, args.compress)
+        print(f"Packed {count} problems into {args.bundle}")
+    elif args.command == "list":
+        with Bundle(args.bundle) as bundle:
+            for key, (offset, length) in bundle.index.items():
+                print(f"{key}\t{offset}\t{length}")
+    else:
+        with Bundle(args.bundle) as bundle:
+            print(json.dumps(bundle.load(args.key), indent=4))
+
+if __name__ == '__main__':
+    main()
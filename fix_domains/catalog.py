@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+SQLite catalog of converted problems.
+
+Each problem is stored once per (domain, instance), the instance being the
+stem of its output file (the same whether it was added from PDDL or from the
+output, see instance_name()), with its content hash, the size statistics of
+fix_domains.instance_stats and, optionally, its payload (compact JSON, gzip
+compressed; read back with load()). Object counts per type live in their own
+indexed table, so subset selections are single queries instead of re-parsing
+JSON files:
+
+    python -m fix_domains.catalog add tpp tpp_problem/problems_pddl --db catalog.sqlite --payload
+    python -m fix_domains.catalog add-json zenotravel_fuel zenotravel_fuel_problem/problems_json --db catalog.sqlite
+    python -m fix_domains.catalog query --db catalog.sqlite --domain tpp --where "objects.goods>50"
+    python -m fix_domains.catalog query --db catalog.sqlite --domain zenotravel_fuel --where "objects.airplane>=10" --json
+    python -m fix_domains.catalog get tpp pfile20 --db catalog.sqlite
+
+Conditions are <field><op><number> with op one of = != < <= > >= and field
+either a metric (total_objects, fluents, goal_size, graph_edges,
+est_ground_actions) or objects.<type>. batch.py --catalog fills the catalog
+while converting.
+
+The content hash is the sha256 of the problem's canonical JSON (keys as strings
+and sorted, no whitespace), so the same problem shares it whether it was
+converted from any of its files or read back from an output.
+Problems added from PDDL with add (or batch.py --catalog --fingerprint) also
+carry their fingerprint (fix_domains.fingerprint), which is shared by problems
+identical up to object renaming; query --fingerprint looks them up, e.g. to
+reuse a planner result.
+"""
+import os
+import re
+import json
+import sqlite3
+import hashlib
+import argparse
+
+from fix_domains import api
+from fix_domains import registry
+from fix_domains import archives
+from fix_domains import output
+from fix_domains import instance_stats
+
+DEFAULT_DB = "catalog.sqlite"
+
+METRICS = ("total_objects", "fluents", "goal_size", "graph_edges", "est_ground_actions")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS problems (
+    id INTEGER PRIMARY KEY,
+    domain TEXT NOT NULL,
+    instance TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    fingerprint TEXT,
+    total_objects INTEGER NOT NULL,
+    fluents INTEGER NOT NULL,
+    goal_size INTEGER NOT NULL,
+    graph_edges INTEGER NOT NULL,
+    est_ground_actions INTEGER NOT NULL,
+    stats TEXT NOT NULL,
+    payload BLOB,
+    UNIQUE (domain, instance)
+);
+CREATE TABLE IF NOT EXISTS object_counts (
+    problem_id INTEGER NOT NULL REFERENCES problems(id) ON DELETE CASCADE,
+    type TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (problem_id, type)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS problems_instance ON problems (instance);
+CREATE INDEX IF NOT EXISTS problems_hash ON problems (content_hash);
+CREATE INDEX IF NOT EXISTS problems_fingerprint ON problems (fingerprint);
+CREATE INDEX IF NOT EXISTS problems_total_objects ON problems (domain, total_objects);
+CREATE INDEX IF NOT EXISTS problems_fluents ON problems (domain, fluents);
+CREATE INDEX IF NOT EXISTS problems_goal_size ON problems (domain, goal_size);
+CREATE INDEX IF NOT EXISTS problems_graph_edges ON problems (domain, graph_edges);
+CREATE INDEX IF NOT EXISTS problems_actions ON problems (domain, est_ground_actions);
+CREATE INDEX IF NOT EXISTS object_counts_type ON object_counts (type, count);
+"""
+
+_OPS = {
+    "=": lambda a, b: a == b,
+    "!=": lambda a, b: a != b,
+    "<": lambda a, b: a < b,
+    "<=": lambda a, b: a <= b,
+    ">": lambda a, b: a > b,
+    ">=": lambda a, b: a >= b
+}
+
+_CONDITION = re.compile(r'^\s*([\w.]+)\s*(<=|>=|!=|=|<|>)\s*(-?\d+(?:\.\d+)?)\s*$')
+
+def connect(path=DEFAULT_DB):
+    """Opens (and if needed creates) a catalog."""
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA foreign_keys=ON")
+    conn.executescript(SCHEMA)
+    return conn
+
+def instance_name(domain, path):
+    """
+    Catalog key of a PDDL file, an output file or a bare instance name: the stem
+    of the output file the domain's converter writes for it, so a problem added
+    from PDDL and from its output share one key (drone: pfile3.pddl,
+    problem3.json.gz and pfile3 -> problem3).
+    """
+    name = os.path.basename(path)
+    for suffix in (".gz", ".xz", ".zst", ".json", ".pddl"):
+        if name.endswith(suffix):
+            name = name[:-len(suffix)]
+    return registry.output_filename(domain, name + ".pddl")[:-len(".json")]
+
+def content_hash(problem):
+    """
+    sha256 of the problem's canonical JSON. The problem goes through a JSON
+    round trip first, so a converted problem (whose dicts may have int keys,
+    e.g. hydro's demands) and the same problem read back from its output
+    (string keys) sort their keys alike and share the hash.
+    """
+    canonical = json.dumps(json.loads(json.dumps(problem)), sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+def add_problem(conn, domain, instance, problem, stats=None, payload=False):
+    """
+    Inserts or replaces one converted problem. stats defaults to
+    instance_stats.instance_stats(domain, problem). Does not commit.
+    """
+    if stats is None:
+        stats = instance_stats.instance_stats(domain, problem)
+    instance = instance_name(domain, instance)
+    data = output.dumps_problem(problem, compression="gzip") if payload else None
+    conn.execute("DELETE FROM problems WHERE domain = ? AND instance = ?", (domain, instance))
+    cursor = conn.execute(
+        "INSERT INTO problems (domain, instance, content_hash, fingerprint, " + ", ".join(METRICS) + ", stats, payload) "
+        "VALUES (?, ?, ?, ?, " + ", ".join("?" * len(METRICS)) + ", ?, ?)",
+        [domain, instance, content_hash(problem), stats.get("fingerprint")] + [stats[m] for m in METRICS]
+        + [json.dumps(stats), data])
+    conn.executemany("INSERT INTO object_counts (problem_id, type, count) VALUES (?, ?, ?)",
+                     [(cursor.lastrowid, kind, count) for kind, count in stats["objects"].items()])
+    return cursor.lastrowid
+
+def parse_condition(text):
+    """'objects.goods>50' -> ('objects.goods', '>', 50)."""
+    m = _CONDITION.match(text)
+    if not m:
+        raise ValueError(f"Bad condition '{text}'; expected <field><op><number>, e.g. objects.goods>50")
+    field, op, value = m.groups()
+    if field not in METRICS and not field.startswith("objects."):
+        raise ValueError(f"Unknown field '{field}'. Known: {', '.join(METRICS)}, objects.<type>")
+    return field, op, float(value) if '.' in value else int(value)
+
+def select(conn, domain=None, where=(), fingerprint=None):
+    """
+    Rows (dicts without payload) matching every condition, hardest first.
+    where holds condition strings or (field, op, value) tuples.
+    """
+    clauses = []
+    params = []
+    if domain is not None:
+        clauses.append("p.domain = ?")
+        params.append(domain)
+    if fingerprint is not None:
+        clauses.append("p.fingerprint = ?")
+        params.append(fingerprint)
+    for condition in where:
+        field, op, value = parse_condition(condition) if isinstance(condition, str) else condition
+        if field.startswith("objects."):
+            kind = field[len("objects."):]
+            if _OPS[op](0, value):
+                # Matches zero, so problems without objects of the type qualify too.
+                clauses.append(f"COALESCE((SELECT count FROM object_counts o WHERE o.problem_id = p.id AND o.type = ?), 0) {op} ?")
+            else:
+                clauses.append(f"p.id IN (SELECT problem_id FROM object_counts WHERE type = ? AND count {op} ?)")
+            params.extend([kind, value])
+        else:
+            clauses.append(f"p.{field} {op} ?")
+            params.append(value)
+    sql = "SELECT p.domain, p.instance, p.content_hash, p.stats FROM problems p"
+    if clauses:
+        sql += " WHERE " + " AND ".join(clauses)
+    sql += " ORDER BY p.est_ground_actions DESC, p.domain, p.instance"
+    rows = []
+    for row_domain, instance, digest, stats in conn.execute(sql, params):
+        rows.append(dict({"domain": row_domain, "instance": instance, "content_hash": digest}, **json.loads(stats)))
+    return rows
+
+def load(conn, domain, instance):
+    """The stored problem, or None if the instance is unknown or was added without payload."""
+    row = conn.execute("SELECT payload FROM problems WHERE domain = ? AND instance = ?",
+                       (domain, instance_name(domain, instance))).fetchone()
+    if row is None or row[0] is None:
+        return None
+    return output.loads_problem(row[0])
+
+def add_sources(conn, domain, inputs, payload=False):
+    """
+    Converts PDDL problems (directories, files, archives) and adds them. Returns
+    the count. Problems that would share a catalog key raise ValueError before
+    anything is added.
+    """
+    archives.check_outputs(inputs, domain)
+    count = 0
+    with conn:
+        for name, data in archives.iter_sources(inputs):
+            problem = api.convert(domain, data)
+            stats = instance_stats.source_stats(domain, problem, data, fingerprint=True)
+            add_problem(conn, domain, name, problem, stats, payload)
+            count += 1
+    return count
+
+def add_outputs(conn, domain, inputs, payload=False):
+    """Adds already converted problems (files or directories of them, any output format). Returns the count."""
+    paths = output.problem_files(inputs)
+    with conn:
+        for path in paths:
+            add_problem(conn, domain, path, output.load_problem(path), payload=payload)
+    return len(paths)
+
+def main():
+    parser = argparse.ArgumentParser(description="SQLite catalog of converted problems")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    add_parser = sub.add_parser("add", help="Convert PDDL problems and add them")
+    add_parser.add_argument("domain", choices=sorted(registry.DOMAINS), help="Domain of the problems")
+    add_parser.add_argument("inputs", nargs="+", help="Directories, .pddl files or archives")
+
+    json_parser = sub.add_parser("add-json", help="Add already converted problems")
+    json_parser.add_argument("domain", choices=sorted(registry.DOMAINS), help="Domain of the problems")
+    json_parser.add_argument("inputs", nargs="+", help="Converted files or directories of them")
+
+    for p in (add_parser, json_parser):
+        p.add_argument("--payload", action="store_true", help="Also store the problems themselves")
+
+    query_parser = sub.add_parser("query", help="Select instances by domain and size")
+    query_parser.add_argument("--domain", choices=sorted(registry.DOMAINS), help="Only this domain")
+    query_parser.add_argument("--where", nargs="*", default=[], help="Conditions, e.g. objects.goods>50 fluents<=100")
+    query_parser.add_argument("--fingerprint", help="Only problems with this fingerprint")
+    query_parser.add_argument("--json", action="store_true", help="Print full rows as JSON instead of names")
+
+    get_parser = sub.add_parser("get", help="Print a stored problem")
+    get_parser.add_argument("domain", choices=sorted(registry.DOMAINS), help="Domain of the problem")
+    get_parser.add_argument("instance", help="Instance name (PDDL or output file name, with or without extension)")
+
+    for p in (add_parser, json_parser, query_parser, get_parser):
+        p.add_argument("--db", default=DEFAULT_DB, help="Catalog database file")
+    args = parser.parse_args()
+
+    conn = connect(args.db)
+    if args.command == "add":
+        try:
+            count = add_sources(conn, args.domain, args.inputs, args.payload)
+        except ValueError as e:
+            parser.error(str(e))
+        print(f"Added {count} problems to {args.db}")
+    elif args.command == "add-json":
+        print(f"Added {add_outputs(conn, args.domain, args.inputs, args.payload)} problems to {args.db}")
+    elif args.command == "query":
+        rows = select(conn, args.domain, args.where, args.fingerprint)
+        if args.json:
+            print(json.dumps(rows, indent=2))
+        else:
+            for row in rows:
+                print(f"{row['domain']}\t{row['instance']}")
+    else:
+        problem = load(conn, args.domain, args.instance)
+        if problem is None:
+            parser.exit(1, f"No payload for {args.domain}/{args.instance} in {args.db}\n")
+        print(json.dumps(problem, indent=registry.DOMAINS[args.domain]["indent"]))
+    conn.close()
+
+if __name__ == '__main__':
+    main()
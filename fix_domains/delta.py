@@ -0,0 +1,361 @@
+#!/usr/bin/env python3
+"""
+Delta encoding of a family of converted problems against a shared base.
+
+Instances of a family repeat large static parts (the pathways reaction network,
+the zenotravel and tpp distance tables). encode() writes those once per
+directory as a base file and every instance as a small delta:
+
+  base.json         {"format": "fix_domains-delta-base", "tree": node}, where
+                    node is one of
+                      {"v": value}            value shared by several instances
+                      {"o": {key: node}}      object whose keys recur
+                      {"p": [item, ...]}      pool of list items that occur in
+                                              several instances
+  <stem>.delta.json {"delta_of": "base.json", "patch": patch} with patch
+                      absent                  same as the base
+                      {"=": value}            replaced wholesale
+                      {"d": {key: patch}, "x": [removed keys], "k": [key order]}
+                                              object; "k" only if the order differs
+                      {"l": [index or {"i": index, "p": patch} or {"=": item}, ...]}
+                                              list of pool references, patched pool
+                                              records and new items
+
+Everything is decided per path, so any domain's layout works: maps keyed by
+object or pair ("(0,3)", "1,2") become "o" nodes, record lists (reactions,
+simples, markets) become pools. Pool records are matched by their string fields
+(molecule or market names), so a reaction that recurs with other amounts costs
+only its changed numbers. Any part that would take more space as a patch than
+spelled out is stored as is. Scalars are compared by their JSON encoding, so
+1, 1.0 and true stay distinct, and key order is restored: a reconstructed
+problem is equal to the original and dumps to the same bytes.
+
+Delta encoding only pays off when instances share enough: a file whose delta
+would be larger than the problem itself is written as plain compact JSON
+(<stem>.json), and if the base plus the deltas would not be smaller than all
+problems written plainly (e.g. the small zenotravel families), no base is
+written and the directory holds plain files only. The encode CLI reports which
+case applied.
+
+output.load_problem() recognizes delta files and reconstructs them, so
+consumers read a delta directory like any other output directory.
+
+Usage:
+    python -m fix_domains.delta encode path_ways_metric_problem/problems_json --output_dir pathways_delta
+    python -m fix_domains.delta decode pathways_delta --output_dir pathways_json --indent 4
+"""
+import os
+import json
+import argparse
+
+from fix_domains import output
+
+BASE_FORMAT = "fix_domains-delta-base"
+DELTA_SUFFIX = ".delta.json"
+
+# Patch of a value that equals its base.
+_SAME = object()
+
+def _key(value):
+    return json.dumps(value)
+
+def _most_common(values):
+    counts = {}
+    first = {}
+    for value in values:
+        k = _key(value)
+        counts[k] = counts.get(k, 0) + 1
+        first.setdefault(k, value)
+    if not counts:
+        return None, 0
+    k = max(counts, key=counts.get)
+    return first[k], counts[k]
+
+def _is_record_list(value):
+    return isinstance(value, list) and any(isinstance(item, (dict, list)) for item in value)
+
+def _identity(item):
+    # Records are matched by their names (string fields): the same reaction or market
+    # usually recurs with different numbers, and is then patched rather than repeated.
+    if isinstance(item, dict):
+        names = [(k, v) for k, v in item.items() if isinstance(v, str)]
+        if names:
+            return _key(names)
+    return _key(item)
+
+def _record_node(record):
+    """Base node that reproduces a record exactly."""
+    if isinstance(record, dict):
+        return {"o": {key: _record_node(value) for key, value in record.items()}}
+    return {"v": record}
+
+def build_base(values):
+    """
+    Base node for the values one path takes across the instances that have it
+    (None if nothing is shared).
+    """
+    if len(values) < 2:
+        return None
+    if all(isinstance(v, dict) for v in values):
+        counts = {}
+        # Keys in the order of the largest instance, which smaller ones usually follow.
+        for v in sorted(values, key=len, reverse=True):
+            for key in v:
+                counts[key] = counts.get(key, 0) + 1
+        children = {}
+        for key, count in counts.items():
+            if count >= 2:
+                child = build_base([v[key] for v in values if key in v])
+                if child is not None:
+                    children[key] = child
+        return {"o": children} if children else None
+    if all(isinstance(v, list) for v in values) and any(_is_record_list(v) for v in values):
+        versions = {}
+        instances = {}
+        for v in values:
+            for k in {_identity(item) for item in v}:
+                instances[k] = instances.get(k, 0) + 1
+            for item in v:
+                versions.setdefault(_identity(item), []).append(item)
+        # One entry per recurring record, in its most common version.
+        pool = [_most_common(items)[0] for k, items in versions.items() if instances[k] >= 2]
+        return {"p": pool} if pool else None
+    value, count = _most_common(values)
+    return {"v": value} if count >= 2 else None
+
+def _smaller(patch, value):
+    # When most of a value differs from the base, spelling it out is shorter than patching it.
+    replacement = {"=": value}
+    return patch if len(_key(patch)) <= len(_key(replacement)) else replacement
+
+def encode_value(value, node, pool_index=None, used=None):
+    """
+    Patch of value against a base node (_SAME if equal). If used is a dict, it
+    counts the base nodes and pool entries the patch relies on.
+    """
+    patch = _encode(value, node, pool_index, used)
+    if used is not None and node is not None and "=" not in (patch if patch is not _SAME else {}):
+        used[id(node)] = used.get(id(node), 0) + 1
+    return patch
+
+def _encode(value, node, pool_index, used):
+    if node is None:
+        return {"=": value}
+    if "v" in node:
+        return _SAME if _key(value) == _key(node["v"]) else {"=": value}
+    if "o" in node:
+        if not isinstance(value, dict):
+            return {"=": value}
+        base = node["o"]
+        patch = {}
+        children = {}
+        for key, item in value.items():
+            child = encode_value(item, base.get(key), pool_index, used)
+            if child is not _SAME:
+                children[key] = child
+        if children:
+            patch["d"] = children
+        removed = [key for key in base if key not in value]
+        if removed:
+            patch["x"] = removed
+        rebuilt_order = [key for key in base if key in value] + [key for key in value if key not in base]
+        if rebuilt_order != list(value):
+            patch["k"] = list(value)
+        if not patch:
+            return _SAME
+        return _smaller(patch, value)
+    if not isinstance(value, list):
+        return {"=": value}
+    index = pool_index.get(id(node)) if pool_index is not None else None
+    if index is None:
+        index = {_identity(item): i for i, item in enumerate(node["p"])}
+        if pool_index is not None:
+            pool_index[id(node)] = index
+    items = []
+    for item in value:
+        i = index.get(_identity(item))
+        if i is None:
+            items.append({"=": item})
+            continue
+        patch = encode_value(item, _record_node(node["p"][i]))
+        items.append(i if patch is _SAME else {"i": i, "p": patch})
+        if used is not None:
+            used[(id(node), i)] = used.get((id(node), i), 0) + 1
+    if items == list(range(len(node["p"]))):
+        return _SAME
+    return _smaller({"l": items}, value)
+
+def prune(node, used):
+    """Drops base nodes and pool entries that fewer than two patches rely on."""
+    if node is None or used.get(id(node), 0) < 2:
+        return None
+    if "o" in node:
+        children = {}
+        for key, child in node["o"].items():
+            child = prune(child, used)
+            if child is not None:
+                children[key] = child
+        return {"o": children} if children else None
+    if "p" in node:
+        pool = [item for i, item in enumerate(node["p"]) if used.get((id(node), i), 0) >= 2]
+        return {"p": pool} if pool else None
+    return node
+
+def apply_patch(node, patch):
+    """Rebuilds a value from its base node and patch (None for an absent patch)."""
+    if patch is not None and "=" in patch:
+        return patch["="]
+    if node is None:
+        raise ValueError("Delta has no value for a path missing from the base")
+    if "v" in node:
+        return node["v"]
+    if "o" in node:
+        base = node["o"]
+        patch = patch or {}
+        children = patch.get("d", {})
+        removed = set(patch.get("x", ()))
+        result = {}
+        for key, child in base.items():
+            if key not in removed:
+                result[key] = apply_patch(child, children.get(key))
+        for key, child in children.items():
+            if key not in base:
+                result[key] = apply_patch(None, child)
+        if "k" in patch:
+            result = {key: result[key] for key in patch["k"]}
+        return result
+    pool = node["p"]
+    if patch is None:
+        return list(pool)
+    result = []
+    for item in patch["l"]:
+        if isinstance(item, int):
+            result.append(pool[item])
+        elif "i" in item:
+            result.append(apply_patch(_record_node(pool[item["i"]]), item["p"]))
+        else:
+            result.append(item["="])
+    return result
+
+def _write_bytes(path, data):
+    with open(path, 'wb') as f:
+        f.write(data)
+
+def encode(input_dir, output_dir, compression="none"):
+    """
+    Delta-encodes every converted problem in input_dir into output_dir.
+
+    Each file is written as a delta only if that is smaller than the problem
+    itself as compact JSON (in the same compression), and otherwise as
+    <stem>.json. If the base plus the deltas would not be smaller than all
+    problems written plainly, as happens for families with little in common,
+    no base is written and every problem is written plainly.
+    Returns (base path or None, [(input path, output path, is delta)]).
+    """
+    output.check_compression(compression)
+    paths = output.problem_files([input_dir])
+    problems = [output.load_problem(path) for path in paths]
+    tree = build_base(problems)
+    # A shared value pays off only if several instances actually refer to it.
+    used = {}
+    pool_index = {}
+    for problem in problems:
+        encode_value(problem, tree, pool_index, used)
+    tree = prune(tree, used)
+    base_name = output.output_path("base.json", compression)
+    base_data = output.dumps_problem({"format": BASE_FORMAT, "tree": tree}, compression=compression)
+    pool_index = {}
+    plain = []
+    encoded = []
+    for problem in problems:
+        plain.append(output.dumps_problem(problem, compression=compression))
+        patch = encode_value(problem, tree, pool_index)
+        delta = output.dumps_problem({"delta_of": base_name, "patch": None if patch is _SAME else patch},
+                                     compression=compression)
+        encoded.append((delta, True) if len(delta) < len(plain[-1]) else (plain[-1], False))
+    with_delta = len(base_data) + sum(len(data) for data, _ in encoded)
+    if with_delta >= sum(len(data) for data in plain):
+        encoded = [(data, False) for data in plain]
+        base_data = None
+    os.makedirs(output_dir, exist_ok=True)
+    base_path = None
+    if base_data is not None:
+        base_path = os.path.join(output_dir, base_name)
+        _write_bytes(base_path, base_data)
+    written = []
+    for path, (data, is_delta) in zip(paths, encoded):
+        stem = os.path.basename(path).split(".json", 1)[0]
+        out_path = output.output_path(os.path.join(output_dir, stem + (DELTA_SUFFIX if is_delta else ".json")),
+                                      compression)
+        _write_bytes(out_path, data)
+        written.append((path, out_path, is_delta))
+    return base_path, written
+
+_bases = {}
+
+def load_base(path):
+    """The tree of a base file, cached by path and modification time."""
+    path = os.path.abspath(path)
+    stamp = os.path.getmtime(path)
+    cached = _bases.get(path)
+    if cached is None or cached[0] != stamp:
+        data = output.load_problem(path)
+        if not isinstance(data, dict) or data.get("format") != BASE_FORMAT:
+            raise ValueError(f"{path} is not a delta base file")
+        cached = (stamp, data["tree"])
+        _bases[path] = cached
+    return cached[1]
+
+def is_delta(data):
+    return isinstance(data, dict) and "delta_of" in data and "patch" in data
+
+def reconstruct(delta, delta_path):
+    """Full problem from a loaded delta file; the base is looked up next to delta_path."""
+    base_path = os.path.join(os.path.dirname(os.path.abspath(delta_path)), delta["delta_of"])
+    return apply_patch(load_base(base_path), delta["patch"])
+
+def load(path):
+    """Loads a delta file (or any other output file) as the full problem."""
+    return output.load_problem(path)
+
+def main():
+    parser = argparse.ArgumentParser(description="Delta-encode a directory of converted problems against a shared base")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    encode_parser = sub.add_parser("encode", help="Write base.json and one delta per problem")
+    encode_parser.add_argument("input_dir", help="Directory of converted problems (any output format)")
+    encode_parser.add_argument("--output_dir", required=True, help="Directory for the base and the deltas")
+    encode_parser.add_argument("--compress", choices=output.COMPRESSIONS, default="none",
+                               help="Compress the base and the deltas")
+
+    decode_parser = sub.add_parser("decode", help="Rebuild the full problems of a delta directory")
+    decode_parser.add_argument("input_dir", help="Directory written by encode")
+    decode_parser.add_argument("--output_dir", required=True, help="Directory for the full JSON files")
+    decode_parser.add_argument("--indent", type=int, default=4, help="json.dump indent of the rebuilt files")
+    args = parser.parse_args()
+
+    if args.command == "encode":
+        base_path, written = encode(args.input_dir, args.output_dir, args.compress)
+        before = sum(os.path.getsize(path) for path, _, _ in written)
+        after = sum(os.path.getsize(path) for _, path, _ in written)
+        deltas = sum(is_delta for _, _, is_delta in written)
+        if base_path is None:
+            print(f"Delta encoding saves no space for these {len(written)} problems; wrote them as compact JSON: "
+                  f"{before / 1024:.1f} KB -> {after / 1024:.1f} KB")
+        else:
+            after += os.path.getsize(base_path)
+            print(f"Encoded {len(written)} problems ({deltas} as deltas, {len(written) - deltas} plain): "
+                  f"{before / 1024:.1f} KB -> {after / 1024:.1f} KB (base {os.path.getsize(base_path) / 1024:.1f} KB)")
+    else:
+        os.makedirs(args.output_dir, exist_ok=True)
+        count = 0
+        for path in output.problem_files([args.input_dir]):
+            problem = load(path)
+            stem = os.path.basename(path).split(DELTA_SUFFIX if DELTA_SUFFIX in path else ".json", 1)[0]
+            with open(os.path.join(args.output_dir, stem + ".json"), 'w') as f:
+                json.dump(problem, f, indent=args.indent)
+            count += 1
+        print(f"Rebuilt {count} problems in {args.output_dir}")
+
+if __name__ == '__main__':
+    main()
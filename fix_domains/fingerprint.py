@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Canonical problem fingerprints and duplicate detection.
+
+A fingerprint identifies a problem up to renaming of its objects and reordering
+of its :objects, :init facts and goal conjuncts, so planner results can be
+cached by it and identical instances are solved once. It is computed from the
+PDDL itself, so it is the same for every domain:
+
+  - the problem becomes a labelled graph: one node per object (labelled with
+    its type), one node per :init fact (predicate or function name, value and
+    any non-object arguments) with an edge to each object argument labelled by
+    its position, and one node per goal/metric sub-expression (operator and
+    literals) with edges to its operands; operands of and, or, +, * and = are
+    unordered
+  - colours are refined Weisfeiler-Lehman style until the partition is stable:
+    each node's new colour hashes its colour with the sorted colours and edge
+    labels of its neighbours; colours are content hashes, so they never depend
+    on names or file order
+  - the fingerprint is the sha256 of the sorted final colours and the (:domain)
+    name
+
+Isomorphic problems always get the same fingerprint. Colour refinement cannot
+separate every pair of non-isomorphic graphs, so the dedup command confirms
+each group with an exact isomorphism search (individualize a node, refine,
+backtrack) unless --no_verify is given.
+
+Usage:
+    python -m fix_domains.fingerprint show zenotravel_fuel_problem/problems_pddl
+    python -m fix_domains.fingerprint dedup tpp_problem/problems_pddl extra.tar.gz --json groups.json
+"""
+import re
+import json
+import hashlib
+import argparse
+
+from fix_domains import archives
+from fix_domains import pddl_mmap
+
+# Operators whose operands can be reordered without changing the problem.
+COMMUTATIVE = {"and", "or", "+", "*", "="}
+
+_DOMAIN_RE = re.compile(r'\(\s*:domain\s+([^\s()]+)', re.IGNORECASE)
+_TOKEN_RE = re.compile(r'[()]|[^\s()]+')
+
+def _digest(value):
+    return hashlib.blake2b(repr(value).encode(), digest_size=12).hexdigest()
+
+def _parse_sexpr(text):
+    """Nested lists of lower-cased tokens for every top-level expression in text."""
+    stack = [[]]
+    for token in _TOKEN_RE.findall(text):
+        if token == "(":
+            stack.append([])
+        elif token == ")":
+            if len(stack) > 1:
+                done = stack.pop()
+                stack[-1].append(done)
+        else:
+            stack[-1].append(token.lower())
+    while len(stack) > 1:
+        done = stack.pop()
+        stack[-1].append(done)
+    return stack[0]
+
+class ProblemGraph:
+    """Labelled graph of one problem: initial colours and (label, neighbour) adjacency lists."""
+
+    def __init__(self, domain_name):
+        self.domain_name = domain_name
+        self.colors = []
+        self.edges = []
+        self.objects = {}
+
+    def add_node(self, color):
+        self.colors.append(color)
+        self.edges.append([])
+        return len(self.colors) - 1
+
+    def add_edge(self, parent, child, label):
+        self.edges[parent].append((label, child))
+        self.edges[child].append(("^" + label, parent))
+
+    def add_fact(self, kind, name, args, value=None):
+        # Arguments that are not objects (constants of the domain, numbers) go into the node label.
+        literals = tuple((i, arg) for i, arg in enumerate(args) if arg not in self.objects)
+        node = self.add_node(_digest((kind, name, value, literals)))
+        for i, arg in enumerate(args):
+            if arg in self.objects:
+                self.add_edge(node, self.objects[arg], str(i))
+        return node
+
+    def add_expression(self, expr):
+        """Adds a goal or metric expression (nested lists) and returns its node."""
+        if not isinstance(expr, list):
+            if expr in self.objects:
+                return self.objects[expr]
+            return self.add_node(_digest(("literal", expr)))
+        head = expr[0] if expr and not isinstance(expr[0], list) else ""
+        operands = expr[1:] if head else expr
+        node = self.add_node(_digest(("expr", head)))
+        unordered = head in COMMUTATIVE
+        for i, operand in enumerate(operands):
+            self.add_edge(node, self.add_expression(operand), "*" if unordered else str(i))
+        return node
+
+def build_graph(pddl):
+    """Builds the ProblemGraph of a PDDL problem given as str or bytes."""
+    buf = pddl.encode() if isinstance(pddl, str) else bytes(pddl)
+    text_head = buf[:4096].decode(errors="replace")
+    m = _DOMAIN_RE.search(text_head)
+    graph = ProblemGraph(m.group(1).lower() if m else "")
+    objects_span = pddl_mmap.section_span(buf, "objects")
+    if objects_span:
+        for name, type_name in pddl_mmap.iter_objects(buf, objects_span):
+            name = name.lower()
+            if name not in graph.objects:
+                graph.objects[name] = graph.add_node(_digest(("object", type_name.lower())))
+    init_span = pddl_mmap.section_span(buf, "init")
+    if init_span:
+        for record in pddl_mmap.iter_fluents(buf, init_span):
+            args = tuple(arg.lower() for arg in record[2])
+            value = float(record[3]) if record[0] == "assignment" else None
+            graph.add_fact(record[0], record[1].lower(), args, value)
+    for section in ("goal", "metric"):
+        text = pddl_mmap.section_text(buf, section)
+        for expr in _parse_sexpr(text):
+            if isinstance(expr, list):
+                # Drop the section keyword: (:goal (and ...)) -> (and ...)
+                graph.add_expression([section] + [e for e in expr if e != ":" + section])
+    return graph
+
+def refine(colors, edges):
+    """
+    Colour refinement until the number of colour classes stops growing.
+    Returns the stable colours (content hashes, comparable across graphs).
+    """
+    classes = len(set(colors))
+    while True:
+        new_colors = [
+            _digest((colors[node], sorted((label, colors[nbr]) for label, nbr in edges[node])))
+            for node in range(len(colors))
+        ]
+        new_classes = len(set(new_colors))
+        colors = new_colors
+        if new_classes == classes:
+            return colors
+        classes = new_classes
+
+def _certificate(graph, colors):
+    return hashlib.sha256(json.dumps([graph.domain_name, sorted(colors)]).encode()).hexdigest()
+
+def fingerprint(pddl):
+    """Canonical fingerprint (hex sha256) of a PDDL problem given as str or bytes."""
+    graph = build_graph(pddl)
+    return _certificate(graph, refine(graph.colors, graph.edges))
+
+def _histogram(colors):
+    counts = {}
+    for color in colors:
+        counts[color] = counts.get(color, 0) + 1
+    return counts
+
+def _search(g1, c1, g2, c2):
+    """Backtracking isomorphism search on refined colourings; returns a node mapping or None."""
+    if _histogram(c1) != _histogram(c2):
+        return None
+    cells = {}
+    for node, color in enumerate(c1):
+        cells.setdefault(color, []).append(node)
+    ambiguous = [cell for cell in cells.values() if len(cell) > 1]
+    if not ambiguous:
+        index = {color: node for node, color in enumerate(c2)}
+        mapping = [index[color] for color in c1]
+        for node, adjacency in enumerate(g1.edges):
+            image = sorted((label, mapping[nbr]) for label, nbr in adjacency)
+            if image != sorted(g2.edges[mapping[node]]):
+                return None
+        return mapping
+    # Individualize one node of the smallest ambiguous cell and try every candidate for it.
+    cell = min(ambiguous, key=lambda c: (len(c), c1[c[0]]))
+    target = c1[cell[0]]
+    marked1 = list(c1)
+    marked1[cell[0]] = _digest(("individualized", target))
+    refined1 = refine(marked1, g1.edges)
+    for candidate in (node for node, color in enumerate(c2) if color == target):
+        marked2 = list(c2)
+        marked2[candidate] = _digest(("individualized", target))
+        mapping = _search(g1, refined1, g2, refine(marked2, g2.edges))
+        if mapping is not None:
+            return mapping
+    return None
+
+def isomorphic(pddl_a, pddl_b):
+    """True if the two problems are identical up to object renaming and reordering."""
+    g1, g2 = build_graph(pddl_a), build_graph(pddl_b)
+    if g1.domain_name != g2.domain_name or len(g1.colors) != len(g2.colors):
+        return False
+    return _search(g1, refine(g1.colors, g1.edges), g2, refine(g2.colors, g2.edges)) is not None
+
+def find_duplicates(inputs, verify=True):
+    """
+    Groups the problems in inputs (directories, files, archives) by fingerprint.
+    Returns the groups with more than one member as lists of locations (file
+    paths, or archive:member), so equally named problems from different sets
+    stay apart. With verify, each group is split into classes confirmed
+    isomorphic by exact search.
+    """
+    by_fingerprint = {}
+    sources = {}
+    for location, _, data in archives.iter_located(inputs):
+        by_fingerprint.setdefault(fingerprint(data), []).append(location)
+        if verify:
+            sources[location] = data
+    groups = []
+    for locations in by_fingerprint.values():
+        if len(locations) < 2:
+            continue
+        if not verify:
+            groups.append(locations)
+            continue
+        classes = []
+        for location in locations:
+            for members in classes:
+                if isomorphic(sources[members[0]], sources[location]):
+                    members.append(location)
+                    break
+            else:
+                classes.append([location])
+        groups.extend(members for members in classes if len(members) > 1)
+    return groups
+
+def main():
+    parser = argparse.ArgumentParser(description="Renaming- and order-invariant fingerprints of PDDL problems")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    show_parser = sub.add_parser("show", help="Print the fingerprint of every problem")
+    show_parser.add_argument("inputs", nargs="+", help="Directories, .pddl files or archives")
+
+    dedup_parser = sub.add_parser("dedup", help="Group problems that are identical up to renaming")
+    dedup_parser.add_argument("inputs", nargs="+", help="Directories, .pddl files or archives")
+    dedup_parser.add_argument("--no_verify", action="store_true",
+                              help="Trust fingerprints without the exact isomorphism check")
+    dedup_parser.add_argument("--json", help="Also write the groups as JSON")
+    args = parser.parse_args()
+
+    if args.command == "show":
+        for location, _, data in archives.iter_located(args.inputs):
+            print(f"{fingerprint(data)}  {location}")
+        return
+    groups = find_duplicates(args.inputs, not args.no_verify)
+    for members in groups:
+        print(" = ".join(members))
+    print(f"{len(groups)} groups of duplicates, {sum(len(g) - 1 for g in groups)} redundant problems")
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(groups, f, indent=2)
+
+if __name__ == '__main__':
+    main()
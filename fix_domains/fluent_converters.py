@@ -0,0 +1,229 @@
+"""
+Fluent-based builders for the domains with the largest instances.
+
+A builder fills the same JSON structure as the domain's regular converter, but
+from already tokenized input instead of regexes over the whole text:
+
+    builder(objects, fluents, goal_text) -> dict
+
+  objects   - list of (name, type) pairs from :objects
+  fluents   - iterable of :init records, ("atom", name, args) or
+              ("assignment", name, args, value), consumed once, in file order
+  goal_text - function returning the (small) :goal section as text; only
+              called after the fluents have been consumed, since a streaming
+              reader reaches the goal last
+
+Builders are fed by the memory-mapped scanner (fix_domains.pddl_mmap) or the
+incremental reader (fix_domains.pddl_stream) and produce the same result as
+the regular converter on well-formed input.
+
+Builders in LAZY also take lazy=True, which returns their largest arrays as
+generators that build each element only when it is consumed. Such a result
+is meant for fix_domains.json_stream, which writes the elements as they are
+produced; it can be consumed only once.
+"""
+import re
+
+from fix_domains import registry
+
+def build_tpp(objects, fluents, goal_text):
+    """Fluent-based equivalent of tpp_problem/convertor.py::parse_pddl."""
+    location_cache = {}
+
+    def convert_location(name):
+        # Location names repeat for every price and drive-cost entry; convert each once.
+        if name not in location_cache:
+            location_cache[name] = registry.load_converter("tpp").convert_location(name)
+        return location_cache[name]
+
+    goods_id_re = re.compile(r'\d+')
+
+    truck_locations = {}
+    prices = []
+    on_sales = []
+    distances = {}
+    items_bought = {}
+    goal_requests = {}
+    total_cost = None
+
+    for record in fluents:
+        name = record[1].lower()
+        args = record[2]
+        if record[0] == "atom":
+            if name == "loc" and len(args) == 2:
+                truck_locations[args[0]] = convert_location(args[1])
+            continue
+        value = record[3]
+        if name == "price" and len(args) == 2 and not value.startswith("-"):
+            prices.append((args[0], args[1], float(value)))
+        elif name == "on-sale" and len(args) == 2 and value.isdigit():
+            on_sales.append((args[0], args[1], int(value)))
+        elif name == "drive-cost" and len(args) == 2 and not value.startswith("-"):
+            key = f"({convert_location(args[0])},{convert_location(args[1])})"
+            distances[key] = float(value)
+        elif name == "bought" and len(args) == 1 and value.isdigit():
+            m = goods_id_re.search(args[0])
+            if m:
+                items_bought[m.group(0)] = int(value)
+        elif name == "request" and len(args) == 1 and value.isdigit():
+            m = goods_id_re.search(args[0])
+            if m:
+                goal_requests[m.group(0)] = int(value)
+        elif name == "total-cost" and not args and value.isdigit():
+            if total_cost is None:
+                total_cost = int(value)
+
+    # Prices are applied before on-sale values, as in the regex converter, so the
+    # item dicts get the same key order.
+    market_items = {}
+    for good, market, price in prices:
+        m = goods_id_re.search(good)
+        market_items.setdefault(market, {})
+        if m:
+            market_items[market].setdefault(m.group(0), {})["price"] = price
+    for good, market, on_sale in on_sales:
+        m = goods_id_re.search(good)
+        market_items.setdefault(market, {})
+        if m:
+            entry = market_items[market].setdefault(m.group(0), {})
+            entry["on_sale"] = on_sale
+            if on_sale == 0 and "price" not in entry:
+                entry["price"] = 0
+
+    trucks = [{"name": name, "location": truck_locations.get(name, -1)} for name, typ in objects if typ == "truck"]
+    markets = [
+        {"location": str(convert_location(name)), "items": market_items.get(name, {})}
+        for name, typ in objects if typ == "market"
+    ]
+    return {
+        "state": {
+            "trucks": trucks,
+            "markets": markets,
+            "items_bought": items_bought,
+            "total_cost": total_cost or 0
+        },
+        "problem": {
+            "distances": distances,
+            "goal": {
+                "goal_requests": goal_requests
+            }
+        }
+    }
+
+# Reaction predicate -> (need function, prod function)
+PATHWAYS_REACTIONS = {
+    "association-reaction": ("need-for-association", "prod-by-association"),
+    "catalyzed-association-reaction": ("need-for-catalyzed-association", "prod-by-catalyzed-association"),
+    "catalyzed-self-association-reaction": ("need-for-catalyzed-self-association", "prod-by-catalyzed-self-association"),
+    "synthesis-reaction": ("need-for-synthesis", "prod-by-synthesis")
+}
+
+def build_pathways(objects, fluents, goal_text, lazy=False):
+    """
+    Fluent-based equivalent of path_ways_metric_problem/convertor.py::convert_pddl_to_json.
+    With lazy, the four reaction arrays (nearly all of a large instance) are
+    generators, so their dicts never all exist at once.
+    """
+    pathways = registry.load_converter("pathways")
+
+    simples = []
+    complexes = []
+    for name, typ in objects:
+        if typ == "simple":
+            simples.append({"name": name, "chosen": False, "possible": True, "available": 0})
+        elif typ == "complex":
+            complexes.append({"name": name, "available": 0})
+    # The regex converter updates the first object with a given name, simples first.
+    by_name = {}
+    for entry in reversed(complexes):
+        by_name[entry["name"]] = entry
+    for entry in reversed(simples):
+        by_name[entry["name"]] = entry
+
+    reactions = {predicate: [] for predicate in PATHWAYS_REACTIONS}
+    amounts = {}
+    atom_available = []
+    assigned_available = []
+    for record in fluents:
+        name = record[1]
+        args = record[2]
+        if record[0] == "atom":
+            if name in reactions:
+                reactions[name].append(args)
+            elif name == "available" and len(args) == 2 and args[1].isdigit():
+                atom_available.append((args[0], int(args[1])))
+            continue
+        value = record[3]
+        if name == "available" and len(args) == 1 and value.isdigit():
+            assigned_available.append((args[0], int(value)))
+        elif value.isdigit():
+            # First assignment wins, like re.search on the whole text.
+            amounts.setdefault((name, args), int(value))
+
+    # (available X n) atoms are applied before (= (available X) n), as in extract_available.
+    for name, available in atom_available + assigned_available:
+        if name in by_name:
+            by_name[name]["available"] = available
+
+    def amount(function, *args):
+        return amounts.get((function, args), 0)
+
+    def association_reactions(predicate):
+        need, prod = PATHWAYS_REACTIONS[predicate]
+        for args in reactions[predicate]:
+            if len(args) != 3:
+                continue
+            m1, m2, m3 = args
+            yield {
+                "molecule_1_name": m1,
+                "need_molecule_1": amount(need, m1, m2, m3),
+                "molecule_2_name": m2,
+                "need_molecule_2": amount(need, m2, m1, m3),
+                "molecule_3_name": m3,
+                "prod": amount(prod, m1, m2, m3)
+            }
+
+    def unary_reactions(predicate):
+        need, prod = PATHWAYS_REACTIONS[predicate]
+        for args in reactions[predicate]:
+            if len(args) != 2:
+                continue
+            m1, m2 = args
+            yield {
+                "molecule_1_name": m1,
+                "need_molecule_1": amount(need, m1, m2),
+                "molecule_2_name": m2,
+                "prod": amount(prod, m1, m2)
+            }
+
+    collect = (lambda items: items) if lazy else list
+    association = [collect(association_reactions(predicate))
+                   for predicate in ("association-reaction", "catalyzed-association-reaction")]
+    unary = [collect(unary_reactions(predicate))
+             for predicate in ("catalyzed-self-association-reaction", "synthesis-reaction")]
+
+    return {
+        "state": {
+            "simples": simples,
+            "complexes": complexes,
+            "num_subs": 0
+        },
+        "problem": {
+            "goal": {
+                "conditions": pathways.extract_goal_conditions(goal_text())
+            },
+            "association_reactions": association[0],
+            "catalyzed_association_reactions": association[1],
+            "catalyzed_self_association_reactions": unary[0],
+            "synthesis_reactions": unary[1]
+        }
+    }
+
+# Builders that accept lazy=True. tpp has none: the bulk of its instances is in
+# dicts (distances, market items), which json_stream needs whole.
+LAZY = {"pathways"}
+
+BUILDERS = {
+    "tpp": build_tpp,
+    "pathways": build_pathways
+}
@@ -0,0 +1,650 @@
+#!/usr/bin/env python3
+"""
+Synthetic large-instance generators, one per domain.
+
+Each generator takes a size parameter n and a random.Random (a SeededRandom,
+which remembers its seed, when called from here) and yields the
+lines of a PDDL problem in the same shape as the files in problems_pddl (same
+object naming, same fluents, same section layout), so the converters can be
+stress-tested far beyond the shipped instances.
+
+The command line picks n so that the generated file is roughly --scale times
+the size of the largest problems_pddl file of the domain:
+
+    python -m fix_domains.generators --domains tpp pathways --scale 10 100 --output_dir generated
+
+Output goes to <output_dir>/<domain>/gen_<scale>x.pddl, which is the layout
+`fix_domains.benchmark --extra_dir` expects. The seed is fixed by default, so
+the same command always produces the same files.
+"""
+import os
+import math
+import random
+import argparse
+
+from fix_domains import registry
+
+DEFAULT_SEED = 1229
+
+# Smallest size parameter every generator accepts (pathways samples two of its n simple molecules).
+MIN_SIZE = 2
+
+class SeededRandom(random.Random):
+    """random.Random that remembers the seed it was created with, for headers that record it."""
+
+    def __init__(self, seed):
+        super().__init__(seed)
+        self.initial_seed = seed
+
+def generate_counters(n, rng):
+    max_int = 2 * n
+    yield ";; Synthetic instance generated by fix_domains.generators\n"
+    yield f"(define (problem instance_{n}_gen)\n"
+    yield "  (:domain fn-counters)\n"
+    yield "  (:objects\n"
+    yield "    " + " ".join(f"c{i}" for i in range(n)) + " - counter\n"
+    yield "  )\n\n"
+    yield "  (:init\n"
+    yield f"    (= (max_int) {max_int})\n"
+    for i in range(n):
+        yield f"\t(= (value c{i}) {rng.randint(0, max_int)})\n"
+    yield "  )\n\n"
+    yield "  (:goal (and \n"
+    for i in range(n - 1):
+        yield f"(<= (+ (value c{i}) 1) (value c{i + 1}))\n"
+    yield "  ))\n)\n"
+
+def generate_fo_counters(n, rng):
+    max_int = 2 * n
+    yield ";; Synthetic instance generated by fix_domains.generators\n"
+    yield f"(define (problem instance_{n}_gen)\n"
+    yield "  (:domain fn-counters)\n"
+    yield "  (:objects\n"
+    yield "    " + " ".join(f"c{i}" for i in range(n)) + " - counter\n"
+    yield "  )\n\n"
+    yield "  (:init\n"
+    yield f"    (= (max_int) {max_int})\n"
+    for i in range(n):
+        yield f"        (= (value c{i}) {rng.randint(0, max_int)})\n"
+    yield "\n"
+    for i in range(n):
+        yield f"        (= (rate_value c{i}) {rng.randint(0, 3)})\n"
+    yield "  )\n\n"
+    yield "  (:goal (and\n"
+    for i in range(n - 1):
+        yield f"    (<= (+ (value c{i}) 1) (value c{i + 1}))\n"
+    yield "  ))\n)\n"
+
+def _zenotravel(n, rng, with_speed, with_time, metric):
+    planes = max(1, n // 4)
+    persons = n
+    cities = max(2, n // 2)
+    yield "(define (problem zenotravel-problem-gen)\n"
+    yield "  (:domain zenotravel)\n"
+    yield "  (:objects\n"
+    for i in range(1, planes + 1):
+        yield f"    plane{i} - aircraft\n"
+    for i in range(1, persons + 1):
+        yield f"    person{i} - person\n"
+    for i in range(cities - 1):
+        yield f"    city{i} - city\n"
+    yield f"    city{cities - 1} - city)\n"
+    yield "  (:init\n"
+    for i in range(1, planes + 1):
+        yield f"    (located plane{i} city{rng.randrange(cities)})\n"
+        capacity = rng.randint(1000, 10000)
+        yield f"    (= (capacity plane{i}) {capacity})\n"
+        # A plane never holds more fuel than its capacity (the schema rejects that).
+        yield f"    (= (fuel plane{i}) {rng.randint(0, capacity)})\n"
+        yield f"    (= (slow-burn plane{i}) {rng.randint(1, 5)})\n"
+        yield f"    (= (fast-burn plane{i}) {rng.randint(6, 15)})\n"
+        yield f"    (= (onboard plane{i}) 0)\n"
+        yield f"    (= (zoom-limit plane{i}) {rng.randint(2, 10)})\n"
+    for i in range(1, persons + 1):
+        yield f"    (located person{i} city{rng.randrange(cities)})\n"
+    coords = [(rng.randint(0, 1000), rng.randint(0, 1000)) for _ in range(cities)]
+    for i in range(cities):
+        for j in range(cities):
+            dist = int(math.dist(coords[i], coords[j]))
+            yield f"    (= (distance city{i} city{j}) {dist})\n"
+    yield "    (= (total-fuel-used) 0)\n"
+    if with_time:
+        yield "    (= (total-time) 0)\n"
+    if with_speed:
+        for i in range(1, planes + 1):
+            yield f"    (= (slow-speed plane{i}) {rng.randint(100, 400)})\n"
+            yield f"    (= (fast-speed plane{i}) {rng.randint(500, 900)})\n"
+    yield "    )\n"
+    yield "  (:goal (and\n"
+    for i in range(1, planes + 1, 3):
+        yield f"           (located plane{i} city{rng.randrange(cities)})\n"
+    for i in range(1, persons + 1):
+        yield f"           (located person{i} city{rng.randrange(cities)})\n"
+    yield "           ))\n"
+    yield f"  (:metric minimize {metric}))\n"
+
+def generate_zenotravel_fuel_time(n, rng):
+    return _zenotravel(n, rng, True, True, "(+ (* 1 (total-time)) (* 1 (total-fuel-used)))")
+
+def generate_zenotravel_fuel(n, rng):
+    return _zenotravel(n, rng, False, False, "(total-fuel-used)")
+
+def generate_zenotravel_time(n, rng):
+    return _zenotravel(n, rng, True, True, "(total-time)")
+
+def generate_tpp(n, rng):
+    markets = n
+    goods = n
+    trucks = max(1, n // 10)
+    yield ";; Synthetic instance generated by fix_domains.generators\n"
+    yield "(define (problem pfilegen)\n"
+    yield "(:domain TPP-Metric)\n"
+    yield "(:objects\n"
+    yield "\t" + " ".join(f"market{i}" for i in range(1, markets + 1)) + " - market\n"
+    yield "\tdepot0 - depot\n"
+    yield "\t" + " ".join(f"truck{i}" for i in range(trucks)) + " - truck\n"
+    yield "\t" + " ".join(f"goods{i}" for i in range(goods)) + " - goods)\n"
+    yield "(:init\n"
+    for m in range(1, markets + 1):
+        for g in range(goods):
+            if rng.random() < 0.5:
+                yield f"\t(= (price goods{g} market{m}) {rng.randint(1, 50)})\n"
+                yield f"\t(= (on-sale goods{g} market{m}) {rng.randint(1, 20)})\n"
+            else:
+                yield f"\t(= (on-sale goods{g} market{m}) 0)\n"
+    for t in range(trucks):
+        yield f"\t(loc truck{t} depot0)\n"
+    places = ["depot0"] + [f"market{i}" for i in range(1, markets + 1)]
+    coords = {p: (rng.uniform(0, 1000), rng.uniform(0, 1000)) for p in places}
+    for i, a in enumerate(places):
+        for b in places[i + 1:]:
+            cost = math.dist(coords[a], coords[b])
+            yield f"\t(= (drive-cost {a} {b}) {cost:.2f})\n"
+            yield f"\t(= (drive-cost {b} {a}) {cost:.2f})\n"
+    for g in range(goods):
+        yield f"\t(= (bought goods{g}) 0)\n"
+        yield f"\t(= (request goods{g}) {rng.randint(1, 30)})\n"
+    yield "\t(= (total-cost) 0))\n\n"
+    yield "(:goal (and\n"
+    for g in range(goods):
+        yield f"\t(>= (bought goods{g}) (request goods{g}))\n"
+    for t in range(trucks):
+        yield f"\t(loc truck{t} depot0)\n"
+    yield "\t))\n\n"
+    yield "(:metric minimize (total-cost))\n)\n"
+
+def generate_pathways(n, rng):
+    simples = [f"S{i}" for i in range(n)]
+    complexes = [f"C{i}" for i in range(n)]
+    yield "(define (problem Pathways-gen)\n"
+    yield "(:domain Pathways-Metric)\n"
+    yield "(:objects\n"
+    for name in simples:
+        yield f"\t{name} - simple\n"
+    for name in complexes[:-1]:
+        yield f"\t{name} - complex\n"
+    yield f"\t{complexes[-1]} - complex)\n\n\n"
+    yield "(:init\n"
+    for name in simples:
+        yield f"\t(possible {name})\n"
+        yield f"\t(= (available {name}) 0)\n"
+    for name in complexes:
+        yield f"\t(= (available {name}) 0)\n"
+    durations = []
+    for i, product in enumerate(complexes):
+        kind = rng.random()
+        a, b = rng.sample(simples, 2)
+        if kind < 0.45:
+            yield f"\t(association-reaction {a} {b} {product})\n"
+            yield f"\t(= (need-for-association {a} {b} {product}) {rng.randint(1, 5)})\n"
+            yield f"\t(= (need-for-association {b} {a} {product}) {rng.randint(1, 5)})\n"
+            yield f"\t(= (prod-by-association {a} {b} {product}) {rng.randint(1, 5)})\n"
+            durations.append(f"\t(= (duration-association-reaction {a} {b} {product}) {rng.uniform(0.5, 2.5):.1f})\n")
+        elif kind < 0.65:
+            yield f"\t(catalyzed-association-reaction {a} {b} {product})\n"
+            yield f"\t(= (need-for-catalyzed-association {a} {b} {product}) {rng.randint(1, 5)})\n"
+            yield f"\t(= (need-for-catalyzed-association {b} {a} {product}) {rng.randint(1, 5)})\n"
+            yield f"\t(= (prod-by-catalyzed-association {a} {b} {product}) {rng.randint(1, 5)})\n"
+            durations.append(f"\t(= (duration-catalyzed-association-reaction {a} {b} {product}) {rng.uniform(0.5, 2.5):.1f})\n")
+        elif kind < 0.7:
+            yield f"\t(catalyzed-self-association-reaction {a} {product})\n"
+            yield f"\t(= (need-for-catalyzed-self-association {a} {product}) {rng.randint(1, 5)})\n"
+            yield f"\t(= (prod-by-catalyzed-self-association {a} {product}) {rng.randint(1, 5)})\n"
+        else:
+            yield f"\t(synthesis-reaction {a} {product}) \n"
+            yield f"\t(= (need-for-synthesis {a} {product}) {rng.randint(1, 5)})\n"
+            yield f"\t(= (prod-by-synthesis {a} {product}) {rng.randint(1, 5)})\n"
+    yield "\t(= (num-subs) 0)\n"
+    for line in durations:
+        yield line
+    yield "\t)\n\n"
+    yield "(:goal\n\t(and\n"
+    for _ in range(max(1, n // 10)):
+        a, b = rng.sample(complexes, 2)
+        yield f"\t(>= (+ (available {a}) (available {b})) {rng.randint(1, 7)})\n"
+    yield "\t))\n\n)\n"
+
+def generate_delivery(n, rng):
+    rooms = [f"room{i}" for i in range(1, n + 1)]
+    items = n * 2
+    bots = max(1, n // 5)
+    yield "(define (problem delivery-gen)\n"
+    yield "   (:domain delivery)\n"
+    yield "   (:objects " + " ".join(rooms) + " - room\n"
+    yield "             " + " ".join(f"item{i}" for i in range(items, 0, -1)) + " - item\n"
+    yield "             " + " ".join(f"bot{i}" for i in range(1, bots + 1)) + " - bot\n"
+    yield "             " + " ".join(f"left{i} right{i}" for i in range(1, bots + 1)) + " - arm)\n"
+    yield "   (:init "
+    for i in range(items, 0, -1):
+        yield f"(= (weight item{i}) {rng.randint(1, 3)})\n          "
+    for b in range(1, bots + 1):
+        yield f"(at-bot bot{b} {rng.choice(rooms)})\n          "
+    for b in range(1, bots + 1):
+        yield f"(free left{b})\n          (free right{b})\n          "
+    for b in range(1, bots + 1):
+        yield f"(mount left{b} bot{b})\n          (mount right{b} bot{b})\n          "
+    for i in range(items, 0, -1):
+        yield f"(at item{i} {rng.choice(rooms)})\n          "
+    yield "\n          "
+    # A spanning chain keeps every room reachable; a few random doors add cycles.
+    doors = set((rooms[i], rooms[i + 1]) for i in range(len(rooms) - 1))
+    for _ in range(n // 2):
+        a, b = rng.sample(rooms, 2) if len(rooms) > 1 else (rooms[0], rooms[0])
+        doors.add((a, b))
+    for a, b in sorted(doors):
+        yield f"(door {a} {b})\n          (door {b} {a})\n          "
+    yield "\n          "
+    for b in range(1, bots + 1):
+        yield f"(= (current_load bot{b}) 0)\n          (= (load_limit bot{b}) 4)\n          "
+    yield "(= (cost) 0))\n          \n"
+    goals = [f"(at item{i} {rng.choice(rooms)})" for i in range(items, 0, -1)]
+    yield "   (:goal (and " + "\n               ".join(goals) + "))\n               \n"
+    yield "   (:metric minimize (cost))\n)\n"
+
+def generate_drone(n, rng):
+    side = max(1, round(n ** (1 / 3)))
+    dims = (side, side, max(1, n // (side * side)))
+    points = [(x, y, z) for x in range(dims[0]) for y in range(dims[1]) for z in range(dims[2])]
+    battery = 2 * sum(dims) + 5
+    yield f";;Instance with {dims[0]}x{dims[1]}x{dims[2]} points\n"
+    yield "(define (problem name) (:domain domain_name)\n"
+    yield "(:objects \n"
+    for x, y, z in points:
+        yield f"x{x}y{y}z{z} - location\n"
+    yield ") \n"
+    yield "(:init (= (x) 0) (= (y) 0) (= (z) 0)\n"
+    yield f" (= (min_x) 0)  (= (max_x) {dims[0]}) \n"
+    yield f" (= (min_y) 0)  (= (max_y) {dims[1]}) \n"
+    yield f" (= (min_z) 0)  (= (max_z) {dims[2]}) \n"
+    for x, y, z in points:
+        yield f"(= (xl x{x}y{y}z{z}) {x})\n"
+        yield f"(= (yl x{x}y{y}z{z}) {y})\n"
+        yield f"(= (zl x{x}y{y}z{z}) {z})\n"
+    yield f"(= (battery-level) {battery})\n"
+    yield f"(= (battery-level-full) {battery})\n"
+    yield ")\n"
+    yield "(:goal (and \n"
+    for x, y, z in points:
+        yield f"(visited x{x}y{y}z{z})\n"
+    yield "(= (x) 0) (= (y) 0) (= (z) 0) ))\n"
+    yield ");; end of the problem instance\n"
+
+def generate_expedition(n, rng):
+    sleds = max(1, n // 10)
+    waypoints = n
+    yield ";; Synthetic instance generated by fix_domains.generators\n"
+    yield f"(define (problem instance_{waypoints}_sled_{sleds})\n\n"
+    yield "\t(:domain expedition)\n\n"
+    yield "\t(:objects\n"
+    yield "\t\t" + " ".join(f"s{i}" for i in range(sleds)) + " - sled\n"
+    yield "\t\t" + " ".join(f"wa{i}" for i in range(waypoints)) + " - waypoint\n"
+    yield "\t)\n\n"
+    yield "  (:init\n"
+    for s in range(sleds):
+        yield f"\t\t(at s{s} wa0)\n"
+        yield f"\t\t(= (sled_capacity s{s}) {rng.randint(2, 6)})\n"
+        yield f"\t\t(= (sled_supplies s{s}) 1)\n"
+    yield "\t\t(= (waypoint_supplies wa0) 1000)\n"
+    for w in range(1, waypoints):
+        yield f"\t\t(= (waypoint_supplies wa{w}) 0)\n"
+    for w in range(waypoints - 1):
+        yield f"\t\t(is_next wa{w} wa{w + 1})\n"
+    yield "\t)\n\n"
+    yield "\t(:goal\n\t\t(and\n"
+    for s in range(sleds):
+        yield f"\t\t\t(at s{s} wa{waypoints - 1})\n"
+    yield "\t\t)\n\t)\n)\n"
+
+def _sailing(n, rng, with_velocity, domain):
+    boats = max(1, n // 4)
+    persons = n
+    yield ";; Synthetic instance generated by fix_domains.generators\n"
+    seed = getattr(rng, "initial_seed", None)
+    if seed is not None:
+        yield f";;Setting seed to {seed}\n"
+    yield f"(define (problem instance_{boats}_{persons}_gen)\n\n"
+    yield f"\t(:domain {domain})\n\n"
+    yield "\t(:objects\n"
+    yield "\t\t" + " ".join(f"b{i}" for i in range(boats)) + "  - boat\n"
+    yield "\t\t" + " ".join(f"p{i}" for i in range(persons)) + "  - person\n"
+    yield "\t)\n\n"
+    yield "  (:init\n"
+    for b in range(boats):
+        yield f"\t\t(= (x b{b}) {rng.randint(-10, 10)})\n"
+        yield f"(= (y b{b}) 0)\n"
+        if with_velocity:
+            yield f"(= (v b{b}) {rng.randint(1, 3)})\n"
+    yield "\n\n"
+    for p in range(persons):
+        yield f"\t\t(= (d p{p}) {rng.randint(-500, 500)})\n"
+    yield "\n\n\t)\n\n"
+    yield "\t(:goal\n\t\t(and\n"
+    for p in range(persons):
+        yield f"\t\t\t(saved p{p})\n"
+    yield "\n\t\t)\n\t)\n)\n"
+
+def generate_sailing(n, rng):
+    return _sailing(n, rng, False, "sailing")
+
+def generate_fo_sailing(n, rng):
+    return _sailing(n, rng, True, "sailing_ln")
+
+def generate_block_grouping(n, rng):
+    size = max(20, n)
+    groups = max(1, n // 5)
+    color = {i: rng.randrange(groups) for i in range(1, n + 1)}
+    yield ";; Synthetic instance generated by fix_domains.generators\n"
+    yield f"(define (problem instance_{size}_{n}_{groups}_1)\n"
+    yield "  (:domain mt-block-grouping)\n"
+    yield "  (:objects\n"
+    yield "    " + " ".join(f"b{i}" for i in range(1, n + 1)) + " - block\n"
+    yield "  )\n\n"
+    yield "  (:init\n"
+    for i in range(1, n + 1):
+        yield f"\t(= (x b{i}) {rng.randint(1, size)})\n"
+        yield f"\t(= (y b{i}) {rng.randint(1, size)})\n"
+    yield f"\t(= (max_x) {size} )\n\t(= (min_x) 1 )\n\t(= (max_y) {size} )\n\t(= (min_y) 1 )\n"
+    yield "  )\n\n"
+    yield "  (:goal (and \n"
+    for i in range(1, n + 1):
+        for j in range(i + 1, n + 1):
+            if color[i] == color[j]:
+                yield f"\t(= (x b{i}) (x b{j}))\n(= (y b{i}) (y b{j}))\n"
+            else:
+                yield f"\t(or (not (= (x b{i}) (x b{j}))) (not (= (y b{i}) (y b{j}))))\n"
+    yield "  ))\n)\n"
+
+def _place_vehicles(grid, count, rng):
+    """
+    Places red-car plus `count` other vehicles on a grid x grid board without overlaps.
+    Returns a list of (name, kind, cells) with kind in
+    horizontalCar/verticalCar/horizontalTruck/verticalTruck.
+    """
+    occupied = set()
+    row = grid // 2
+    red = [(0, row), (1, row)]
+    occupied.update(red)
+    vehicles = [("red-car", "horizontalCar", red)]
+    kinds = ["horizontalCar", "verticalCar", "horizontalTruck", "verticalTruck"]
+    for i in range(count * 20):
+        if len(vehicles) > count:
+            break
+        kind = rng.choice(kinds)
+        length = 3 if "Truck" in kind else 2
+        x, y = rng.randrange(grid), rng.randrange(grid)
+        if kind.startswith("horizontal"):
+            cells = [(x + k, y) for k in range(length)]
+        else:
+            cells = [(x, y + k) for k in range(length)]
+        if any(cx >= grid or cy >= grid or (cx, cy) in occupied for cx, cy in cells):
+            continue
+        occupied.update(cells)
+        vehicles.append((f"{kind.lower()}-{i}", kind, cells))
+    return vehicles, occupied
+
+def generate_red_car(n, rng):
+    grid = max(6, n)
+    vehicles, occupied = _place_vehicles(grid, grid * grid // 6, rng)
+    at_predicate = {
+        "horizontalCar": "at-car-horizontal",
+        "verticalCar": "at-car-vertical",
+        "horizontalTruck": "at-truck-horizontal",
+        "verticalTruck": "at-truck-vertical"
+    }
+    yield "(define (problem Red-Car-Problem-Generated)\n"
+    yield "(:domain RedCar)\n"
+    yield "(:objects\n"
+    for y in range(grid):
+        yield " ".join(f"cube-x{x}-y{y}" for x in range(grid)) + f" - cube ;; row {y + 1}\n"
+    yield "\n"
+    for kind in at_predicate:
+        names = [name for name, k, _ in vehicles if k == kind]
+        if names:
+            yield " " + " ".join(names) + f" - {kind}\n"
+    yield ")\n"
+    yield "(:init\n\n"
+    yield ";; Horizontal Car Adjacency\n"
+    for y in range(grid):
+        for x in range(grid - 1):
+            yield f"(adjacent-horizontal-car cube-x{x}-y{y} cube-x{x + 1}-y{y})\n"
+    yield "\n;; Vertical Car Adjacency\n"
+    for x in range(grid):
+        for y in range(grid - 1):
+            yield f"(adjacent-vertical-car cube-x{x}-y{y} cube-x{x}-y{y + 1})\n"
+    yield "\n;; Horizontal Truck Adjacency\n"
+    for y in range(grid):
+        for x in range(grid - 2):
+            yield f"(adjacent-horizontal-truck cube-x{x}-y{y} cube-x{x + 1}-y{y} cube-x{x + 2}-y{y})\n"
+    yield "\n;; Vertical Truck Adjacency\n"
+    for x in range(grid):
+        for y in range(grid - 2):
+            yield f"(adjacent-vertical-truck cube-x{x}-y{y} cube-x{x}-y{y + 1} cube-x{x}-y{y + 2})\n"
+    yield "\n;; Clear cells\n"
+    for y in range(grid):
+        for x in range(grid):
+            if (x, y) not in occupied:
+                yield f"(clear cube-x{x}-y{y})\n"
+    yield "\n;; Vehicles\n"
+    for name, kind, cells in vehicles:
+        yield f"({at_predicate[kind]} {name} " + " ".join(f"cube-x{x}-y{y}" for x, y in cells) + ")\n"
+    yield ")\n"
+    row = grid // 2
+    yield "(:goal\n"
+    yield f"    (at-car-horizontal red-car cube-x{grid - 2}-y{row} cube-x{grid - 1}-y{row})\n"
+    yield "))\n"
+
+def generate_red_car_numeric(n, rng):
+    grid = max(6, n)
+    vehicles, occupied = _place_vehicles(grid, grid * grid // 6, rng)
+    yield "(define (problem generated)\n"
+    yield "(:domain RedCar)\n"
+    yield "(:objects\n\n"
+    for kind in ["horizontalCar", "verticalCar", "horizontalTruck", "verticalTruck"]:
+        names = [name for name, k, _ in vehicles if k == kind]
+        if names:
+            yield " " + " ".join(names) + f" - {kind}\n"
+    yield ")\n"
+    yield "(:init\n"
+    for name, _, cells in vehicles:
+        yield f"(= (x {name}) {cells[0][0]})\n"
+        yield f"(= (y {name}) {cells[0][1]})\n"
+    yield "    \n    ;; Grid boundaries\n"
+    yield f"    (= (min_x) 0)\n    (= (max_x) {grid})\n    (= (min_y) 0)\n    (= (max_y) {grid})\n"
+    yield "    \n    ;; Clear cells\n"
+    for y in range(grid):
+        for x in range(grid):
+            yield f"(= (clear {x} {y}) {0 if (x, y) in occupied else 1})\n"
+    yield ")\n"
+    yield "(:goal (and \n"
+    yield "    (= (x red-car) (- (max_x) 2))\n"
+    yield f"    (= (y red-car) {grid // 2})\n"
+    yield "))\n)\n"
+
+def generate_hydro(n, rng):
+    horizon = max(2, n)
+    values = 27
+    times = [f"t{i:06d}" for i in range(horizon)]
+    yield "(define (problem power-gen)\n"
+    yield "  (:domain hydropower)\n"
+    yield "  (:objects\n"
+    yield "\t  " + " ".join(f"n{i}" for i in range(values)) + " - turnvalue\n"
+    yield "\t  \n"
+    yield "\t  " + " ".join(times) + " - time\n"
+    yield ")\n"
+    yield "(:init\n"
+    for i in range(values):
+        yield f"\t  (= (value n{i}) {i})\n"
+    yield "\n\n\n"
+    # A smooth random walk keeps the demand curve shaped like the shipped daily profiles.
+    level = rng.randrange(values)
+    for t in times:
+        level = min(values - 1, max(0, level + rng.randint(-2, 2)))
+        yield f"        (demand {t} n{level})\n"
+    yield "\n\t(timenow " + times[0] + ")\n\n"
+    for a, b in zip(times, times[1:]):
+        yield f"        (before {a} {b})\n"
+    capacity = rng.randint(2, 10)
+    funds = 1000
+    yield f"\n\t(= (stored_units) 0)\n\t(= (stored_capacity) {capacity})\n\t(= (funds) {funds})\n"
+    yield ")\n"
+    yield "\t (:goal (and\n"
+    yield f"\t (>= (funds) {funds + rng.randint(10, 10 * horizon)})\n"
+    yield "\t)\n)\n)\n"
+
+def generate_ext_plant_watering(n, rng):
+    plants = n
+    agents = max(1, n // 4)
+    size = max(11, n)
+    amounts = [rng.randint(1, 10) for _ in range(plants)]
+    yield f"(define (problem instance_{size}_{plants}_{agents}_1)\n"
+    yield "(:domain ext-plant-watering)\n"
+    yield "(:objects\n"
+    for p in range(1, plants + 1):
+        yield f"\tplant{p} - plant\n"
+    yield "\ttap1 - tap\n"
+    for a in range(1, agents + 1):
+        yield f"\tagent{a} - agent\n"
+    yield ")\n"
+    yield "(:init\n"
+    yield f"\t(= (maxx) {size})\n\t(= (minx) 1)\n\t(= (maxy) {size})\n\t(= (miny) 1)\n"
+    yield "\t(= (total_poured) 0)\n\t(= (total_loaded) 0)\n"
+    yield f"\t(= (water_reserve) {sum(amounts) + rng.randint(0, 10)})\n"
+    for a in range(1, agents + 1):
+        yield f"\t(= (carrying agent{a}) 0)\n"
+        yield f"\t(= (max_carry agent{a}) {rng.randint(3, 8)})\n"
+    for p in range(1, plants + 1):
+        yield f"\t(= (poured plant{p}) 0)\n"
+    for p in range(1, plants + 1):
+        yield f"\t(= (x plant{p}) {rng.randint(1, size)})\n"
+        yield f"\t(= (y plant{p}) {rng.randint(1, size)})\n"
+    yield f"\t(= (x tap1) {rng.randint(1, size)})\n"
+    yield f"\t(= (y tap1) {rng.randint(1, size)})\n"
+    for a in range(1, agents + 1):
+        yield f"\t(= (x agent{a}) {rng.randint(1, size)})\n"
+        yield f"\t(= (y agent{a}) {rng.randint(1, size)})\n"
+    yield ")\n"
+    yield "(:goal\n(and\n"
+    for p, amount in enumerate(amounts, start=1):
+        yield f"\t(= (poured plant{p}) {amount})\n"
+    yield "\t(= (total_poured) (total_loaded))\n"
+    yield ")))\n"
+
+GENERATORS = {
+    "block_grouping": generate_block_grouping,
+    "counters": generate_counters,
+    "delivery": generate_delivery,
+    "drone": generate_drone,
+    "expedition": generate_expedition,
+    "ext_plant_watering": generate_ext_plant_watering,
+    "fo_counters": generate_fo_counters,
+    "fo_sailing": generate_fo_sailing,
+    "hydro": generate_hydro,
+    "pathways": generate_pathways,
+    "red_car": generate_red_car,
+    "red_car_numeric": generate_red_car_numeric,
+    "sailing": generate_sailing,
+    "tpp": generate_tpp,
+    "zenotravel_fuel_time": generate_zenotravel_fuel_time,
+    "zenotravel_fuel": generate_zenotravel_fuel,
+    "zenotravel_time": generate_zenotravel_time
+}
+
+def generated_size(domain, n, seed=DEFAULT_SEED):
+    """Size in bytes of the instance generated for size parameter n (nothing is kept in memory)."""
+    return sum(len(line) for line in GENERATORS[domain](n, SeededRandom(seed)))
+
+def _bisect_size(domain, target_bytes, seed, low, high):
+    """The n in [low, high] whose instance size is closest to target_bytes (sizes grow with n)."""
+    top = high
+    # Largest n whose instance is no larger than the target (or low if none is).
+    while low < high:
+        middle = (low + high + 1) // 2
+        if generated_size(domain, middle, seed) <= target_bytes:
+            low = middle
+        else:
+            high = middle - 1
+    if low < top:
+        below = target_bytes - generated_size(domain, low, seed)
+        above = generated_size(domain, low + 1, seed) - target_bytes
+        if 0 <= above < below:
+            return low + 1
+    return low
+
+def size_for_target(domain, target_bytes, seed=DEFAULT_SEED, probe=8):
+    """
+    Picks the size parameter n whose instance is about target_bytes long.
+    Sizes grow polynomially in n (linearly for most domains, quadratically for
+    distance tables and pairwise goals), so the exponent is estimated from two
+    small probes and extrapolated. Targets no larger than the larger probe
+    (e.g. red_car, whose instances grow fast) are bisected instead, as those
+    sizes are cheap to generate.
+    """
+    large = generated_size(domain, probe * 4, seed)
+    if target_bytes <= large:
+        return _bisect_size(domain, target_bytes, seed, MIN_SIZE, probe * 4)
+    small = generated_size(domain, probe, seed)
+    exponent = max(1.0, math.log(large / small) / math.log(4))
+    return max(probe * 4, int(probe * 4 * (target_bytes / large) ** (1 / exponent)))
+
+def largest_shipped_size(domain):
+    """Size in bytes of the largest problems_pddl file of a domain."""
+    return max(os.path.getsize(path) for path in registry.problem_files(domain))
+
+def write_instance(domain, n, path, seed=DEFAULT_SEED):
+    """Generates the instance of size n for a domain and streams it to path."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, 'w') as f:
+        f.writelines(GENERATORS[domain](n, SeededRandom(seed)))
+    return os.path.getsize(path)
+
+def generate_scaled(domain, scale, output_dir, seed=DEFAULT_SEED):
+    """
+    Writes <output_dir>/<domain>/gen_<scale>x.pddl, about `scale` times the size of
+    the largest shipped instance of the domain. Returns (path, n, size in bytes).
+    """
+    n = size_for_target(domain, scale * largest_shipped_size(domain), seed)
+    path = os.path.join(output_dir, domain, f"gen_{scale:g}x.pddl")
+    return path, n, write_instance(domain, n, path, seed)
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate large synthetic PDDL problems for every domain")
+    parser.add_argument("--domains", nargs="*", help="Domains to generate (default: all)")
+    parser.add_argument("--scale", nargs="+", type=float, default=[10],
+                        help="Target size as a multiple of the largest shipped instance (e.g. 10 100 1000)")
+    parser.add_argument("--size", type=int, help="Use this size parameter n instead of --scale")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED, help="Random seed")
+    parser.add_argument("--output_dir", default="generated", help="Where to write <domain>/*.pddl")
+    args = parser.parse_args()
+
+    for domain in args.domains or sorted(GENERATORS):
+        if args.size:
+            path = os.path.join(args.output_dir, domain, f"gen_n{args.size}.pddl")
+            size = write_instance(domain, args.size, path, args.seed)
+            print(f"Generated {path} (n={args.size}, {size / 1024:.1f} KB)")
+            continue
+        for scale in args.scale:
+            path, n, size = generate_scaled(domain, scale, args.output_dir, args.seed)
+            print(f"Generated {path} (n={n}, {size / 1024:.1f} KB)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,593 @@
+#!/usr/bin/env python3
+"""
+Generic converter driven by the domain file and a small per-domain mapping.
+
+Instead of a hand-written regex converter, a domain that has a domain.pddl and
+a mapping.json in its folder is converted in two steps:
+
+  1. parse_problem() reads the problem into typed, integer-indexed tables,
+     using the declarations of domain.pddl (parse_domain): every object gets
+     an index within its type and each of the type's ancestors, every :init
+     fact is filed under its predicate or function in one pass of the
+     memory-mapped fluent scanner (fix_domains.pddl_mmap), the goal becomes
+     atoms per predicate and linear numeric conditions, and the metric a
+     linear expression. ProblemTables.to_json() exports them as arrays indexed
+     by the parameter types (dense for functions, index tuples for predicates).
+  2. The domain's mapping.json arranges the tables into the layout of the Rust
+     structs. It is compiled once into functions (compile_mapping); a mapping
+     value is one of
+       "@index", "@name"                 the object of the enclosing "each"
+       {"count": type}                   number of objects of a type
+       {"function": f, "default": d, "type": "int"|"float"}
+                                         value of a 0-ary function, or of a
+                                         unary one for the current object
+       {"predicate": p, "default": d}    unary: whether it holds for the current
+                                         object; binary: index of the second
+                                         argument paired with it
+       {"each": type, "record": value}   list with one entry per object of a type
+       {"table": f, "key": "{0},{1}"}    all entries of a function, keyed by the
+                                         formatted argument indices (file order)
+       {"goal": p, "each": type}         goal atoms of p whose first argument is
+                                         of the type, as index lists
+       {"goal_conditions": "name"|"index"}
+                                         numeric goal conditions as
+                                         {"left", "operator", "right"}, terms as
+                                         [coefficient, first argument name] or
+                                         [coefficient, function, [indices]]
+       {"metric": f, "default": d}       coefficient of a 0-ary function in the
+                                         metric (d without a metric, 0 if absent)
+       any other object                  nested layout of values
+       anything else                     literal
+
+Performance work on parsing is therefore done once for all such domains. The
+bundled mappings (counters, fo_counters, zenotravel_fuel_time) reproduce the
+hand-written converters; convert --check compares the two.
+
+Usage:
+    python -m fix_domains.generic tables zenotravel_fuel_time "zenotravel_fuel&time_domain/problems_pddl/pfile1.pddl"
+    python -m fix_domains.generic convert counters counters/problems_pddl --output_dir counters_json --check
+"""
+import os
+import re
+import json
+import argparse
+
+from fix_domains import registry
+from fix_domains import archives
+from fix_domains import output
+from fix_domains import pddl_mmap
+
+DOMAIN_FILE = "domain.pddl"
+MAPPING_FILE = "mapping.json"
+
+COMPARISONS = ("<=", ">=", "<", ">", "=")
+
+_TOKEN_RE = re.compile(r'[()]|[^\s()]+')
+
+def _strip_comments(text):
+    return "\n".join(line.split(";", 1)[0] for line in text.splitlines())
+
+def _parse_sexpr(text):
+    """Nested lists of tokens (case preserved) for every top-level expression in text."""
+    stack = [[]]
+    for token in _TOKEN_RE.findall(_strip_comments(text)):
+        if token == "(":
+            stack.append([])
+        elif token == ")":
+            if len(stack) > 1:
+                done = stack.pop()
+                stack[-1].append(done)
+        else:
+            stack[-1].append(token)
+    while len(stack) > 1:
+        done = stack.pop()
+        stack[-1].append(done)
+    return stack[0]
+
+def _typed_list(tokens):
+    """[(name, type)] from 'a b - t c - u d' (untyped names are of type object)."""
+    result = []
+    pending = []
+    tokens = iter(tokens)
+    for token in tokens:
+        if token == "-":
+            type_name = next(tokens, "object")
+            if isinstance(type_name, list):
+                raise ValueError(f"Unsupported type expression: {type_name}")
+            result.extend((name, type_name.lower()) for name in pending)
+            pending = []
+        else:
+            pending.append(token)
+    result.extend((name, "object") for name in pending)
+    return result
+
+def _number(text):
+    return float(text) if "." in text else int(text)
+
+class Action:
+    """An action schema: parameters as [(variable, type)], precondition and effect as nested lists."""
+
+    def __init__(self, name, parameters, precondition, effect):
+        self.name = name
+        self.parameters = parameters
+        self.precondition = precondition
+        self.effect = effect
+
+class DomainModel:
+    """Types, predicates, functions and actions declared by a domain file (names lower-cased)."""
+
+    def __init__(self, name, parents, predicates, functions, actions=()):
+        self.name = name
+        self.parents = parents
+        # name -> [parameter types]
+        self.predicates = predicates
+        self.functions = functions
+        self.actions = list(actions)
+
+    def ancestors(self, type_name):
+        """The type followed by its supertypes, up to object."""
+        chain = [type_name]
+        while chain[-1] in self.parents and self.parents[chain[-1]] not in chain:
+            chain.append(self.parents[chain[-1]])
+        if chain[-1] != "object":
+            chain.append("object")
+        return chain
+
+def parse_domain(text):
+    """Builds the DomainModel of a domain file's text."""
+    define = next((e for e in _parse_sexpr(text) if isinstance(e, list) and e and e[0].lower() == "define"), None)
+    if define is None:
+        raise ValueError("No (define ...) in the domain file")
+    name = ""
+    parents = {}
+    predicates = {}
+    functions = {}
+    actions = []
+    for part in define[1:]:
+        if not isinstance(part, list) or not part or isinstance(part[0], list):
+            continue
+        head = part[0].lower()
+        if head == "domain" and len(part) > 1:
+            name = part[1].lower()
+        elif head == ":types":
+            for type_name, parent in _typed_list(part[1:]):
+                if type_name.lower() != "object":
+                    parents[type_name.lower()] = parent
+        elif head in (":predicates", ":functions"):
+            table = predicates if head == ":predicates" else functions
+            for decl in part[1:]:
+                # Skips the "- number" result types of :functions.
+                if isinstance(decl, list) and decl:
+                    table[decl[0].lower()] = [type_name for _, type_name in _typed_list(decl[1:])]
+        elif head == ":action" and len(part) > 1:
+            fields = dict(zip(part[2::2], part[3::2]))
+            fields = {key.lower(): value for key, value in fields.items() if isinstance(key, str)}
+            parameters = [(var.lower(), type_name) for var, type_name in _typed_list(fields.get(":parameters", []))]
+            actions.append(Action(part[1].lower(), parameters, fields.get(":precondition", []),
+                                  fields.get(":effect", [])))
+    return DomainModel(name, parents, predicates, functions, actions)
+
+class ProblemTables:
+    """One problem filed under the declarations of its domain."""
+
+    def __init__(self, model):
+        self.model = model
+        # type -> [object names] and type -> {name: index}, for each type and its ancestors
+        self.objects = {}
+        self.index = {}
+        # function -> {argument names: value} and predicate -> {argument names: True}, in file order
+        self.functions = {name: {} for name in model.functions}
+        self.predicates = {name: {} for name in model.predicates}
+        # predicate -> [argument names] of the goal atoms
+        self.goal_atoms = {name: [] for name in model.predicates}
+        # (operator, left, right), each side a linear expression ({(function, args): coefficient}, constant)
+        self.goal_conditions = []
+        # (direction, linear expression) or None
+        self.metric = None
+        self._pairs = {}
+
+    def add_object(self, name, type_name):
+        for t in self.model.ancestors(type_name):
+            index = self.index.setdefault(t, {})
+            if name not in index:
+                index[name] = len(index)
+                self.objects.setdefault(t, []).append(name)
+
+    def indices(self, args, types):
+        """Indices of argument names within the given types, or None if one is not such an object."""
+        result = []
+        for arg, type_name in zip(args, types):
+            i = self.index.get(type_name, {}).get(arg)
+            if i is None:
+                return None
+            result.append(i)
+        return result
+
+    def pairs(self, predicate):
+        """{first argument: second argument} of a binary predicate (the first fact wins)."""
+        pairs = self._pairs.get(predicate)
+        if pairs is None:
+            pairs = {}
+            for args in self.predicates[predicate]:
+                pairs.setdefault(args[0], args[1])
+            self._pairs[predicate] = pairs
+        return pairs
+
+    def _linear_json(self, linear):
+        terms, constant = linear
+        result = []
+        for (function, args), coefficient in terms.items():
+            result.append([coefficient, function, self.indices(args, self.model.functions[function])])
+        return {"terms": result, "constant": constant}
+
+    def _dense(self, function):
+        types = self.model.functions[function]
+        values = self.functions[function]
+        if not types:
+            return values.get(())
+        shape = [len(self.objects.get(t, ())) for t in types]
+
+        def empty(depth):
+            if depth == len(shape) - 1:
+                return [None] * shape[depth]
+            return [empty(depth + 1) for _ in range(shape[depth])]
+
+        array = empty(0)
+        for args, value in values.items():
+            indices = self.indices(args, types)
+            if indices is None:
+                continue
+            row = array
+            for i in indices[:-1]:
+                row = row[i]
+            row[indices[-1]] = value
+        return array
+
+    def to_json(self):
+        """The tables as JSON: objects per type, functions as dense arrays, predicates as index lists."""
+        predicates = {}
+        for name, facts in self.predicates.items():
+            types = self.model.predicates[name]
+            predicates[name] = {"params": types,
+                                "true": [i for i in (self.indices(args, types) for args in facts) if i is not None]}
+        goal_atoms = {}
+        for name, atoms in self.goal_atoms.items():
+            if atoms:
+                goal_atoms[name] = [self.indices(args, self.model.predicates[name]) for args in atoms]
+        return {
+            "domain": self.model.name,
+            "objects": self.objects,
+            "functions": {name: {"params": types, "values": self._dense(name)}
+                          for name, types in self.model.functions.items()},
+            "predicates": predicates,
+            "goal": {
+                "atoms": goal_atoms,
+                "conditions": [{"left": self._linear_json(left), "operator": op, "right": self._linear_json(right)}
+                               for op, left, right in self.goal_conditions]
+            },
+            "metric": None if self.metric is None else dict({"direction": self.metric[0]},
+                                                           **self._linear_json(self.metric[1]))
+        }
+
+def linear_expression(model, expr):
+    """
+    ({(function, args): coefficient}, constant) of a numeric expression (nested
+    lists whose leaves are tokens or numbers); ValueError if not linear.
+    """
+    if not isinstance(expr, list):
+        return {}, expr if isinstance(expr, (int, float)) else _number(expr)
+    if not expr or isinstance(expr[0], list):
+        raise ValueError(f"Bad numeric expression: {expr}")
+    head = expr[0].lower()
+    if head in model.functions:
+        return {(head, tuple(expr[1:])): 1}, 0
+    return combine_linear(head, [linear_expression(model, e) for e in expr[1:]], expr)
+
+def combine_linear(head, operands, expr):
+    """Applies an arithmetic operator to linear expressions; expr is only for the error message."""
+    if head == "+":
+        terms, constant = {}, 0
+        for t, c in operands:
+            for key, coefficient in t.items():
+                terms[key] = terms.get(key, 0) + coefficient
+            constant += c
+        return terms, constant
+    if head == "-" and len(operands) == 1:
+        t, c = operands[0]
+        return {key: -coefficient for key, coefficient in t.items()}, -c
+    if head == "-" and len(operands) == 2:
+        (t1, c1), (t2, c2) = operands
+        terms = dict(t1)
+        for key, coefficient in t2.items():
+            terms[key] = terms.get(key, 0) - coefficient
+        return terms, c1 - c2
+    if head in ("*", "/") and len(operands) == 2:
+        (t1, c1), (t2, c2) = operands
+        if head == "*" and not t1:
+            return {key: c1 * coefficient for key, coefficient in t2.items()}, c1 * c2
+        if not t2:
+            factor = c2 if head == "*" else 1 / c2
+            return {key: coefficient * factor for key, coefficient in t1.items()}, c1 * factor
+    raise ValueError(f"Non-linear numeric expression: {expr}")
+
+def _add_goal(tables, expr):
+    model = tables.model
+    if not isinstance(expr, list) or not expr or isinstance(expr[0], list):
+        raise ValueError(f"Bad goal expression: {expr}")
+    head = expr[0].lower()
+    if head == "and":
+        for part in expr[1:]:
+            _add_goal(tables, part)
+    elif head in COMPARISONS and len(expr) == 3:
+        tables.goal_conditions.append((head, linear_expression(model, expr[1]), linear_expression(model, expr[2])))
+    elif head in model.predicates:
+        tables.goal_atoms[head].append(tuple(expr[1:]))
+    else:
+        raise ValueError(f"Unsupported goal expression: ({' '.join(map(str, expr))})")
+
+def parse_problem(model, pddl):
+    """Files a problem (str, bytes or a mapped buffer) into ProblemTables."""
+    buf = pddl.encode() if isinstance(pddl, str) else pddl
+    tables = ProblemTables(model)
+    objects_span = pddl_mmap.section_span(buf, "objects")
+    if objects_span:
+        for name, type_name in pddl_mmap.iter_objects(buf, objects_span):
+            tables.add_object(name, type_name.lower())
+    init_span = pddl_mmap.section_span(buf, "init")
+    if init_span:
+        functions, predicates = tables.functions, tables.predicates
+        for record in pddl_mmap.iter_fluents(buf, init_span):
+            if record[0] == "assignment":
+                table = functions.get(record[1].lower())
+                if table is not None:
+                    table[record[2]] = _number(record[3])
+            else:
+                table = predicates.get(record[1].lower())
+                if table is not None:
+                    table[record[2]] = True
+    for expr in _parse_sexpr(pddl_mmap.section_text(buf, "goal")):
+        if isinstance(expr, list) and expr and not isinstance(expr[0], list) and expr[0].lower() == ":goal":
+            for part in expr[1:]:
+                _add_goal(tables, part)
+    for expr in _parse_sexpr(pddl_mmap.section_text(buf, "metric")):
+        if isinstance(expr, list) and len(expr) >= 3 and not isinstance(expr[0], list) and expr[0].lower() == ":metric":
+            tables.metric = (expr[1].lower(), linear_expression(model, expr[2]))
+    return tables
+
+# ---------------------------------------------------------------------------
+# Mappings. Each compiles to a function (tables, obj) -> value, obj being the
+# (name, index) of the enclosing "each" or None.
+
+_DIRECTIVES = ("count", "function", "predicate", "table", "goal", "goal_conditions", "metric", "each")
+
+_CASTS = {"int": int, "float": float, None: lambda value: value}
+
+def _missing(default, what):
+    if default is _NO_DEFAULT:
+        raise ValueError(f"No value for {what}")
+    return default
+
+_NO_DEFAULT = object()
+
+def compile_mapping(model, spec, path="mapping"):
+    """Compiles a mapping value (see the module docstring) for a domain model."""
+    if isinstance(spec, str) and spec in ("@index", "@name"):
+        position = 1 if spec == "@index" else 0
+        return lambda tables, obj: obj[position]
+    if isinstance(spec, list):
+        items = [compile_mapping(model, item, f"{path}[{i}]") for i, item in enumerate(spec)]
+        return lambda tables, obj: [item(tables, obj) for item in items]
+    if not isinstance(spec, dict):
+        return lambda tables, obj: spec
+    # Directive values are names, so layout fields such as "goal": {...} are not mistaken for one.
+    directive = next((key for key in _DIRECTIVES if isinstance(spec.get(key), str)), None)
+    if directive is None:
+        fields = [(key, compile_mapping(model, value, f"{path}.{key}")) for key, value in spec.items()]
+        return lambda tables, obj: {key: field(tables, obj) for key, field in fields}
+    return _COMPILERS[directive](model, spec, path)
+
+def _declared(table, name, kind, path):
+    name = name.lower()
+    if name not in table:
+        raise ValueError(f"{path}: the domain declares no {kind} {name!r}")
+    return name
+
+def _compile_count(model, spec, path):
+    type_name = spec["count"].lower()
+    return lambda tables, obj: len(tables.objects.get(type_name, ()))
+
+def _compile_function(model, spec, path):
+    name = _declared(model.functions, spec["function"], "function", path)
+    arity = len(model.functions[name])
+    if arity > 1:
+        raise ValueError(f"{path}: {name} has {arity} parameters; use a table")
+    default = spec.get("default", _NO_DEFAULT)
+    cast = _CASTS[spec.get("type")]
+
+    def value(tables, obj):
+        args = (obj[0],) if arity else ()
+        result = tables.functions[name].get(args, _NO_DEFAULT)
+        if result is _NO_DEFAULT:
+            return _missing(default, f"({name}{''.join(' ' + a for a in args)})")
+        return cast(result)
+    return value
+
+def _compile_predicate(model, spec, path):
+    name = _declared(model.predicates, spec["predicate"], "predicate", path)
+    types = model.predicates[name]
+    default = spec.get("default", _NO_DEFAULT)
+    if len(types) == 1:
+        return lambda tables, obj: (obj[0],) in tables.predicates[name]
+    if len(types) != 2:
+        raise ValueError(f"{path}: only unary and binary predicates can be looked up")
+    target = types[1]
+
+    def value(tables, obj):
+        other = tables.pairs(name).get(obj[0])
+        i = tables.index.get(target, {}).get(other) if other is not None else None
+        if i is None:
+            return _missing(default, f"({name} {obj[0]} ?)")
+        return i
+    return value
+
+def _compile_each(model, spec, path):
+    type_name = spec["each"].lower()
+    record = compile_mapping(model, spec.get("record", "@index"), f"{path}.record")
+    return lambda tables, obj: [record(tables, (name, i)) for i, name in enumerate(tables.objects.get(type_name, ()))]
+
+def _compile_table(model, spec, path):
+    name = _declared(model.functions, spec["table"], "function", path)
+    types = model.functions[name]
+    key_format = spec.get("key", ",".join("{%d}" % i for i in range(len(types))))
+    cast = _CASTS[spec.get("type")]
+
+    def value(tables, obj):
+        result = {}
+        for args, v in tables.functions[name].items():
+            indices = tables.indices(args, types)
+            if indices is not None:
+                result[key_format.format(*indices)] = cast(v)
+        return result
+    return value
+
+def _compile_goal(model, spec, path):
+    name = _declared(model.predicates, spec["goal"], "predicate", path)
+    types = model.predicates[name]
+    first = spec.get("each", types[0]).lower() if types else None
+
+    def value(tables, obj):
+        result = []
+        for args in tables.goal_atoms[name]:
+            indices = tables.indices(args, [first] + types[1:])
+            if indices is not None:
+                result.append(indices)
+        return result
+    return value
+
+def _compile_goal_conditions(model, spec, path):
+    style = spec["goal_conditions"]
+    if style not in ("name", "index"):
+        raise ValueError(f"{path}: goal_conditions is 'name' or 'index'")
+
+    def side(tables, linear):
+        terms, constant = linear
+        if style == "name":
+            return {"terms": [[c, args[0]] for (_, args), c in terms.items()], "constant": constant}
+        return tables._linear_json(linear)
+
+    def value(tables, obj):
+        return [{"left": side(tables, left), "operator": op, "right": side(tables, right)}
+                for op, left, right in tables.goal_conditions]
+    return value
+
+def _compile_metric(model, spec, path):
+    name = _declared(model.functions, spec["metric"], "function", path)
+    default = spec.get("default", _NO_DEFAULT)
+
+    def value(tables, obj):
+        if tables.metric is None:
+            return _missing(default, "the metric")
+        return tables.metric[1][0].get((name, ()), 0)
+    return value
+
+_COMPILERS = {
+    "count": _compile_count,
+    "function": _compile_function,
+    "predicate": _compile_predicate,
+    "each": _compile_each,
+    "table": _compile_table,
+    "goal": _compile_goal,
+    "goal_conditions": _compile_goal_conditions,
+    "metric": _compile_metric
+}
+
+# ---------------------------------------------------------------------------
+
+_models = {}
+_mappings = {}
+
+def domains():
+    """Domains with a domain file and a mapping, i.e. the ones convert() supports."""
+    return [d for d in sorted(registry.DOMAINS)
+            if os.path.exists(registry.domain_dir(d, DOMAIN_FILE)) and os.path.exists(registry.domain_dir(d, MAPPING_FILE))]
+
+def load_model(domain):
+    """The DomainModel of a domain's domain.pddl (parsed once)."""
+    model = _models.get(domain)
+    if model is None:
+        with open(registry.domain_dir(domain, DOMAIN_FILE)) as f:
+            model = parse_domain(f.read())
+        _models[domain] = model
+    return model
+
+def load_mapping(domain):
+    """The compiled mapping.json of a domain (compiled once)."""
+    mapping = _mappings.get(domain)
+    if mapping is None:
+        path = registry.domain_dir(domain, MAPPING_FILE)
+        if not os.path.exists(path):
+            raise ValueError(f"No {MAPPING_FILE} for '{domain}'. Domains with one: {', '.join(domains())}")
+        with open(path) as f:
+            mapping = compile_mapping(load_model(domain), json.load(f))
+        _mappings[domain] = mapping
+    return mapping
+
+def tables(domain, pddl):
+    """The ProblemTables of a problem of a domain."""
+    return parse_problem(load_model(domain), pddl)
+
+def convert(domain, pddl):
+    """Converts a problem (str, bytes or buffer) into the layout of the domain's mapping."""
+    mapping = load_mapping(domain)
+    return mapping(tables(domain, pddl), None)
+
+def convert_path(domain, path):
+    with pddl_mmap.open_buffer(path) as buf:
+        return convert(domain, buf)
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert problems with the generic, domain-file driven converter")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    tables_parser = sub.add_parser("tables", help="Print the integer-indexed tables of problems")
+    tables_parser.add_argument("domain", choices=sorted(registry.DOMAINS), help="Domain of the problems")
+    tables_parser.add_argument("inputs", nargs="+", help="Directories, .pddl files or archives")
+
+    convert_parser = sub.add_parser("convert", help="Convert problems through the domain's mapping")
+    convert_parser.add_argument("domain", choices=sorted(registry.DOMAINS), help="Domain of the problems")
+    convert_parser.add_argument("inputs", nargs="+", help="Directories, .pddl files or archives")
+    convert_parser.add_argument("--output_dir", help="Directory for the JSON files (default: do not write)")
+    convert_parser.add_argument("--check", action="store_true",
+                                help="Compare every result with the domain's hand-written converter")
+    args = parser.parse_args()
+
+    if args.command == "tables":
+        for name, data in archives.iter_sources(args.inputs):
+            print(json.dumps({"file": name, "tables": tables(args.domain, data).to_json()}))
+        return
+    if args.output_dir:
+        try:
+            archives.check_outputs(args.inputs, args.domain)
+        except ValueError as e:
+            parser.error(str(e))
+        os.makedirs(args.output_dir, exist_ok=True)
+    count = 0
+    mismatched = 0
+    for name, data in archives.iter_sources(args.inputs):
+        result = convert(args.domain, data)
+        count += 1
+        if args.check:
+            from fix_domains import api
+            if json.dumps(result) != json.dumps(api.convert(args.domain, data)):
+                mismatched += 1
+                print(f"Differs from the hand-written converter: {name}")
+        if args.output_dir:
+            path = os.path.join(args.output_dir, registry.output_filename(args.domain, name))
+            output.write_problem(result, path, registry.DOMAINS[args.domain]["indent"])
+    print(f"Converted {count} problems" + (f" to {args.output_dir}" if args.output_dir else "")
+          + (f", {mismatched} differ from the hand-written converter" if args.check else ""))
+    if mismatched:
+        parser.exit(1)
+
+if __name__ == '__main__':
+    main()
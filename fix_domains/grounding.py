@@ -0,0 +1,565 @@
+#!/usr/bin/env python3
+"""
+Grounding of problems into compact action tables, for the domains with a domain.pddl.
+
+The planner grounds every action at startup, which for large counters instances
+takes longer than the search. Here each problem is grounded once, against the
+actions of the domain's domain.pddl (fix_domains.generic.parse_domain), and
+written as flat arrays the planner can load directly:
+
+  - the problem is read into the integer-indexed tables of fix_domains.generic
+  - predicates and functions that no action changes are static: their atoms and
+    values are folded into the ground actions as constants, and an action whose
+    static preconditions fail is never built; parameters are bound one at a
+    time and each static check runs as soon as its parameters are bound
+  - a numeric precondition whose fluents cancel out for a binding (e.g.
+    (> (value ?a) (value ?b)) with ?a = ?b) is a constant: the action is
+    never built if it is false, and the condition is dropped if it is true
+  - an action that uses a numeric fluent without an initial value is dropped
+  - relaxed reachability (ignoring delete effects and numeric conditions)
+    keeps only actions whose positive preconditions can all become true
+  - the remaining atoms are the boolean variables, the numeric fluents with an
+    initial value the numeric ones
+
+Output (<stem>.ground.json, compact, optionally compressed; see fix_domains.output):
+
+    {"format": "fix_domains-ground", "domain": name,
+     "variables": {"boolean": [atom, ...], "numeric": [fluent, ...]},
+     "initial": {"boolean": [true variable, ...], "numeric": [value, ...]},
+     "actions": {"names": [...], "pre_bool": B, "pre_num": N, "eff_bool": B, "eff_num": E},
+     "goal": {"bool": B, "num": N, "unreachable": bool},
+     "metric": {"direction", "vars", "coefs", "constant"} or null,
+     "stats": {"candidates", "static_pruned", "undefined", "unreachable", "actions"}}
+
+B, N and E are per-action lists stored back to back: the entries of action i
+are those from offsets[i] to offsets[i + 1].
+
+  B: {"offsets", "vars", "values"}                         variable == value (1 or 0)
+  N: {"offsets", "ops", "constants", "term_offsets", "vars", "coefs"}
+                                                           sum(coefs * x[vars]) + constant <op> 0
+  E: {"offsets", "targets", "constants", "term_offsets", "vars", "coefs"}
+                                                           x[target] := sum(coefs * x[vars]) + constant
+
+The terms of condition or effect j are those from term_offsets[j] to
+term_offsets[j + 1]. Numeric effects are computed from the state before the
+action (increase and decrease include their own target as a term). The goal
+uses the same layout for a single entry.
+
+Usage:
+    python -m fix_domains.grounding counters counters/problems_pddl --output_dir counters_ground
+    python -m fix_domains.grounding zenotravel_fuel_time "zenotravel_fuel&time_domain/problems_pddl" --output_dir zt_ground --compress gzip
+"""
+import os
+import math
+import time
+import argparse
+
+from fix_domains import registry
+from fix_domains import archives
+from fix_domains import output
+from fix_domains import generic
+
+FORMAT = "fix_domains-ground"
+GROUND_SUFFIX = ".ground.json"
+
+NUMERIC_EFFECTS = ("increase", "decrease", "assign")
+
+_COMPARE = {
+    "<=": lambda v: v <= 0,
+    "<": lambda v: v < 0,
+    ">=": lambda v: v >= 0,
+    ">": lambda v: v > 0,
+    "=": lambda v: v == 0
+}
+
+class _Undefined(Exception):
+    """A numeric fluent the action needs has no value."""
+
+class _Inapplicable(Exception):
+    """A numeric precondition whose fluents cancel out is false for the binding."""
+
+def _conjuncts(expr, what):
+    """Flattens nested (and ...) into a list of conjuncts."""
+    if not expr:
+        return []
+    if not isinstance(expr, list) or isinstance(expr[0], list):
+        raise ValueError(f"Bad {what}: {expr}")
+    if expr[0].lower() == "and":
+        return [c for part in expr[1:] for c in _conjuncts(part, what)]
+    return [expr]
+
+def _is_variable(token):
+    return isinstance(token, str) and token.startswith("?")
+
+def _variables(expr):
+    if isinstance(expr, list):
+        return {v for part in expr for v in _variables(part)}
+    return {expr.lower()} if _is_variable(expr) else set()
+
+class _Schema:
+    """An action of the domain, split into checks and effects once per domain."""
+
+    def __init__(self, model, action):
+        self.name = action.name
+        self.parameters = action.parameters
+        # (kind, data) with kind "atom": (predicate, args, positive), "eq": (a, b, positive),
+        # "num": (op, left, right)
+        self.conditions = []
+        for conjunct in _conjuncts(action.precondition, f"precondition of {action.name}"):
+            positive = True
+            if conjunct[0].lower() == "not":
+                positive = False
+                conjunct = conjunct[1]
+            head = conjunct[0].lower()
+            if head == "=" and not isinstance(conjunct[1], list) and not isinstance(conjunct[2], list) \
+                    and (_is_variable(conjunct[1]) or _is_variable(conjunct[2])):
+                self.conditions.append(("eq", (conjunct[1].lower(), conjunct[2].lower(), positive)))
+            elif head in model.predicates:
+                self.conditions.append(("atom", (head, [a.lower() for a in conjunct[1:]], positive)))
+            elif head in _COMPARE and positive:
+                self.conditions.append(("num", (head, conjunct[1], conjunct[2])))
+            else:
+                raise ValueError(f"Unsupported precondition in {action.name}: {conjunct}")
+        # (kind, data) with kind "add"/"del": (predicate, args), "num": (kind, function, args, expr)
+        self.effects = []
+        for conjunct in _conjuncts(action.effect, f"effect of {action.name}"):
+            head = conjunct[0].lower()
+            if head == "not" and isinstance(conjunct[1], list) and conjunct[1][0].lower() in model.predicates:
+                self.effects.append(("del", (conjunct[1][0].lower(), [a.lower() for a in conjunct[1][1:]])))
+            elif head in model.predicates:
+                self.effects.append(("add", (head, [a.lower() for a in conjunct[1:]])))
+            elif head in NUMERIC_EFFECTS:
+                target = conjunct[1]
+                self.effects.append(("num", (head, target[0].lower(), [a.lower() for a in target[1:]], conjunct[2])))
+            else:
+                raise ValueError(f"Unsupported effect in {action.name}: {conjunct}")
+
+    def changed(self):
+        """Predicates and functions this action changes."""
+        predicates = {data[0] for kind, data in self.effects if kind in ("add", "del")}
+        functions = {data[1] for kind, data in self.effects if kind == "num"}
+        return predicates, functions
+
+    def read(self, model):
+        """Functions whose values this action's conditions or effects depend on."""
+        exprs = [data[1:] for kind, data in self.conditions if kind == "num"]
+        exprs += [data[3:] for kind, data in self.effects if kind == "num"]
+        return {e[0].lower() for e in _subexpressions(exprs) if e and isinstance(e[0], str)} & set(model.functions)
+
+class Grounder:
+    """Grounds the problems of one domain; the domain's actions are analysed once."""
+
+    def __init__(self, model):
+        self.model = model
+        self.schemas = [_Schema(model, action) for action in model.actions]
+        self.fluent_predicates = set()
+        self.fluent_functions = set()
+        for schema in self.schemas:
+            predicates, functions = schema.changed()
+            self.fluent_predicates |= predicates
+            self.fluent_functions |= functions
+        # Fluents only ever increased or decreased, such as (total-cost), start at 0 when not in :init.
+        self.accumulators = self.fluent_functions - {f for schema in self.schemas for f in schema.read(model)}
+        self._plans = [(schema,) + self._plan(schema) for schema in self.schemas]
+
+    # -- numeric expressions ------------------------------------------------
+
+    def _compile(self, expr):
+        """
+        A function (binding, tables) -> ({(function, args): coefficient}, constant) for a
+        numeric expression of an action, with static fluents read from the tables as constants.
+        """
+        if not isinstance(expr, list):
+            if _is_variable(expr):
+                raise ValueError(f"Parameter {expr} used as a number")
+            constant = generic.linear_expression(self.model, expr)[1]
+            return lambda binding, tables: ({}, constant)
+        head = expr[0].lower() if expr and isinstance(expr[0], str) else None
+        if head in self.model.functions:
+            args = tuple(a.lower() if _is_variable(a) else a for a in expr[1:])
+            if head in self.fluent_functions:
+                return lambda binding, tables: ({(head, tuple(binding.get(a, a) for a in args)): 1}, 0)
+
+            def static(binding, tables):
+                key = tuple(binding.get(a, a) for a in args)
+                value = tables.functions[head].get(key)
+                if value is None:
+                    raise _Undefined(f"({head} {' '.join(key)})")
+                return {}, value
+            return static
+        if head is None:
+            raise ValueError(f"Bad numeric expression: {expr}")
+        operands = [self._compile(e) for e in expr[1:]]
+        return lambda binding, tables: generic.combine_linear(head, [f(binding, tables) for f in operands], expr)
+
+    def _compile_difference(self, left, right):
+        """A compiled left - right, without zero terms."""
+        compiled = self._compile(["-", left, right])
+
+        def difference(binding, tables):
+            terms, constant = compiled(binding, tables)
+            return {key: c for key, c in terms.items() if c != 0}, constant
+        return difference
+
+    # -- candidates -----------------------------------------------------------
+
+    def _plan(self, schema):
+        """
+        The schema split for grounding: static checks per parameter position (each
+        decidable once the parameters up to it are bound), fluent conditions and effects,
+        with numeric expressions compiled.
+        """
+        order = {var: i for i, (var, _) in enumerate(schema.parameters)}
+        checks = [[] for _ in schema.parameters] or [[]]
+        conditions = []
+        for kind, data in schema.conditions:
+            if kind == "atom" and data[0] in self.fluent_predicates:
+                conditions.append(("pos" if data[2] else "neg", data[0], data[1]))
+                continue
+            if kind == "num":
+                op, left, right = data
+                difference = self._compile_difference(left, right)
+                functions = {e[0].lower() for e in _subexpressions([left, right]) if e and isinstance(e[0], str)}
+                if functions & self.fluent_functions:
+                    conditions.append(("num", op, difference))
+                    continue
+                data = (op, difference)
+                variables = _variables([left, right])
+            else:
+                variables = _variables(list(data[:2]))
+            checks[max((order[v] for v in variables if v in order), default=0)].append((kind, data))
+        effects = []
+        for kind, data in schema.effects:
+            if kind == "num":
+                effect, function, args, expr = data
+                effects.append((kind, (effect, function, args, self._compile(expr))))
+            else:
+                effects.append((kind, data))
+        return checks, conditions, effects
+
+    @staticmethod
+    def _check(kind, data, binding, tables):
+        if kind == "eq":
+            a, b, positive = data
+            return (binding.get(a, a) == binding.get(b, b)) == positive
+        if kind == "atom":
+            predicate, args, positive = data
+            return (tuple(binding.get(a, a) for a in args) in tables.predicates[predicate]) == positive
+        op, difference = data
+        return _COMPARE[op](difference(binding, tables)[1])
+
+    def _bindings(self, schema, checks, tables):
+        """Parameter bindings that pass every static check."""
+        parameters = schema.parameters
+        binding = {}
+
+        def passes(depth):
+            try:
+                return all(self._check(kind, data, binding, tables) for kind, data in checks[depth])
+            except _Undefined:
+                return False
+
+        def extend(depth):
+            if depth == len(parameters):
+                yield dict(binding)
+                return
+            var, type_name = parameters[depth]
+            for obj in tables.objects.get(type_name, ()):
+                binding[var] = obj
+                if passes(depth):
+                    yield from extend(depth + 1)
+            binding.pop(var, None)
+
+        if not parameters:
+            if passes(0):
+                yield {}
+            return
+        yield from extend(0)
+
+    @staticmethod
+    def _instantiate(schema, conditions, effects, binding, tables):
+        """
+        The ground action for a binding, with fluent atoms and fluents as (name,
+        args) keys. Raises _Inapplicable if a numeric precondition is constant
+        and false; one that is constant and true is dropped.
+        """
+        action = {"name": " ".join([schema.name] + [binding[var] for var, _ in schema.parameters]),
+                  "pre_pos": [], "pre_neg": [], "pre_num": [], "add": [], "del": [], "eff_num": []}
+        for kind, name, data in conditions:
+            if kind == "num":
+                terms, constant = data(binding, tables)
+                if terms:
+                    action["pre_num"].append((name, terms, constant))
+                elif not _COMPARE[name](constant):
+                    # e.g. (> (value ?a) (value ?b)) with ?a = ?b: never applicable.
+                    raise _Inapplicable()
+            else:
+                action["pre_" + kind].append((name, tuple(binding.get(a, a) for a in data)))
+        for kind, data in effects:
+            if kind != "num":
+                action[kind].append((data[0], tuple(binding.get(a, a) for a in data[1])))
+                continue
+            effect, function, args, expr = data
+            target = (function, tuple(binding.get(a, a) for a in args))
+            terms, constant = expr(binding, tables)
+            if effect == "decrease":
+                terms = {key: -c for key, c in terms.items()}
+                constant = -constant
+            if effect != "assign":
+                terms = dict(terms)
+                terms[target] = terms.get(target, 0) + 1
+            action["eff_num"].append((target, terms, constant))
+        # Delete-then-add: an atom both added and deleted stays true.
+        if action["del"] and action["add"]:
+            action["del"] = [a for a in action["del"] if a not in action["add"]]
+        return action
+
+    # -- grounding ------------------------------------------------------------
+
+    def ground(self, tables):
+        """Grounds one problem's ProblemTables into the output structure."""
+        counts = {"candidates": 0, "static_pruned": 0, "undefined": 0, "unreachable": 0, "actions": 0}
+        numeric_init = {}
+        for function in self.model.functions:
+            if function in self.fluent_functions:
+                for args, value in tables.functions[function].items():
+                    numeric_init[(function, args)] = value
+        candidates = []
+        for schema, checks, conditions, effects in self._plans:
+            total = math.prod(len(tables.objects.get(t, ())) for _, t in schema.parameters)
+            counts["candidates"] += total
+            counts["static_pruned"] += total
+            for binding in self._bindings(schema, checks, tables):
+                counts["static_pruned"] -= 1
+                try:
+                    action = self._instantiate(schema, conditions, effects, binding, tables)
+                except _Undefined:
+                    counts["undefined"] += 1
+                    continue
+                except _Inapplicable:
+                    counts["static_pruned"] += 1
+                    continue
+                fluents = [key for _, terms, _ in action["pre_num"] for key in terms]
+                fluents += [key for target, terms, _ in action["eff_num"] for key in [target, *terms]]
+                for key in fluents:
+                    if key not in numeric_init and key[0] in self.accumulators:
+                        numeric_init[key] = 0
+                if any(key not in numeric_init for key in fluents):
+                    counts["undefined"] += 1
+                    continue
+                candidates.append(action)
+
+        reached = self._reachable(candidates, tables)
+        actions = [a for a in candidates if a["reachable"]]
+        counts["unreachable"] = len(candidates) - len(actions)
+        counts["actions"] = len(actions)
+
+        boolean = {key: i for i, key in enumerate(reached)}
+        numeric = {key: i for i, key in enumerate(numeric_init)}
+        result = {
+            "format": FORMAT,
+            "domain": self.model.name,
+            "variables": {
+                "boolean": [" ".join((p,) + args) for p, args in boolean],
+                "numeric": [" ".join((f,) + args) for f, args in numeric]
+            },
+            "initial": {
+                "boolean": [boolean[key] for key in reached if reached[key]],
+                "numeric": list(numeric_init.values())
+            },
+            "actions": _encode_actions(actions, boolean, numeric),
+            "goal": self._goal(tables, boolean, numeric),
+            "metric": self._metric(tables, numeric),
+            "stats": counts
+        }
+        return result
+
+    def _reachable(self, candidates, tables):
+        """
+        Marks candidates reachable under delete relaxation. Returns {atom: initially true}
+        for every fluent atom that is initially true or reachable, in that order.
+        """
+        reached = {}
+        for predicate in self.model.predicates:
+            if predicate in self.fluent_predicates:
+                for args in tables.predicates[predicate]:
+                    reached[(predicate, args)] = True
+        waiting = {}
+        queue = []
+        for action in candidates:
+            missing = {a for a in action["pre_pos"] if a not in reached}
+            action["missing"] = len(missing)
+            action["reachable"] = False
+            for a in missing:
+                waiting.setdefault(a, []).append(action)
+            if not missing:
+                queue.append(action)
+        while queue:
+            action = queue.pop()
+            action["reachable"] = True
+            for a in action["add"]:
+                if a not in reached:
+                    reached[a] = False
+                    for other in waiting.pop(a, ()):
+                        other["missing"] -= 1
+                        if other["missing"] == 0:
+                            queue.append(other)
+        return reached
+
+    def _goal(self, tables, boolean, numeric):
+        unreachable = False
+        bool_vars, bool_values = [], []
+        for predicate, atoms in tables.goal_atoms.items():
+            for args in atoms:
+                if predicate in self.fluent_predicates:
+                    if (predicate, args) in boolean:
+                        bool_vars.append(boolean[(predicate, args)])
+                        bool_values.append(1)
+                    else:
+                        unreachable = True
+                elif args not in tables.predicates[predicate]:
+                    unreachable = True
+        conditions = []
+        for op, left, right in tables.goal_conditions:
+            try:
+                terms, constant = _fold_statics(left, tables, self.fluent_functions, sign=1)
+                terms2, constant2 = _fold_statics(right, tables, self.fluent_functions, sign=-1)
+            except _Undefined:
+                unreachable = True
+                continue
+            for key, c in terms2.items():
+                terms[key] = terms.get(key, 0) + c
+            terms = {key: c for key, c in terms.items() if c != 0}
+            if any(key not in numeric for key in terms):
+                unreachable = True
+            elif terms:
+                conditions.append((op, terms, constant + constant2))
+            elif not _COMPARE[op](constant + constant2):
+                unreachable = True
+        return {
+            "bool": {"vars": bool_vars, "values": bool_values},
+            "num": _encode_linear_list([conditions], numeric, with_ops=True, with_offsets=False),
+            "unreachable": unreachable
+        }
+
+    def _metric(self, tables, numeric):
+        if tables.metric is None:
+            return None
+        direction, linear = tables.metric
+        try:
+            terms, constant = _fold_statics(linear, tables, self.fluent_functions, sign=1)
+        except _Undefined:
+            return None
+        terms = {key: c for key, c in terms.items() if key in numeric}
+        return {"direction": direction, "vars": [numeric[key] for key in terms],
+                "coefs": list(terms.values()), "constant": constant}
+
+def _subexpressions(exprs):
+    for expr in exprs:
+        if isinstance(expr, list):
+            yield expr
+            yield from _subexpressions(expr)
+
+def _fold_statics(linear, tables, fluent_functions, sign):
+    """A linear expression of generic's tables with the static fluents folded into the constant."""
+    terms, constant = linear
+    result = {}
+    constant = sign * constant
+    for (function, args), coefficient in terms.items():
+        if function in fluent_functions:
+            result[(function, args)] = result.get((function, args), 0) + sign * coefficient
+        else:
+            value = tables.functions[function].get(args)
+            if value is None:
+                raise _Undefined(f"({function} {' '.join(args)})")
+            constant += sign * coefficient * value
+    return result, constant
+
+def _encode_linear_list(per_action, numeric, with_ops, with_offsets=True):
+    """CSR layout of per-action lists of (op or target, terms, constant)."""
+    encoded = {"offsets": [0]} if with_offsets else {}
+    encoded.update({"ops" if with_ops else "targets": [], "constants": [], "term_offsets": [0], "vars": [], "coefs": []})
+    for entries in per_action:
+        for head, terms, constant in entries:
+            encoded["ops" if with_ops else "targets"].append(head if with_ops else numeric[head])
+            encoded["constants"].append(constant)
+            for key, coefficient in terms.items():
+                encoded["vars"].append(numeric[key])
+                encoded["coefs"].append(coefficient)
+            encoded["term_offsets"].append(len(encoded["vars"]))
+        if with_offsets:
+            encoded["offsets"].append(len(encoded["constants"]))
+    return encoded
+
+def _encode_actions(actions, boolean, numeric):
+    pre_bool = {"offsets": [0], "vars": [], "values": []}
+    eff_bool = {"offsets": [0], "vars": [], "values": []}
+    for action in actions:
+        for key in action["pre_pos"]:
+            pre_bool["vars"].append(boolean[key])
+            pre_bool["values"].append(1)
+        for key in action["pre_neg"]:
+            # An atom that can never become true satisfies the negation trivially.
+            if key in boolean:
+                pre_bool["vars"].append(boolean[key])
+                pre_bool["values"].append(0)
+        pre_bool["offsets"].append(len(pre_bool["vars"]))
+        for key in action["add"]:
+            eff_bool["vars"].append(boolean[key])
+            eff_bool["values"].append(1)
+        for key in action["del"]:
+            if key in boolean:
+                eff_bool["vars"].append(boolean[key])
+                eff_bool["values"].append(0)
+        eff_bool["offsets"].append(len(eff_bool["vars"]))
+    return {
+        "names": [action["name"] for action in actions],
+        "pre_bool": pre_bool,
+        "pre_num": _encode_linear_list([a["pre_num"] for a in actions], numeric, with_ops=True),
+        "eff_bool": eff_bool,
+        "eff_num": _encode_linear_list([a["eff_num"] for a in actions], numeric, with_ops=False)
+    }
+
+_grounders = {}
+
+def grounder(domain):
+    """The Grounder of a domain (its actions are analysed once)."""
+    g = _grounders.get(domain)
+    if g is None:
+        g = Grounder(generic.load_model(domain))
+        _grounders[domain] = g
+    return g
+
+def ground(domain, pddl):
+    """Grounds one problem (str, bytes or buffer) of a domain with a domain.pddl."""
+    return grounder(domain).ground(generic.tables(domain, pddl))
+
+def main():
+    domains = [d for d in sorted(registry.DOMAINS) if os.path.exists(registry.domain_dir(d, generic.DOMAIN_FILE))]
+    parser = argparse.ArgumentParser(description="Ground problems into compact action tables")
+    parser.add_argument("domain", choices=domains, help="Domain of the problems")
+    parser.add_argument("inputs", nargs="+", help="Directories, .pddl files or archives")
+    parser.add_argument("--output_dir", required=True, help="Directory for the ground tables")
+    parser.add_argument("--compress", choices=output.COMPRESSIONS, default="none", help="Compress the ground tables")
+    args = parser.parse_args()
+
+    output.check_compression(args.compress)
+    os.makedirs(args.output_dir, exist_ok=True)
+    count = 0
+    for name, data in archives.iter_sources(args.inputs):
+        start = time.perf_counter()
+        result = ground(args.domain, data)
+        elapsed = time.perf_counter() - start
+        stem = os.path.splitext(os.path.basename(name))[0]
+        path = output.output_path(os.path.join(args.output_dir, stem + GROUND_SUFFIX), args.compress)
+        output.write_problem(result, path, compact=True, compression=args.compress)
+        stats = result["stats"]
+        print(f"{name}: {stats['actions']} actions of {stats['candidates']} candidates "
+              f"({stats['static_pruned']} statically inapplicable, {stats['undefined']} with undefined fluents, "
+              f"{stats['unreachable']} unreachable) in {elapsed * 1000:.1f} ms"
+              + (" - goal unreachable" if result["goal"]["unreachable"] else ""))
+        count += 1
+    print(f"Grounded {count} problems to {args.output_dir}")
+
+if __name__ == '__main__':
+    main()
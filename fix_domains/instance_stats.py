@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+"""
+Per-instance size statistics and a per-directory manifest for job scheduling.
+
+The statistics are computed from the converted problem, so they come for free
+with a conversion (batch.py --manifest) and need no second parse:
+
+  objects              - object count per type (e.g. {"airplane": 3, "person": 9, "city": 6})
+  fluents              - numeric and boolean state values (derived tables excluded)
+  goal_size            - goal conditions / goal facts
+  graph_edges          - edges of the domain's map or network (roads, flights,
+                         reactions); 0 for domains without one
+  numeric_ranges       - [min, max] of every numeric field; list positions and
+                         object-named keys are collapsed, so e.g. all airplanes'
+                         fuel values share "state.airplanes[].fuel"
+  est_ground_actions   - number of ground actions the planner will instantiate,
+                         from the domain's action schemas and the object counts
+                         (an upper bound: static preconditions are not checked)
+  fingerprint          - renaming- and order-invariant problem fingerprint
+                         (see fix_domains.fingerprint); only when the PDDL is at
+                         hand and it is asked for, i.e. from source_stats(...,
+                         fingerprint=True) or with --fingerprint
+
+The manifest lists one row per instance, hardest first (by est_ground_actions,
+then fluents), as manifest.json and/or manifest.csv, so a scheduler can start
+the longest jobs first and bin-pack the rest across cores.
+
+Usage:
+    python -m fix_domains.instance_stats tpp tpp_problem/problems_pddl --output_dir tpp_problem/problems_json
+    python -m fix_domains.batch zenotravel_fuel archive.tar.xz --output_dir out --manifest json csv
+"""
+import os
+import csv
+import json
+import argparse
+
+from fix_domains import api
+from fix_domains import registry
+from fix_domains import archives
+from fix_domains import fingerprint as fingerprints
+
+MANIFEST_FORMATS = ("json", "csv")
+
+def _count_scalars(value):
+    """Numeric and boolean leaves of a structure (strings such as names are not fluents)."""
+    if isinstance(value, dict):
+        return sum(_count_scalars(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(_count_scalars(v) for v in value)
+    return 1 if isinstance(value, (int, float)) else 0
+
+def _is_object_key(key):
+    # Field names of the converters never contain digits; object names almost always do
+    # ("c0", "waypoint3", "0,1", "(-1,2)").
+    return any(ch.isdigit() for ch in key)
+
+def _collect_ranges(value, path, ranges):
+    if isinstance(value, dict):
+        for key, item in value.items():
+            key = str(key)
+            child = path + "{}" if _is_object_key(key) else (f"{path}.{key}" if path else key)
+            _collect_ranges(item, child, ranges)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            _collect_ranges(item, path + "[]", ranges)
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        bounds = ranges.get(path)
+        if bounds is None:
+            ranges[path] = [value, value]
+        elif value < bounds[0]:
+            bounds[0] = value
+        elif value > bounds[1]:
+            bounds[1] = value
+
+def numeric_ranges(problem):
+    """{field path: [min, max]} over every numeric value of a converted problem."""
+    ranges = {}
+    _collect_ranges(problem, "", ranges)
+    return dict(sorted(ranges.items()))
+
+# Per-domain metrics. Each function takes the converted problem and returns
+# (objects, fluents, goal_size, graph_edges, est_ground_actions).
+
+def _block_grouping(p):
+    blocks = len(p["state"]["blocks"])
+    # move-block-{up,down,left,right}
+    return {"block": blocks}, _count_scalars(p["state"]), 0, 0, 4 * blocks
+
+def _counters(p):
+    counters = len(p["state"]["counters"])
+    # increment, decrement
+    return {"counter": counters}, _count_scalars(p["state"]), len(p["problem"]["goal"]["conditions"]), 0, 2 * counters
+
+def _fo_counters(p):
+    counters = len(p["state"]["counters"])
+    # increment, decrement, increase_rate, decrement_rate
+    return {"counter": counters}, _count_scalars(p["state"]), len(p["problem"]["goal"]["conditions"]), 0, 4 * counters
+
+def _delivery(p):
+    state, problem = p["state"], p["problem"]
+    bots = len(state["bots"])
+    arms = sum(len(bot["arms"]) for bot in state["bots"])
+    items = len(state["items"])
+    rooms = len(problem["room_connections"])
+    edges = sum(len(v) for v in problem["room_connections"].values())
+    # pick and drop (arm x item x room), move (bot x connection)
+    actions = 2 * arms * items * rooms + bots * edges
+    objects = {"bot": bots, "arm": arms, "item": items, "room": rooms}
+    return objects, _count_scalars(state), len(problem["goal_locations"]), edges, actions
+
+def _drone(p):
+    state = p["state"]
+    locations = len(state["locations"])
+    # battery capacity, locations and bounds are static. six axis moves, recharge, visit-location per location
+    return {"location": locations}, _count_scalars(state) - 3 * locations - 7, locations, 0, 7 + locations
+
+def _expedition(p):
+    state, problem = p["state"], p["problem"]
+    sleds = len(state["sleds"])
+    waypoints = len(state["waypoint_supplies"])
+    edges = sum(len(v) for v in problem["waypoint_connections"].values())
+    # move (sled x connection), store and retrieve supplies (sled x waypoint)
+    actions = sleds * edges + 2 * sleds * waypoints
+    return {"sled": sleds, "waypoint": waypoints}, _count_scalars(state), len(problem["goal_locations"]), edges, actions
+
+def _ext_plant_watering(p):
+    state, problem = p["state"], p["problem"]
+    robots = len(state["robots"])
+    plants = len(state["plants"])
+    # eight moves, load, pour per plant
+    actions = robots * (9 + plants)
+    objects = {"robot": robots, "plant": plants, "tap": 1}
+    return objects, _count_scalars(state), len(problem["goal"]["conditions"]), 0, actions
+
+def _sailing_counts(state, goal):
+    boats = len(state["boats"])
+    persons = len(state["persons"])
+    # eight headings per boat, save-person (boat x person)
+    return {"boat": boats, "person": persons}, len(goal["saved_persons"]), boats * (8 + persons)
+
+def _fo_sailing(p):
+    objects, goal_size, actions = _sailing_counts(p["state"], p["problem"]["goal"])
+    return objects, _count_scalars(p["state"]), goal_size, 0, actions
+
+def _sailing(p):
+    objects, goal_size, actions = _sailing_counts(p, p["goal"])
+    return objects, _count_scalars(p["boats"]) + _count_scalars(p["persons"]), goal_size, 0, actions
+
+def _hydro(p):
+    steps = p["time_end"]
+    # demands are static; funds, stored units and the clock change. pump and generate per time step.
+    return {"timepoint": steps}, 3, 1, 0, 2 * steps
+
+def _pathways(p):
+    state, problem = p["state"], p["problem"]
+    simples = len(state["simples"])
+    complexes = len(state["complexes"])
+    reactions = {kind: len(problem[kind]) for kind in (
+        "association_reactions", "catalyzed_association_reactions",
+        "catalyzed_self_association_reactions", "synthesis_reactions")}
+    # reactant -> product edges: two per association, one per self-association or synthesis
+    edges = (2 * (reactions["association_reactions"] + reactions["catalyzed_association_reactions"])
+             + reactions["catalyzed_self_association_reactions"] + reactions["synthesis_reactions"])
+    # one action per reaction, choose and initialize per simple
+    actions = sum(reactions.values()) + 2 * simples
+    objects = {"simple": simples, "complex": complexes}
+    return objects, _count_scalars(state), len(problem["goal"]["conditions"]), edges, actions
+
+def _red_car(p):
+    state = p["state"]
+    rows, cols = state["grid"]["row_size"], state["grid"]["col_size"]
+    objects = {kind: len(state[kind]) for kind in ("horizontalcars", "verticalcars", "horizontaltrucks", "verticaltrucks")}
+    # each vehicle moves both ways along its axis, from every cell of it
+    horizontal = objects["horizontalcars"] + objects["horizontaltrucks"]
+    vertical = objects["verticalcars"] + objects["verticaltrucks"]
+    actions = 2 * (horizontal * cols + vertical * rows)
+    vehicles = horizontal + vertical
+    # the goal is the red car at the exit
+    return objects, 2 * vehicles, 1, 0, actions
+
+def _tpp(p):
+    state, problem = p["state"], p["problem"]
+    trucks = len(state["trucks"])
+    markets = len(state["markets"])
+    goods = len(state["items_bought"])
+    # distances hold both directions of each road
+    edges = len(problem["distances"]) // 2
+    # drive (truck x road direction), buy and load (truck x market x goods), unload (truck x goods)
+    actions = trucks * (2 * edges + 2 * markets * goods + goods)
+    objects = {"truck": trucks, "market": markets, "goods": goods, "depot": 1}
+    return objects, _count_scalars(state), len(problem["goal"]["goal_requests"]), edges, actions
+
+def _zenotravel(p):
+    state, problem = p["state"], p["problem"]
+    planes = len(state["airplanes"])
+    persons = len(state["persons"])
+    cities = state["num_cities"]
+    edges = sum(1 for key, distance in state["distances"].items() if distance and key.split(",")[0] != key.split(",")[1])
+    # fly-slow and fly-fast (plane x flight), board and debark (person x plane x city), refuel (plane x city)
+    actions = planes * (2 * edges + 2 * persons * cities + cities)
+    goal = problem["goal"]
+    fluents = _count_scalars(state) - _count_scalars(state["distances"])
+    objects = {"airplane": planes, "person": persons, "city": cities}
+    return objects, fluents, len(goal["airplanes"]) + len(goal["persons"]), edges, actions
+
+STATS = {
+    "block_grouping": _block_grouping,
+    "counters": _counters,
+    "delivery": _delivery,
+    "drone": _drone,
+    "expedition": _expedition,
+    "ext_plant_watering": _ext_plant_watering,
+    "fo_counters": _fo_counters,
+    "fo_sailing": _fo_sailing,
+    "hydro": _hydro,
+    "pathways": _pathways,
+    "red_car": _red_car,
+    "red_car_numeric": _red_car,
+    "sailing": _sailing,
+    "tpp": _tpp,
+    "zenotravel_fuel_time": _zenotravel,
+    "zenotravel_fuel": _zenotravel,
+    "zenotravel_time": _zenotravel
+}
+
+def instance_stats(domain, problem):
+    """Size statistics of one converted problem (see the module docstring)."""
+    if domain not in STATS:
+        raise ValueError(f"Unknown domain '{domain}'. Known domains: {', '.join(sorted(STATS))}")
+    objects, fluents, goal_size, edges, actions = STATS[domain](problem)
+    return {
+        "objects": objects,
+        "total_objects": sum(objects.values()),
+        "fluents": fluents,
+        "goal_size": goal_size,
+        "graph_edges": edges,
+        "est_ground_actions": actions,
+        "numeric_ranges": numeric_ranges(problem)
+    }
+
+def source_stats(domain, problem, pddl, fingerprint=False):
+    """
+    instance_stats() of a problem converted from pddl; with fingerprint, plus the
+    fingerprint of the PDDL. That is a second parse of the PDDL and costs several
+    times the conversion, so it is only taken when asked for.
+    """
+    stats = instance_stats(domain, problem)
+    if fingerprint:
+        stats["fingerprint"] = fingerprints.fingerprint(pddl)
+    return stats
+
+def manifest_rows(domain, entries):
+    """
+    Manifest rows for (instance name, output file, stats) entries, hardest first.
+    Instances that failed to convert (stats None) are left out.
+    """
+    rows = []
+    for name, output_file, stats in entries:
+        if stats is None:
+            continue
+        rows.append(dict({"instance": os.path.basename(name), "output": output_file, "domain": domain}, **stats))
+    rows.sort(key=lambda row: (-row["est_ground_actions"], -row["fluents"], registry.natural_key(row["instance"])))
+    for rank, row in enumerate(rows, 1):
+        row["rank"] = rank
+    return rows
+
+def _csv_row(row):
+    flat = {key: value for key, value in row.items() if key not in ("objects", "numeric_ranges")}
+    for kind, count in row["objects"].items():
+        flat[f"objects_{kind}"] = count
+    return flat
+
+def write_manifest(rows, output_dir, formats=MANIFEST_FORMATS):
+    """Writes manifest.json and/or manifest.csv to output_dir; returns the paths written."""
+    paths = []
+    os.makedirs(output_dir, exist_ok=True)
+    for fmt in formats:
+        if fmt not in MANIFEST_FORMATS:
+            raise ValueError(f"Unknown manifest format '{fmt}'. Known: {', '.join(MANIFEST_FORMATS)}")
+        path = os.path.join(output_dir, "manifest." + fmt)
+        if fmt == "json":
+            with open(path, 'w') as f:
+                json.dump(rows, f, indent=2)
+        else:
+            flat = [_csv_row(row) for row in rows]
+            fields = ["rank", "instance", "output", "domain", "est_ground_actions", "fluents", "goal_size",
+                      "graph_edges", "total_objects"]
+            for row in flat:
+                fields.extend(key for key in row if key not in fields)
+            with open(path, 'w', newline='') as f:
+                writer = csv.DictWriter(f, fieldnames=fields, restval=0)
+                writer.writeheader()
+                writer.writerows(flat)
+        paths.append(path)
+    return paths
+
+def main():
+    parser = argparse.ArgumentParser(description="Write a size-statistics manifest for PDDL problems of one domain")
+    parser.add_argument("domain", choices=sorted(registry.DOMAINS), help="Domain of the problems")
+    parser.add_argument("inputs", nargs="+", help="Directories, .pddl files or archives")
+    parser.add_argument("--output_dir", default=".", help="Directory for the manifest")
+    parser.add_argument("--formats", nargs="+", choices=MANIFEST_FORMATS, default=list(MANIFEST_FORMATS),
+                        help="Manifest formats")
+    parser.add_argument("--fingerprint", action="store_true", help="Also fingerprint every problem (a second parse)")
+    args = parser.parse_args()
+
+    entries = []
+    for name, data in archives.iter_sources(args.inputs):
+        stats = source_stats(args.domain, api.convert(args.domain, data), data, args.fingerprint)
+        entries.append((name, registry.output_filename(args.domain, name), stats))
+    rows = manifest_rows(args.domain, entries)
+    for path in write_manifest(rows, args.output_dir, args.formats):
+        print(f"Wrote {len(rows)} instances to {path}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Parse once, write many: a content-addressed cache of parsed problems.
+
+The intermediate representation is the parsed problem itself: plain dicts,
+lists and scalars, so writers need to know nothing about the domain. It is
+cached on disk as a pickle keyed by
+
+    sha256(format version, parsing modules, domain, converter source, PDDL bytes)
+
+so editing a converter, or the shared modules that drive it (api, pddl_mmap,
+fluent_converters, registry), invalidates its entries; bump FORMAT_VERSION
+when the shape of the cached problem changes for any other reason. Re-running over the same
+instances (or the same instance under another name) skips parsing entirely.
+One invocation fans each parsed problem out to every requested writer:
+
+    json       <name>.json        the domain's usual indented JSON
+    compact    <name>.json        minified JSON
+    gzip       <name>.json.gz     minified, gzip compressed
+    xz         <name>.json.xz     minified, xz compressed
+    stats      <name>.stats.json  the size statistics of fix_domains.instance_stats
+
+The cache holds pickles and is meant for a local, trusted directory only.
+
+Usage:
+    python -m fix_domains.ir_cache tpp tpp_problem/problems_pddl --formats json xz stats --output_dir out
+"""
+import os
+import json
+import pickle
+import hashlib
+import argparse
+import tempfile
+
+from fix_domains import api
+from fix_domains import registry
+from fix_domains import pddl_mmap
+from fix_domains import fluent_converters
+from fix_domains import archives
+from fix_domains import output
+from fix_domains import instance_stats
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "fix_domains", "ir")
+
+# Bump when the cached representation changes without any of the hashed sources changing.
+FORMAT_VERSION = 1
+
+# Modules every parse goes through besides the domain's own converter.
+_PARSING_MODULES = (api, registry, pddl_mmap, fluent_converters)
+
+_converter_digests = {}
+_parsing_digest = None
+
+def parsing_digest():
+    """Hash of the format version and the shared parsing modules; part of every cache key."""
+    global _parsing_digest
+    if _parsing_digest is None:
+        digest = hashlib.sha256(b"format %d\0" % FORMAT_VERSION)
+        for module in _PARSING_MODULES:
+            with open(module.__file__, 'rb') as f:
+                digest.update(hashlib.sha256(f.read()).digest())
+        _parsing_digest = digest.hexdigest()
+    return _parsing_digest
+
+def converter_digest(domain):
+    """Hash of the domain's converter source; part of every cache key."""
+    if domain not in _converter_digests:
+        info = registry.DOMAINS[domain]
+        with open(registry.domain_dir(domain, info["module"]), 'rb') as f:
+            _converter_digests[domain] = hashlib.sha256(f.read()).hexdigest()
+    return _converter_digests[domain]
+
+def content_key(domain, pddl_bytes):
+    digest = hashlib.sha256()
+    digest.update(parsing_digest().encode() + b"\0")
+    digest.update(domain.encode() + b"\0")
+    digest.update(converter_digest(domain).encode() + b"\0")
+    digest.update(pddl_bytes)
+    return digest.hexdigest()
+
+class IRCache:
+    """Directory of pickled parsed problems, two-level sharded by key."""
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR):
+        self.cache_dir = cache_dir
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], key + ".pickle")
+
+    def get(self, key):
+        """The cached problem, or None."""
+        try:
+            with open(self._path(key), 'rb') as f:
+                return pickle.load(f)
+        except Exception:
+            # Missing, truncated or stale entries (which can fail with AttributeError,
+            # ImportError, ...) are all just misses; the problem is parsed and stored again.
+            return None
+
+    def put(self, key, problem):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to a temporary file first so concurrent readers never see a partial entry.
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(problem, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+def parse_cached(domain, pddl_bytes, cache=None):
+    """Returns (problem, cache_hit). Without a cache this is a plain parse."""
+    if cache is None:
+        return api.convert(domain, pddl_bytes), False
+    key = content_key(domain, pddl_bytes)
+    problem = cache.get(key)
+    if problem is not None:
+        return problem, True
+    problem = api.convert(domain, pddl_bytes)
+    cache.put(key, problem)
+    return problem, False
+
+def _write_stats(domain, problem, path):
+    with open(path, 'w') as f:
+        json.dump(dict({"domain": domain}, **instance_stats.instance_stats(domain, problem)), f, indent=4)
+
+# Writer name -> (file suffix, function(domain, problem, path))
+WRITERS = {
+    "json": (".json", lambda domain, problem, path: output.write_problem(
+        problem, path, registry.DOMAINS[domain]["indent"])),
+    "compact": (".json", lambda domain, problem, path: output.write_problem(problem, path, compact=True)),
+    "gzip": (".json.gz", lambda domain, problem, path: output.write_problem(
+        problem, path, compact=True, compression="gzip")),
+    "xz": (".json.xz", lambda domain, problem, path: output.write_problem(
+        problem, path, compact=True, compression="xz")),
+    "stats": (".stats.json", _write_stats)
+}
+
+def emit(domain, problem, name, output_dir, formats):
+    """Writes one parsed problem with every requested writer; returns the paths written."""
+    stem = os.path.splitext(registry.output_filename(domain, name))[0]
+    paths = []
+    for fmt in formats:
+        suffix, writer = WRITERS[fmt]
+        # json and compact share a suffix; keep them apart when both are requested.
+        fmt_dir = os.path.join(output_dir, fmt) if len(formats) > 1 else output_dir
+        os.makedirs(fmt_dir, exist_ok=True)
+        path = os.path.join(fmt_dir, stem + suffix)
+        writer(domain, problem, path)
+        paths.append(path)
+    return paths
+
+def convert_sources(domain, inputs, output_dir, formats=("json",), cache=None):
+    """
+    Parses every problem in inputs (directories, files, archives) once, through
+    the cache, and emits it in every format. Returns an iterator of (name,
+    cache_hit, paths); unknown formats and colliding outputs raise ValueError
+    before anything is parsed.
+    """
+    for fmt in formats:
+        if fmt not in WRITERS:
+            raise ValueError(f"Unknown format '{fmt}'. Known formats: {', '.join(WRITERS)}")
+    archives.check_outputs(inputs, domain)
+    return _convert_sources(domain, archives.iter_sources(inputs), output_dir, formats, cache)
+
+def _convert_sources(domain, sources, output_dir, formats, cache):
+    for name, data in sources:
+        problem, hit = parse_cached(domain, data, cache)
+        yield name, hit, emit(domain, problem, name, output_dir, formats)
+
+def main():
+    parser = argparse.ArgumentParser(description="Parse problems once (with a content-hash cache) and write several formats")
+    parser.add_argument("domain", choices=sorted(registry.DOMAINS), help="Domain of the problems")
+    parser.add_argument("inputs", nargs="+", help="Directories, .pddl files or archives")
+    parser.add_argument("--formats", nargs="+", choices=list(WRITERS), default=["json"], help="Writers to run")
+    parser.add_argument("--output_dir", default="problems_json",
+                        help="Output directory (one subdirectory per format if several are given)")
+    parser.add_argument("--cache_dir", default=DEFAULT_CACHE_DIR, help="Cache directory")
+    parser.add_argument("--no_cache", action="store_true", help="Always parse, do not read or write the cache")
+    args = parser.parse_args()
+
+    cache = None if args.no_cache else IRCache(args.cache_dir)
+    count = 0
+    hits = 0
+    try:
+        results = convert_sources(args.domain, args.inputs, args.output_dir, args.formats, cache)
+    except ValueError as e:
+        parser.error(str(e))
+    for _, hit, _ in results:
+        count += 1
+        hits += hit
+    print(f"Wrote {count} problems in {len(args.formats)} format(s) to {args.output_dir} ({hits} cache hits)")
+
+if __name__ == '__main__':
+    main()
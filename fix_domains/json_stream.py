@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Incremental JSON writer for large converted problems.
+
+json.dumps is fast but builds the whole encoding as one string (the C encoder
+returns every chunk at once), while json.dump falls back to the pure-Python
+encoder and yields one tiny chunk per token. Here the structure is walked
+instead: objects are written key by key and arrays element by element, each
+element encoded with the C encoder and written in batches of bounded size.
+Arrays may also be given as iterators (generators, map, itertools.chain, ...),
+which are then written as they are produced. For a fully built problem this
+only saves the encoded string. The memory saving comes from producers that
+build elements on demand: convert_to_file reads large pathways files with
+the lazy builder (fix_domains.fluent_converters.LAZY), so its reaction arrays,
+nearly all of such an instance, are never held as dicts. Other domains,
+including tpp, whose bulk is in dicts, are still built in full before writing.
+
+Output is compact by default. With indent=N the bytes are identical to
+json.dump(value, f, indent=N) (indented encoding has no C implementation, so
+this mode is slower); in both modes json.load gives back the same value as for
+the regular converters' output.
+
+Usage:
+    python -m fix_domains.json_stream tpp generated/tpp/gen_100x.pddl --output_dir out
+    python -m fix_domains.json_stream pathways problems_pddl/*.pddl --output_dir out --indent 4
+"""
+import os
+import json
+import collections.abc
+import argparse
+
+from fix_domains import registry
+from fix_domains import pddl_mmap
+from fix_domains import pddl_stream
+from fix_domains import fluent_converters
+
+# Encoded array elements are collected up to about this many characters per write call.
+BATCH_CHARS = 64 * 1024
+
+def _encode_key(key):
+    # Same key coercion as the json module.
+    if isinstance(key, str):
+        return json.dumps(key)
+    if key is True or key is False or key is None or isinstance(key, (int, float)):
+        return json.dumps(json.dumps(key))
+    raise TypeError(f"keys must be str, int, float, bool or None, not {type(key).__name__}")
+
+def _is_lazy(value):
+    # Any iterator (generators, map, itertools.chain, iter(list), ...) is written as an array.
+    # str, bytes and dict are iterable but never iterators, so they are not caught here.
+    return isinstance(value, collections.abc.Iterator)
+
+def _materialize(value):
+    # Generators nested inside an array element are encoded with that element.
+    if _is_lazy(value):
+        return list(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+_COMPACT = json.JSONEncoder(separators=(',', ':'), default=_materialize)
+
+class _Writer:
+    def __init__(self, f, indent):
+        self.f = f
+        self.indent = indent
+        self.item_separator = ','
+        self.key_separator = ': ' if indent is not None else ':'
+
+    def newline(self, level):
+        return "" if self.indent is None else "\n" + " " * (self.indent * level)
+
+    def encode(self, value, level):
+        if self.indent is None:
+            return _COMPACT.encode(value)
+        # Nested lines of json.dumps start at column 0; shift them to the current level.
+        return json.dumps(value, indent=self.indent, default=_materialize).replace("\n", self.newline(level))
+
+    def write_value(self, value, level):
+        if isinstance(value, dict):
+            self.write_object(value, level)
+        elif _is_lazy(value) or isinstance(value, (list, tuple)):
+            self.write_array(value, level)
+        else:
+            self.f.write(self.encode(value, level))
+
+    def write_object(self, value, level):
+        if not value:
+            self.f.write("{}")
+            return
+        inner = self.newline(level + 1)
+        first = True
+        for key, item in value.items():
+            self.f.write(("{" if first else self.item_separator) + inner + _encode_key(key) + self.key_separator)
+            first = False
+            if isinstance(item, (dict, list, tuple)) or _is_lazy(item):
+                self.write_value(item, level + 1)
+            else:
+                self.f.write(self.encode(item, level + 1))
+        self.f.write(self.newline(level) + "}")
+
+    def write_array(self, value, level):
+        inner = self.newline(level + 1)
+        separator = self.item_separator + inner
+        started = False
+        batch = []
+        batch_chars = 0
+        for item in value:
+            if _is_lazy(item):
+                # A nested generator cannot be encoded in one piece; stream it too.
+                started = self._flush(batch, started, inner, separator)
+                batch = []
+                batch_chars = 0
+                self.f.write(separator if started else "[" + inner)
+                started = True
+                self.write_array(item, level + 1)
+                continue
+            encoded = self.encode(item, level + 1)
+            batch.append(encoded)
+            batch_chars += len(encoded)
+            if batch_chars >= BATCH_CHARS:
+                started = self._flush(batch, started, inner, separator)
+                batch = []
+                batch_chars = 0
+        started = self._flush(batch, started, inner, separator)
+        self.f.write(self.newline(level) + "]" if started else "[]")
+
+    def _flush(self, batch, started, inner, separator):
+        """Writes a batch of encoded elements; returns whether the array has been opened."""
+        if not batch:
+            return started
+        self.f.write((separator if started else "[" + inner) + separator.join(batch))
+        return True
+
+def dump(value, f, indent=None):
+    """Writes value as JSON to the text file object f, incrementally."""
+    _Writer(f, indent).write_value(value, 0)
+
+def dump_file(value, path, indent=None):
+    """Writes value as JSON to path, incrementally."""
+    with open(path, 'w') as f:
+        dump(value, f, indent)
+
+def convert_to_file(domain, pddl_path, json_path, indent=None):
+    """
+    Converts one problem and streams its JSON to json_path. Large files of
+    domains with a lazy builder are read incrementally and their largest
+    arrays written as they are built; other large tpp and pathways files are
+    read through the memory-mapped path.
+    """
+    if domain in fluent_converters.LAZY and os.path.getsize(pddl_path) >= pddl_mmap.MMAP_THRESHOLD:
+        problem = pddl_stream.convert_file(domain, pddl_path, lazy=True)
+    else:
+        problem = pddl_mmap.convert_path(domain, pddl_path)
+    dump_file(problem, json_path, indent)
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert PDDL problems, writing the JSON incrementally")
+    parser.add_argument("domain", choices=sorted(registry.DOMAINS), help="Domain of the problems")
+    parser.add_argument("inputs", nargs="+", help="PDDL problem files")
+    parser.add_argument("--output_dir", default="problems_json", help="Directory for the JSON files")
+    parser.add_argument("--indent", type=int, default=None,
+                        help="Indent the output like the regular converters (default: compact)")
+    args = parser.parse_args()
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    for path in args.inputs:
+        json_path = os.path.join(args.output_dir, registry.output_filename(args.domain, path))
+        convert_to_file(args.domain, path, json_path, args.indent)
+        print(f"Converted {path} -> {json_path}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+Section-selective loading: parse only the parts of a problem a tool needs.
+
+    from fix_domains.lazy import load
+    goal = load("tpp_problem/problems_pddl/pfile20.pddl", "tpp", sections={"goal"})
+    # {"problem": {"goal": {...}}}, equal to the full conversion's problem.goal
+
+Every output field of a domain belongs to one PDDL section (its home) and is
+computed from a few sections (its sources): e.g. zenotravel's goal needs
+:objects to turn names into indices. FIELDS lists both per domain. A source
+"init:<name>" stands for only the :init facts of that predicate or function:
+tpp's problem.goal belongs to :goal but is read from the (request ...) facts,
+so it is loaded without the rest of :init.
+
+load() finds all section boundaries in one scan of the file (memory-mapped,
+as in fix_domains.pddl_mmap), then runs the domain's own converter on a
+reduced problem made of the source sections of the requested fields, with the
+other sections left empty. The selected fields are therefore produced by the
+same code as a full conversion and are identical to it, while the expensive
+sections (usually :init) are skipped whenever the request allows it.
+
+Usage:
+    python -m fix_domains.lazy zenotravel_fuel zenotravel_fuel_problem/problems_pddl --sections goal objects
+"""
+import os
+import re
+import json
+import argparse
+
+from fix_domains import api
+from fix_domains import registry
+from fix_domains import archives
+from fix_domains import pddl_mmap
+
+SECTIONS = ("objects", "init", "goal", "metric")
+
+# Stand-ins for sections that are not needed, so converters still find their markers.
+_EMPTY = {
+    "objects": b"(:objects\n)\n",
+    "init": b"(:init\n)\n",
+    "goal": b"(:goal (and\n))\n"
+}
+
+_MARKER_RE = re.compile(rb'\(\s*:(objects|init|goal|metric)\b', re.IGNORECASE)
+
+def _f(home, *sources):
+    return home, frozenset(sources)
+
+# domain -> {output field: (home section, source sections)}; fields are "state.x",
+# "problem.y" or top-level keys for the domains without that split.
+FIELDS = {
+    "block_grouping": {
+        "state.blocks": _f("init", "objects", "init", "goal"),
+        "problem.grid": _f("init", "objects", "init")
+    },
+    "counters": {
+        "state.counters": _f("init", "init"),
+        "problem.goal": _f("goal", "goal", "init"),
+        "problem.max_value": _f("init", "init")
+    },
+    "delivery": {
+        "state.bots": _f("init", "init"),
+        "state.items": _f("init", "init"),
+        # Always 0 in the converter.
+        "state.cost": _f("init"),
+        "problem.goal_locations": _f("goal", "goal", "objects"),
+        "problem.room_connections": _f("init", "init")
+    },
+    "drone": {
+        "state.battery_level": _f("init", "init"),
+        "state.battery_capacity": _f("init", "init"),
+        "state.x": _f("init", "init"),
+        "state.y": _f("init", "init"),
+        "state.z": _f("init", "init"),
+        "state.visited": _f("init", "init"),
+        "state.locations": _f("init", "init"),
+        "state.bounds": _f("init", "init")
+    },
+    "expedition": {
+        "state.sleds": _f("init", "init"),
+        "state.waypoint_supplies": _f("init", "init"),
+        "problem.goal_locations": _f("goal", "goal"),
+        "problem.waypoint_connections": _f("init", "init"),
+        "problem.sled_capacity": _f("init", "init")
+    },
+    "ext_plant_watering": {
+        "state.robots": _f("init", "init"),
+        "state.plants": _f("init", "init"),
+        "state.tap": _f("init", "init"),
+        # Always 0 in the converter.
+        "state.total_poured": _f("init"),
+        "state.total_loaded": _f("init"),
+        "problem.goal": _f("goal", "goal"),
+        "problem.max_x": _f("init", "init"),
+        "problem.max_y": _f("init", "init"),
+        "problem.min_x": _f("init", "init"),
+        "problem.min_y": _f("init", "init")
+    },
+    "fo_counters": {
+        "state.counters": _f("init", "init"),
+        "problem.goal": _f("goal", "goal"),
+        "problem.max_value": _f("init", "init")
+    },
+    "fo_sailing": {
+        "state.boats": _f("init", "init"),
+        "state.persons": _f("init", "init"),
+        "problem.goal": _f("goal", "goal", "init")
+    },
+    "hydro": {
+        "funds": _f("init", "init"),
+        "goal_funds": _f("goal", "goal"),
+        "capacity": _f("init", "init"),
+        "time_end": _f("objects", "objects"),
+        "demands": _f("init", "objects", "init"),
+        "demand": _f("init", "objects", "init"),
+        "demand_prefix": _f("init", "objects", "init"),
+        "revenue_prefix": _f("init", "objects", "init"),
+        "revenue_suffix_max": _f("init", "objects", "init"),
+        "max_reachable_funds": _f("init", "objects", "init")
+    },
+    "pathways": {
+        "state.simples": _f("objects", "objects"),
+        "state.complexes": _f("objects", "objects"),
+        # Always 0 in the converter.
+        "state.num_subs": _f("init"),
+        "problem.goal": _f("goal", "goal"),
+        "problem.association_reactions": _f("init", "init"),
+        "problem.catalyzed_association_reactions": _f("init", "init"),
+        "problem.catalyzed_self_association_reactions": _f("init", "init"),
+        "problem.synthesis_reactions": _f("init", "init")
+    },
+    "red_car": {
+        # The grid size is read from the cube names anywhere in the problem.
+        "state.grid": _f("init", "objects", "init", "goal"),
+        "state.horizontalcars": _f("init", "init"),
+        "state.verticalcars": _f("init", "init"),
+        "state.horizontaltrucks": _f("init", "init"),
+        "state.verticaltrucks": _f("init", "init")
+    },
+    "red_car_numeric": {
+        "state.grid": _f("init", "init"),
+        "state.horizontalcars": _f("init", "objects", "init"),
+        "state.verticalcars": _f("init", "objects", "init"),
+        "state.horizontaltrucks": _f("init", "objects", "init"),
+        "state.verticaltrucks": _f("init", "objects", "init")
+    },
+    "sailing": {
+        "boats": _f("init", "init"),
+        "persons": _f("init", "init"),
+        "goal": _f("goal", "goal", "init")
+    },
+    "tpp": {
+        "state.trucks": _f("objects", "objects"),
+        "state.markets": _f("init", "objects", "init"),
+        "state.items_bought": _f("init", "init"),
+        "state.total_cost": _f("init", "init:total-cost"),
+        "problem.distances": _f("init", "init"),
+        # The requested amounts are (request ...) facts in :init.
+        "problem.goal": _f("goal", "init:request")
+    }
+}
+
+_ZENOTRAVEL = {
+    "state.num_cities": _f("objects", "objects"),
+    "state.airplanes": _f("init", "objects", "init"),
+    "state.distances": _f("init", "objects", "init"),
+    "state.persons": _f("init", "objects", "init"),
+    "state.total_fuel_used": _f("init", "init:total-fuel-used"),
+    "state.total_time": _f("init", "init:total-time"),
+    # The goal is cut at (:metric, so the metric must be present for the same result.
+    "problem.goal": _f("goal", "objects", "goal", "metric"),
+    "problem.minimize": _f("metric", "metric")
+}
+FIELDS["zenotravel_fuel_time"] = _ZENOTRAVEL
+FIELDS["zenotravel_time"] = _ZENOTRAVEL
+FIELDS["zenotravel_fuel"] = {field: spec for field, spec in _ZENOTRAVEL.items() if field != "state.total_time"}
+
+def section_spans(buf):
+    """
+    {section: (start, end)} for every section present, found in a single scan.
+    Sections end at the next marker, as in pddl_mmap.section_span.
+    """
+    markers = []
+    for m in _MARKER_RE.finditer(buf):
+        if not pddl_mmap.in_comment(buf, m.start()):
+            markers.append((m.start(), m.group(1).decode().lower()))
+    spans = {}
+    for i, (start, name) in enumerate(markers):
+        if name in spans:
+            continue
+        end = len(buf)
+        for next_start, next_name in markers[i + 1:]:
+            if next_name in pddl_mmap.SECTION_END.get(name, ()):
+                end = next_start
+                break
+        spans[name] = (start, end)
+    return spans
+
+def filtered_init(buf, span, names):
+    """An :init section holding only the facts of the given predicates or functions."""
+    alternatives = b"|".join(re.escape(name.encode()) for name in sorted(names))
+    fact_re = re.compile(rb'\(\s*=\s*\(\s*(?:' + alternatives + rb')(?:\s[^()]*)?\)\s*[^()\s]+\s*\)'
+                         rb'|\(\s*(?:' + alternatives + rb')(?:\s[^()]*)?\)', re.IGNORECASE)
+    start, end = span
+    has_comments = buf.find(b';', start, end) != -1
+    facts = [m.group(0) for m in fact_re.finditer(buf, start, end)
+             if not (has_comments and pddl_mmap.in_comment(buf, m.start()))]
+    return b"(:init\n" + b"\n".join(facts) + b"\n)\n"
+
+def reduced_problem(buf, spans, keep, init_facts=None):
+    """
+    The problem text with only the sections in keep; the others are empty. If
+    init_facts is given and "init" is not kept, :init holds only the facts of
+    those predicates or functions.
+    """
+    first = min((span[0] for span in spans.values()), default=len(buf))
+    parts = [bytes(buf[:first])]
+    for name in SECTIONS:
+        span = spans.get(name)
+        if span is None:
+            continue
+        if name in keep:
+            parts.append(bytes(buf[span[0]:span[1]]))
+        elif name == "init" and init_facts:
+            parts.append(filtered_init(buf, span, init_facts))
+        elif name in _EMPTY:
+            parts.append(_EMPTY[name])
+    # A kept last section brings the closing parenthesis of (define ...) along; otherwise add it.
+    last = max(spans, key=lambda name: spans[name][0], default=None)
+    if last not in keep:
+        parts.append(b")\n")
+    return b"".join(parts)
+
+def select_fields(domain, sections=None, fields=None):
+    """Output fields to produce: those whose home is in sections, plus any listed in fields."""
+    table = FIELDS[domain]
+    selected = []
+    for field, (home, _) in table.items():
+        if (sections is not None and home in sections) or (fields is not None and field in fields):
+            selected.append(field)
+    if fields is not None:
+        unknown = set(fields) - set(table)
+        if unknown:
+            raise ValueError(f"Unknown fields for {domain}: {', '.join(sorted(unknown))}. "
+                             f"Known: {', '.join(table)}")
+    return selected
+
+def _get(problem, field):
+    value = problem
+    for part in field.split("."):
+        value = value[part]
+    return value
+
+def _put(result, field, value):
+    parts = field.split(".")
+    for part in parts[:-1]:
+        result = result.setdefault(part, {})
+    result[parts[-1]] = value
+
+def load_buffer(buf, domain, sections=None, fields=None):
+    """load() for a PDDL problem already in memory (bytes, mmap or str)."""
+    if domain not in FIELDS:
+        raise ValueError(f"Unknown domain '{domain}'. Known domains: {', '.join(sorted(FIELDS))}")
+    if sections is not None:
+        unknown = set(sections) - set(SECTIONS)
+        if unknown:
+            raise ValueError(f"Unknown sections: {', '.join(sorted(unknown))}. Known: {', '.join(SECTIONS)}")
+    if isinstance(buf, str):
+        buf = buf.encode()
+    selected = select_fields(domain, sections, fields)
+    if not selected:
+        return {}
+    keep = set()
+    init_facts = set()
+    for field in selected:
+        for source in FIELDS[domain][field][1]:
+            if source.startswith("init:"):
+                init_facts.add(source[len("init:"):])
+            else:
+                keep.add(source)
+    spans = section_spans(buf)
+    problem = api.converter(domain)(reduced_problem(buf, spans, keep, init_facts).decode())
+    result = {}
+    for field in selected:
+        _put(result, field, _get(problem, field))
+    return result
+
+def load(path, domain, sections=None, fields=None):
+    """
+    Loads only part of a PDDL problem: the output fields whose home section is
+    in sections (e.g. {"goal"}) and/or the fields named in fields (e.g.
+    ["state.num_cities"]). The result has the nesting of the full conversion
+    and each selected field equals the full conversion's.
+    """
+    with pddl_mmap.open_buffer(path) as buf:
+        return load_buffer(buf, domain, sections, fields)
+
+def main():
+    parser = argparse.ArgumentParser(description="Load selected sections of PDDL problems as JSON lines")
+    parser.add_argument("domain", choices=sorted(FIELDS), help="Domain of the problems")
+    parser.add_argument("inputs", nargs="+", help="Directories or .pddl files")
+    parser.add_argument("--sections", nargs="*", choices=SECTIONS, help="Sections whose fields to load")
+    parser.add_argument("--fields", nargs="*", help="Individual output fields to load, e.g. state.num_cities")
+    args = parser.parse_args()
+    if args.sections is None and args.fields is None:
+        parser.error("give --sections and/or --fields")
+
+    for path in args.inputs:
+        # Problem directories may ship their domain.pddl; skip it as archives does.
+        files = ([f for f in registry.problem_files(args.domain, path) if archives.is_problem_member(f)]
+                 if os.path.isdir(path) else [path])
+        for file in files:
+            result = load(file, args.domain, args.sections, args.fields)
+            print(json.dumps({"file": file, "data": result}))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,167 @@
+"""
+Output formats for converted problems: indented or compact JSON, optionally
+compressed, and a loader that reads any of them back.
+
+  compact      - no whitespace (separators ',' and ':'), written incrementally
+                 with fix_domains.json_stream; otherwise the domain's usual indent
+  compression  - "none", "gzip" (.json.gz), "xz" (.json.xz) or "zstd" (.json.zst);
+                 zstd needs the optional `zstandard` package, the others use the
+                 standard library
+
+load_problem() recognizes the compression from the file's magic bytes, and
+delta files (fix_domains.delta) by their content, so consumers do not need to
+know how a file was written.
+"""
+import io
+import os
+import json
+import gzip
+import lzma
+
+from fix_domains import registry
+from fix_domains import json_stream
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+SUFFIXES = {
+    "none": "",
+    "gzip": ".gz",
+    "xz": ".xz",
+    "zstd": ".zst"
+}
+
+COMPRESSIONS = tuple(SUFFIXES)
+
+# Files the tools write next to the problems in an output directory: manifests
+# (instance_stats), failure lists (batch), delta bases (delta), and the stats
+# and ground tables of ir_cache and grounding.
+_OTHER_PREFIXES = ("manifest.", "failures.", "base.")
+_OTHER_SUFFIXES = (".stats.json", ".ground.json")
+
+_MAGIC = {
+    b"\x1f\x8b": "gzip",
+    b"\xfd7zXZ\x00": "xz",
+    b"\x28\xb5\x2f\xfd": "zstd"
+}
+
+def check_compression(compression):
+    """Raises if a compression is unknown or its optional package is missing."""
+    if compression not in SUFFIXES:
+        raise ValueError(f"Unknown compression '{compression}'. Known: {', '.join(COMPRESSIONS)}")
+    if compression == "zstd" and zstandard is None:
+        raise RuntimeError("zstd compression needs the 'zstandard' package (pip install zstandard)")
+
+def output_path(path, compression="none"):
+    """Adds the suffix of the compression to a .json path."""
+    return path + SUFFIXES[compression]
+
+def open_text(path, mode, compression="none"):
+    """Opens path for text reading ('r') or writing ('w') through the given compression."""
+    if compression == "none":
+        return open(path, mode)
+    if compression == "gzip":
+        return gzip.open(path, mode + 't')
+    if compression == "xz":
+        return lzma.open(path, mode + 't')
+    check_compression(compression)
+    return zstandard.open(path, mode + 't')
+
+def _current_umask():
+    mask = os.umask(0)
+    os.umask(mask)
+    return mask
+
+# Read once: os.umask can only be queried by setting it, which is not thread-safe.
+_UMASK = _current_umask()
+
+def set_default_mode(path):
+    """
+    Gives a file the permissions open() would have created it with. Temporary
+    files from tempfile.mkstemp are 0600, and os.replace keeps that mode, so
+    outputs written through them would otherwise be readable by their owner only.
+    """
+    os.chmod(path, 0o666 & ~_UMASK)
+
+def write_problem(result, path, indent=4, compact=False, compression="none"):
+    """
+    Writes a converted problem to path (the compression suffix is not added
+    here; see output_path). Compact output is streamed; indented output is
+    byte-identical to the regular converters' json.dump.
+    """
+    with open_text(path, 'w', compression) as f:
+        if compact:
+            json_stream.dump(result, f)
+        else:
+            json.dump(result, f, indent=indent)
+
+def dumps_problem(result, indent=4, compact=True, compression="none"):
+    """Encodes a converted problem as bytes in the given format (the in-memory counterpart of write_problem)."""
+    if compact:
+        data = json.dumps(result, separators=(',', ':')).encode()
+    else:
+        data = json.dumps(result, indent=indent).encode()
+    if compression == "gzip":
+        return gzip.compress(data)
+    if compression == "xz":
+        return lzma.compress(data)
+    if compression == "zstd":
+        check_compression(compression)
+        return zstandard.ZstdCompressor().compress(data)
+    check_compression(compression)
+    return data
+
+def is_problem_file(name):
+    """Whether a file name in an output directory is that of a converted problem (any output format)."""
+    for suffix in SUFFIXES.values():
+        if suffix and name.endswith(suffix):
+            name = name[:-len(suffix)]
+            break
+    return name.endswith(".json") and not name.startswith(_OTHER_PREFIXES) and not name.endswith(_OTHER_SUFFIXES)
+
+def problem_files(inputs):
+    """Converted problem files among inputs: files as given, directories listed in natural order."""
+    paths = []
+    for path in inputs:
+        if os.path.isdir(path):
+            paths.extend(os.path.join(path, f) for f in sorted(os.listdir(path), key=registry.natural_key)
+                         if is_problem_file(f))
+        else:
+            paths.append(path)
+    return paths
+
+def detect_compression(path):
+    """Compression of a file from its magic bytes ("none" for plain JSON)."""
+    with open(path, 'rb') as f:
+        head = f.read(6)
+    for magic, compression in _MAGIC.items():
+        if head.startswith(magic):
+            return compression
+    return "none"
+
+def load_problem(path):
+    """Loads a converted problem written in any of the output formats."""
+    with open_text(path, 'r', detect_compression(path)) as f:
+        data = json.load(f)
+    if isinstance(data, dict) and "delta_of" in data:
+        # Imported here: fix_domains.delta builds on this module.
+        from fix_domains import delta
+        if delta.is_delta(data):
+            return delta.reconstruct(data, path)
+    return data
+
+def loads_problem(data):
+    """Same as load_problem for the bytes of such a file."""
+    for magic, compression in _MAGIC.items():
+        if data.startswith(magic):
+            if compression == "gzip":
+                data = gzip.decompress(data)
+            elif compression == "xz":
+                data = lzma.decompress(data)
+            else:
+                check_compression(compression)
+                data = zstandard.ZstdDecompressor().stream_reader(io.BytesIO(data)).read()
+            break
+    return json.loads(data)
@@ -0,0 +1,167 @@
+"""
+Memory-mapped, bytes-level input path for large PDDL problems.
+
+The regular converters read the whole file into a str, strip comments into a
+second copy and slice the :init section into a third. Here the file is
+memory-mapped instead and everything works on byte offsets into the map:
+
+  - section boundaries are found with regex searches on the map,
+  - fluents are matched directly off the map (re accepts any buffer),
+  - comments are skipped lazily: a match is dropped if a ';' precedes it on
+    its line, so no comment-free copy of the file is ever built.
+
+Only the small matched groups are materialized, so peak memory stays close to
+the size of the converted structures. Files below MMAP_THRESHOLD, and domains
+without a fluent-based builder, go through the regular converter.
+"""
+import os
+import re
+import mmap
+import contextlib
+
+from fix_domains import registry
+from fix_domains import fluent_converters
+
+# Files smaller than this are converted with the regular str-based converter.
+MMAP_THRESHOLD = 8 * 1024 * 1024
+
+# (= (name arg ...) value) or (name arg ...). Group 1-3: assignment, group 4-5: atom.
+# Values may have a fraction, a leading or trailing '.' and an exponent (-2, 0.5,
+# .5, 5., 1e3, 1.5E-2). A value the pattern missed would not just be lost: the
+# inner (name arg ...) would then be matched as an atom.
+FLUENT_RE = re.compile(
+    rb'\(\s*=\s*\(\s*([^\s()]+)([^()]*)\)\s*(-?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)\s*\)'
+    rb'|\(\s*([^\s():=][^\s()]*)([^()]*)\)'
+)
+
+SECTION_RE = {
+    "objects": re.compile(rb'\(\s*:objects', re.IGNORECASE),
+    "init": re.compile(rb'\(\s*:init', re.IGNORECASE),
+    "goal": re.compile(rb'\(\s*:goal', re.IGNORECASE),
+    "metric": re.compile(rb'\(\s*:metric', re.IGNORECASE)
+}
+
+# Each section runs until the next of these markers (the converters use the same convention).
+SECTION_END = {
+    "objects": ("init", "goal"),
+    "init": ("goal",),
+    "goal": ("metric",)
+}
+
+@contextlib.contextmanager
+def open_buffer(path):
+    """
+    Yields a read-only buffer over the file: an mmap, or plain bytes for empty
+    files (which cannot be mapped).
+    """
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            yield b""
+            return
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            yield mapped
+        finally:
+            mapped.close()
+
+def in_comment(buf, pos):
+    """True if pos lies after a ';' on its line."""
+    line_start = buf.rfind(b'\n', 0, pos) + 1
+    return buf.find(b';', line_start, pos) != -1
+
+def find_marker(buf, name, start=0, end=None):
+    """Offset of the first (:<name> marker outside comments, or -1."""
+    end = len(buf) if end is None else end
+    pos = start
+    while True:
+        m = SECTION_RE[name].search(buf, pos, end)
+        if m is None:
+            return -1
+        if not in_comment(buf, m.start()):
+            return m.start()
+        pos = m.end()
+
+def section_span(buf, name):
+    """
+    Returns (start, end) offsets of a section: from its (:<name> marker up to the
+    next section marker (or the end of the file). Returns None if absent.
+    """
+    start = find_marker(buf, name)
+    if start == -1:
+        return None
+    end = len(buf)
+    for next_name in SECTION_END.get(name, ()):
+        pos = find_marker(buf, next_name, start + 1)
+        if pos != -1:
+            end = min(end, pos)
+    return start, end
+
+def section_text(buf, name):
+    """Decoded text of a (small) section with comment lines removed, or "" if absent."""
+    span = section_span(buf, name)
+    if span is None:
+        return ""
+    text = bytes(buf[span[0]:span[1]]).decode()
+    return "\n".join(line.split(";", 1)[0] for line in text.splitlines())
+
+def iter_fluents(buf, span):
+    """
+    Yields the fluents of a section as records:
+        ("assignment", name, args, value)   for (= (name arg ...) value)
+        ("atom", name, args)                for (name arg ...)
+    name and args are str, args is a tuple and value is the number as written.
+    """
+    start, end = span
+    # Comments are rare inside :init, so the per-match check only runs if there is one.
+    has_comments = buf.find(b';', start, end) != -1
+    # The section marker itself, e.g. "(:init", never matches: ':' is excluded from atom names.
+    for m in FLUENT_RE.finditer(buf, start, end):
+        if has_comments and in_comment(buf, m.start()):
+            continue
+        name, args, value, atom_name, atom_args = m.groups()
+        if name is not None:
+            yield ("assignment", name.decode(), tuple(args.decode().split()), value.decode())
+        else:
+            yield ("atom", atom_name.decode(), tuple(atom_args.decode().split()))
+
+def iter_objects(buf, span):
+    """Yields (name, type) pairs from a typed :objects list."""
+    start, end = span
+    return objects_from_text(bytes(buf[start:end]).decode())
+
+def objects_from_text(text):
+    """Yields (name, type) pairs from the text of an :objects section."""
+    text = "\n".join(line.split(";", 1)[0] for line in text.splitlines())
+    text = re.sub(r'^\s*\(\s*:objects', '', text, flags=re.IGNORECASE).replace("(", " ").replace(")", " ")
+    pending = []
+    tokens = iter(text.split())
+    for token in tokens:
+        if token == "-":
+            type_name = next(tokens, "object")
+            for name in pending:
+                yield name, type_name
+            pending = []
+        else:
+            pending.append(token)
+    for name in pending:
+        yield name, "object"
+
+def convert_buffer(domain, buf):
+    """Converts a mapped problem with the fluent-based builder of the domain."""
+    objects_span = section_span(buf, "objects")
+    init_span = section_span(buf, "init")
+    objects = list(iter_objects(buf, objects_span)) if objects_span else []
+    fluents = iter_fluents(buf, init_span) if init_span else iter(())
+    return fluent_converters.BUILDERS[domain](objects, fluents, lambda: section_text(buf, "goal"))
+
+def convert_path(domain, path, threshold=MMAP_THRESHOLD):
+    """
+    Converts a PDDL file, memory-mapping it when it is at least `threshold`
+    bytes and the domain has a fluent-based builder; otherwise falls back to the
+    domain's regular converter.
+    """
+    if domain in fluent_converters.BUILDERS and os.path.getsize(path) >= threshold:
+        with open_buffer(path) as buf:
+            return convert_buffer(domain, buf)
+    with open(path, 'r') as f:
+        return registry.get_parser(domain)(f.read())
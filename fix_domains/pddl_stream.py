@@ -0,0 +1,142 @@
+"""
+Streaming reader for PDDL problems: the :init section is read incrementally
+and yielded as fluent records while the file is still being read.
+
+The file is read in fixed-size chunks. Everything before (:init is kept (it
+holds :objects, which every builder needs up front); inside :init only the
+unprocessed tail of the current chunk is carried over. A chunk is cut at the
+last line break where the parenthesis depth is back at the :init level, so no
+fluent is ever split between two chunks, and the complete part is scanned with
+the same regex and record format as the memory-mapped path:
+
+    ("assignment", name, args, value)   for (= (name arg ...) value)
+    ("atom", name, args)                for (name arg ...)
+
+The goal comes after :init in the file, so it is read last. Domains with a
+fluent-based builder (fix_domains.fluent_converters) can be converted straight
+from the stream; memory then stays bounded by the chunk size plus the
+structures being built.
+
+Parentheses inside comments within :init are not expected (none of the domains
+write them); they would only make chunks larger, as a cut is then never found
+before the end of the section.
+"""
+from fix_domains import fluent_converters
+from fix_domains.pddl_mmap import find_marker, section_span, section_text, iter_fluents, iter_objects
+
+CHUNK_SIZE = 1024 * 1024
+
+class ProblemStream:
+    """
+    Incremental view of one PDDL problem read from a binary file object.
+
+    objects is available right after construction; fluents() yields the :init
+    records once; goal_text() returns the :goal section and is meant to be
+    called after the fluents have been consumed (it drains them otherwise).
+    """
+
+    def __init__(self, f, chunk_size=CHUNK_SIZE):
+        self._f = f
+        self._chunk_size = chunk_size
+        self._buf = b""
+        self._eof = False
+        self._fluents_done = False
+        self._goal = None
+        self.objects = self._read_objects()
+
+    def _read_chunk(self):
+        chunk = self._f.read(self._chunk_size)
+        if not chunk:
+            self._eof = True
+            return False
+        self._buf += chunk
+        return True
+
+    def _read_objects(self):
+        # Read up to (:init; a marker split between two chunks is found once the next one arrives.
+        while True:
+            pos = find_marker(self._buf, "init")
+            if pos != -1 or not self._read_chunk():
+                break
+        if pos == -1:
+            # No :init at all: everything is header, there are no fluents.
+            pos = len(self._buf)
+            self._fluents_done = True
+        header, self._buf = self._buf[:pos], self._buf[pos:]
+        span = section_span(header, "objects")
+        return list(iter_objects(header, span)) if span else []
+
+    def _safe_cut(self, depth_at_start):
+        """
+        Last line break in the buffer at which every fluent before it is
+        complete (depth back at 1, i.e. inside :init only), or 0 if none.
+        """
+        buf = self._buf
+        cut = len(buf)
+        depth = depth_at_start + buf.count(b'(') - buf.count(b')')
+        # Walk back line by line, only counting the parentheses of the lines skipped.
+        while True:
+            prev = buf.rfind(b'\n', 0, cut)
+            if prev == -1:
+                return 0
+            depth -= buf.count(b'(', prev, cut) - buf.count(b')', prev, cut)
+            cut = prev
+            if depth == 1:
+                return cut
+
+    def fluents(self):
+        """Yields the :init records in file order, reading the file as it goes."""
+        if self._fluents_done:
+            return
+        # The buffer starts at "(:init", so the depth before it is 0.
+        depth_at_start = 0
+        while True:
+            goal = find_marker(self._buf, "goal")
+            if goal != -1 or self._eof:
+                end = goal if goal != -1 else len(self._buf)
+                yield from iter_fluents(self._buf, (0, end))
+                self._buf = self._buf[end:]
+                break
+            cut = self._safe_cut(depth_at_start)
+            if cut:
+                yield from iter_fluents(self._buf, (0, cut))
+                self._buf = self._buf[cut:]
+                depth_at_start = 1
+            self._read_chunk()
+        self._fluents_done = True
+
+    def goal_text(self):
+        """Text of the :goal section with comment lines removed, or "" if absent."""
+        if self._goal is None:
+            if not self._fluents_done:
+                for _ in self.fluents():
+                    pass
+            while self._read_chunk():
+                pass
+            self._goal = section_text(self._buf, "goal")
+        return self._goal
+
+def iter_init_fluents(path, chunk_size=CHUNK_SIZE):
+    """Yields the :init records of a PDDL file, reading it incrementally."""
+    with open(path, 'rb') as f:
+        yield from ProblemStream(f, chunk_size).fluents()
+
+def convert_stream(domain, f, chunk_size=CHUNK_SIZE, lazy=False):
+    """
+    Converts a problem read from a binary file object with the domain's
+    fluent-based builder. lazy is passed on to builders that support it (see
+    fluent_converters.LAZY) and ignored for the others.
+    """
+    if domain not in fluent_converters.BUILDERS:
+        raise ValueError(f"Domain '{domain}' has no fluent-based builder. "
+                         f"Streaming is available for: {', '.join(sorted(fluent_converters.BUILDERS))}")
+    stream = ProblemStream(f, chunk_size)
+    builder = fluent_converters.BUILDERS[domain]
+    if lazy and domain in fluent_converters.LAZY:
+        return builder(stream.objects, stream.fluents(), stream.goal_text, lazy=True)
+    return builder(stream.objects, stream.fluents(), stream.goal_text)
+
+def convert_file(domain, path, chunk_size=CHUNK_SIZE, lazy=False):
+    """Converts a PDDL file incrementally; see convert_stream."""
+    with open(path, 'rb') as f:
+        return convert_stream(domain, f, chunk_size, lazy)
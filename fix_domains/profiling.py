@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+"""
+Opt-in per-stage profiling of the domain converters.
+
+The converter scripts are not modified. Instead, a private copy of each
+converter module is instrumented: every function defined in it is wrapped with
+a timer (so stages such as remove_comments, extract_section, parse_init or
+parse_market_items show up under their own names) and the module's `re` is
+replaced by a proxy that counts regex matches. The driver adds the stages
+around the parse: read, parse, serialize and (optionally) write.
+
+Per file, one JSON line is written with:
+  - stages: calls, total and self time of every stage (self excludes nested stages)
+  - counters: bytes_read, regex_matches, diagnostic_lines (lines the converter
+    printed, e.g. unmatched object lines), objects_emitted, values_emitted,
+    output_bytes
+
+Usage:
+    python -m fix_domains.profiling run --domains tpp pathways --output profile.jsonl
+    python -m fix_domains.profiling report profile.jsonl
+"""
+import os
+import io
+import re
+import json
+import time
+import inspect
+import argparse
+import functools
+import contextlib
+
+from fix_domains import registry
+
+class Profiler:
+    """Collects nested stage timings and named counters for one conversion."""
+
+    def __init__(self):
+        self.stages = {}
+        self.counters = {}
+        self._stack = []
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        # Each stack entry keeps [name, start, time spent in nested stages].
+        entry = [name, time.perf_counter(), 0.0]
+        self._stack.append(entry)
+        try:
+            yield
+        finally:
+            self._stack.pop()
+            elapsed = time.perf_counter() - entry[1]
+            stats = self.stages.setdefault(name, {"calls": 0, "total_s": 0.0, "self_s": 0.0})
+            stats["calls"] += 1
+            # Recursive calls (e.g. union-find's find) would be counted twice in total_s.
+            if not any(e[0] == name for e in self._stack):
+                stats["total_s"] += elapsed
+            stats["self_s"] += elapsed - entry[2]
+            if self._stack:
+                self._stack[-1][2] += elapsed
+
+    def count(self, name, amount=1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+class _Current:
+    """Holds the profiler of the conversion currently running; None outside profile_file()."""
+    profiler = None
+
+def _count_matches(amount):
+    if _Current.profiler is not None and amount:
+        _Current.profiler.count("regex_matches", amount)
+
+def _counting_iter(matches):
+    for m in matches:
+        _count_matches(1)
+        yield m
+
+class _CountingPattern:
+    """Wraps a compiled pattern and counts the matches it produces."""
+
+    def __init__(self, pattern):
+        self._pattern = pattern
+
+    def __getattr__(self, name):
+        return getattr(self._pattern, name)
+
+    def search(self, *args, **kwargs):
+        m = self._pattern.search(*args, **kwargs)
+        _count_matches(m is not None)
+        return m
+
+    def match(self, *args, **kwargs):
+        m = self._pattern.match(*args, **kwargs)
+        _count_matches(m is not None)
+        return m
+
+    def fullmatch(self, *args, **kwargs):
+        m = self._pattern.fullmatch(*args, **kwargs)
+        _count_matches(m is not None)
+        return m
+
+    def findall(self, *args, **kwargs):
+        found = self._pattern.findall(*args, **kwargs)
+        _count_matches(len(found))
+        return found
+
+    def finditer(self, *args, **kwargs):
+        return _counting_iter(self._pattern.finditer(*args, **kwargs))
+
+    def sub(self, repl, string, count=0):
+        result, n = self._pattern.subn(repl, string, count)
+        _count_matches(n)
+        return result
+
+class _CountingRe:
+    """Stand-in for the `re` module inside an instrumented converter."""
+
+    def __getattr__(self, name):
+        return getattr(re, name)
+
+    def compile(self, pattern, flags=0):
+        return _CountingPattern(re.compile(pattern, flags))
+
+    def search(self, pattern, string, flags=0):
+        return self.compile(pattern, flags).search(string)
+
+    def match(self, pattern, string, flags=0):
+        return self.compile(pattern, flags).match(string)
+
+    def fullmatch(self, pattern, string, flags=0):
+        return self.compile(pattern, flags).fullmatch(string)
+
+    def findall(self, pattern, string, flags=0):
+        return self.compile(pattern, flags).findall(string)
+
+    def finditer(self, pattern, string, flags=0):
+        return self.compile(pattern, flags).finditer(string)
+
+    def sub(self, pattern, repl, string, count=0, flags=0):
+        return self.compile(pattern, flags).sub(repl, string, count)
+
+def _timed(name, func):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if _Current.profiler is None:
+            return func(*args, **kwargs)
+        with _Current.profiler.stage(name):
+            return func(*args, **kwargs)
+    return wrapper
+
+_instrumented_modules = {}
+
+def instrumented_converter(domain):
+    """Returns a private copy of a domain's converter with every function timed and `re` counted."""
+    if domain not in _instrumented_modules:
+        module = registry.import_converter(domain)
+        for name, obj in list(vars(module).items()):
+            if inspect.isfunction(obj) and obj.__module__ == module.__name__:
+                setattr(module, name, _timed(name, obj))
+        if getattr(module, "re", None) is re:
+            module.re = _CountingRe()
+        _instrumented_modules[domain] = module
+    return _instrumented_modules[domain]
+
+def count_emitted(value):
+    """Returns (objects, values): JSON objects and scalar leaves in a converted structure."""
+    if isinstance(value, dict):
+        objects, values = 1, 0
+        for item in value.values():
+            o, v = count_emitted(item)
+            objects += o
+            values += v
+        return objects, values
+    if isinstance(value, (list, tuple)):
+        objects, values = 0, 0
+        for item in value:
+            o, v = count_emitted(item)
+            objects += o
+            values += v
+        return objects, values
+    return 0, 1
+
+def profile_file(domain, path, output_dir=None):
+    """
+    Converts one file under the profiler and returns its record (one JSON line).
+    If output_dir is given the JSON is also written there, so the write stage is measured.
+    """
+    module = instrumented_converter(domain)
+    parse = getattr(module, registry.DOMAINS[domain]["parse"])
+    indent = registry.DOMAINS[domain]["indent"]
+    profiler = Profiler()
+    record = {"domain": domain, "file": path, "error": None}
+    _Current.profiler = profiler
+    try:
+        with profiler.stage("total"):
+            with profiler.stage("read"):
+                with open(path, 'r') as f:
+                    text = f.read()
+            profiler.count("bytes_read", len(text.encode()))
+            printed = io.StringIO()
+            with profiler.stage("parse"), contextlib.redirect_stdout(printed):
+                result = parse(text)
+            profiler.count("diagnostic_lines", len(printed.getvalue().splitlines()))
+            with profiler.stage("serialize"):
+                output = json.dumps(result, indent=indent)
+            profiler.count("output_bytes", len(output))
+            if output_dir is not None:
+                with profiler.stage("write"):
+                    os.makedirs(output_dir, exist_ok=True)
+                    with open(os.path.join(output_dir, registry.output_filename(domain, path)), 'w') as f:
+                        f.write(output)
+        objects, values = count_emitted(result)
+        profiler.count("objects_emitted", objects)
+        profiler.count("values_emitted", values)
+    except Exception as e:
+        record["error"] = f"{type(e).__name__}: {e}"
+    finally:
+        _Current.profiler = None
+    record["stages"] = profiler.stages
+    record["counters"] = profiler.counters
+    return record
+
+def run(domains, output_path, extra_dirs=(), output_dir=None):
+    """Profiles every problem file of the given domains and appends JSON lines to output_path."""
+    count = 0
+    with open(output_path, 'a') as out:
+        for domain in domains:
+            dirs = [None] + [os.path.join(d, domain) for d in extra_dirs if os.path.isdir(os.path.join(d, domain))]
+            for input_dir in dirs:
+                for path in registry.problem_files(domain, input_dir):
+                    domain_output = os.path.join(output_dir, domain) if output_dir else None
+                    record = profile_file(domain, path, domain_output)
+                    out.write(json.dumps(record) + "\n")
+                    count += 1
+    return count
+
+def load_records(paths):
+    records = []
+    for path in paths:
+        with open(path) as f:
+            for line in f:
+                if line.strip():
+                    records.append(json.loads(line))
+    return records
+
+def aggregate(records):
+    """
+    Sums stage times and counters per domain. Returns
+    {domain: {"files", "errors", "stages": {name: {...}}, "counters": {...}}}.
+    """
+    report = {}
+    for record in records:
+        entry = report.setdefault(record["domain"], {"files": 0, "errors": 0, "stages": {}, "counters": {}})
+        entry["files"] += 1
+        if record.get("error"):
+            entry["errors"] += 1
+        for name, stats in record["stages"].items():
+            total = entry["stages"].setdefault(name, {"calls": 0, "total_s": 0.0, "self_s": 0.0})
+            for key in total:
+                total[key] += stats[key]
+        for name, value in record["counters"].items():
+            entry["counters"][name] = entry["counters"].get(name, 0) + value
+    return report
+
+def print_report(report, top=5):
+    """Prints the hot spots (stages with the largest self time) of every domain."""
+    for domain in sorted(report, key=lambda d: -report[d]["stages"].get("total", {}).get("total_s", 0)):
+        entry = report[domain]
+        stages = entry["stages"]
+        total = stages.get("total", {}).get("total_s", 0.0)
+        counters = entry["counters"]
+        print(f"{domain}: {entry['files']} files, {total * 1000:.1f} ms, "
+              f"{counters.get('bytes_read', 0) / 1024:.1f} KB read, "
+              f"{counters.get('regex_matches', 0)} regex matches, "
+              f"{counters.get('objects_emitted', 0)} objects emitted, "
+              f"{counters.get('diagnostic_lines', 0)} diagnostic lines"
+              + (f", {entry['errors']} errors" if entry["errors"] else ""))
+        hot = sorted((item for item in stages.items() if item[0] != "total"), key=lambda item: -item[1]["self_s"])
+        for name, stats in hot[:top]:
+            share = 100 * stats["self_s"] / total if total else 0
+            print(f"    {name:<45}{stats['self_s'] * 1000:>10.2f} ms self {share:>6.1f}%"
+                  f"{stats['total_s'] * 1000:>10.2f} ms total {stats['calls']:>8} calls")
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-stage profiling of the PDDL to JSON converters")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = sub.add_parser("run", help="Profile conversions and write JSON lines")
+    run_parser.add_argument("--domains", nargs="*", help="Domains to profile (default: all)")
+    run_parser.add_argument("--extra_dir", action="append", default=[],
+                            help="Directory with <domain>/*.pddl instances to profile as well (repeatable)")
+    run_parser.add_argument("--output_dir", help="Also write the converted JSON here (measures the write stage)")
+    run_parser.add_argument("--output", default="profile.jsonl", help="JSON lines file to append to")
+
+    report_parser = sub.add_parser("report", help="Aggregate JSON lines into a per-domain hot-spot report")
+    report_parser.add_argument("inputs", nargs="+", help="JSON lines files written by 'run'")
+    report_parser.add_argument("--top", type=int, default=5, help="Stages to show per domain")
+    report_parser.add_argument("--json", help="Also write the aggregated report as JSON")
+
+    args = parser.parse_args()
+    if args.command == "run":
+        count = run(args.domains or sorted(registry.DOMAINS), args.output, args.extra_dir, args.output_dir)
+        print(f"Profiled {count} files -> {args.output}")
+    else:
+        report = aggregate(load_records(args.inputs))
+        print_report(report, args.top)
+        if args.json:
+            with open(args.json, 'w') as f:
+                json.dump(report, f, indent=2)
+
+if __name__ == '__main__':
+    main()
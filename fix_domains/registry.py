@@ -0,0 +1,187 @@
+import os
+import re
+import importlib.util
+
+# Root of the repository (the directory holding one folder per domain).
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# One entry per domain:
+#   directory   - domain folder under REPO_ROOT
+#   module      - converter script inside that folder
+#   parse       - function of the converter taking the PDDL text and returning the JSON dict
+#   output_name - output file name; {stem} is the PDDL file name without extension,
+#                 {num} is the first number in it (pfile12.pddl -> 12)
+#   indent      - json.dump indent used by the converter
+DOMAINS = {
+    "block_grouping": {
+        "directory": "block_grouping",
+        "module": "convertor.py",
+        "parse": "parse_pddl",
+        "output_name": "{stem}.json",
+        "indent": 4
+    },
+    "counters": {
+        "directory": "counters",
+        "module": "convertor.py",
+        "parse": "parse_pddl",
+        "output_name": "{stem}.json",
+        "indent": 4
+    },
+    "delivery": {
+        "directory": "delivery",
+        "module": "converter.py",
+        "parse": "convert_pddl_to_json",
+        "output_name": "{stem}.json",
+        "indent": 4
+    },
+    "drone": {
+        "directory": "drone",
+        "module": "converter.py",
+        "parse": "convert_pddl_to_json",
+        "output_name": "problem{num}.json",
+        "indent": 4
+    },
+    "expedition": {
+        "directory": "expedition",
+        "module": "converter.py",
+        "parse": "convert_pddl_to_json",
+        "output_name": "{stem}.json",
+        "indent": 4
+    },
+    "ext_plant_watering": {
+        "directory": "ext_plant_watering_problem",
+        "module": "convertor.py",
+        "parse": "parse_pddl",
+        "output_name": "{stem}.json",
+        "indent": 4
+    },
+    "fo_counters": {
+        "directory": "fo_counters",
+        "module": "convertor.py",
+        "parse": "parse_pddl",
+        "output_name": "{stem}.json",
+        "indent": 4
+    },
+    "fo_sailing": {
+        "directory": "fo_sailing_problem",
+        "module": "convertor.py",
+        "parse": "convert_pddl_to_json",
+        "output_name": "{stem}.json",
+        "indent": 4
+    },
+    "hydro": {
+        "directory": "hydro",
+        "module": "convertor.py",
+        "parse": "pddl_to_json",
+        "output_name": "Problem{num}.json",
+        "indent": 2
+    },
+    "pathways": {
+        "directory": "path_ways_metric_problem",
+        "module": "convertor.py",
+        "parse": "convert_pddl_to_json",
+        "output_name": "{stem}.json",
+        "indent": 4
+    },
+    "red_car": {
+        "directory": "red_car_problem",
+        "module": "convertor.py",
+        "parse": "parse_pddl",
+        "output_name": "pfile{num}.json",
+        "indent": 4
+    },
+    "red_car_numeric": {
+        "directory": "red_car_numeric",
+        "module": "convertor.py",
+        "parse": "build_state_json",
+        "output_name": "{stem}.json",
+        "indent": 4
+    },
+    "sailing": {
+        "directory": "sailing",
+        "module": "convertor.py",
+        "parse": "convert_pddl_to_json",
+        "output_name": "{stem}.json",
+        "indent": 4
+    },
+    "tpp": {
+        "directory": "tpp_problem",
+        "module": "convertor.py",
+        "parse": "parse_pddl",
+        "output_name": "{stem}.json",
+        "indent": 4
+    },
+    "zenotravel_fuel_time": {
+        "directory": "zenotravel_fuel&time_domain",
+        "module": "convertor.py",
+        "parse": "convert_pddl_text_to_json",
+        "output_name": "{stem}.json",
+        "indent": 2
+    },
+    "zenotravel_fuel": {
+        "directory": "zenotravel_fuel_problem",
+        "module": "convertor.py",
+        "parse": "convert_pddl_text_to_json",
+        "output_name": "{stem}.json",
+        "indent": 2
+    },
+    "zenotravel_time": {
+        "directory": "zenotravel_time_problem",
+        "module": "convertor.py",
+        "parse": "convert_pddl_text_to_json",
+        "output_name": "{stem}.json",
+        "indent": 2
+    }
+}
+
+_loaded_modules = {}
+
+def load_converter(domain):
+    """
+    Imports the converter script of a domain and returns the module.
+    The domain folders are not Python packages (some names are not even valid
+    identifiers), so the scripts are loaded by file path and cached.
+    """
+    if domain not in _loaded_modules:
+        _loaded_modules[domain] = import_converter(domain)
+    return _loaded_modules[domain]
+
+def import_converter(domain):
+    """
+    Imports a fresh, uncached copy of a domain's converter script. Used by tools
+    that patch the module (e.g. profiling) so the shared copy stays untouched.
+    """
+    if domain not in DOMAINS:
+        raise ValueError(f"Unknown domain '{domain}'. Known domains: {', '.join(sorted(DOMAINS))}")
+    info = DOMAINS[domain]
+    path = os.path.join(REPO_ROOT, info["directory"], info["module"])
+    spec = importlib.util.spec_from_file_location(f"fix_domains_converter_{domain}", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def get_parser(domain):
+    """Returns the text -> dict conversion function of a domain."""
+    return getattr(load_converter(domain), DOMAINS[domain]["parse"])
+
+def domain_dir(domain, *parts):
+    """Absolute path of a domain folder (or of a path inside it)."""
+    return os.path.join(REPO_ROOT, DOMAINS[domain]["directory"], *parts)
+
+def problem_files(domain, input_dir=None):
+    """Sorted list of the .pddl files of a domain (by default its problems_pddl folder)."""
+    if input_dir is None:
+        input_dir = domain_dir(domain, "problems_pddl")
+    files = [os.path.join(input_dir, f) for f in os.listdir(input_dir) if f.endswith(".pddl")]
+    return sorted(files, key=natural_key)
+
+def natural_key(path):
+    """Sort key that orders pfile2 before pfile10."""
+    return [int(tok) if tok.isdigit() else tok for tok in re.split(r'(\d+)', os.path.basename(path))]
+
+def output_filename(domain, pddl_filename):
+    """Name of the JSON file the converter of a domain writes for a given PDDL file."""
+    stem = os.path.splitext(os.path.basename(pddl_filename))[0]
+    m = re.search(r'\d+', stem)
+    num = m.group(0) if m else stem
+    return DOMAINS[domain]["output_name"].format(stem=stem, num=num)
@@ -0,0 +1,709 @@
+#!/usr/bin/env python3
+"""
+Per-domain schemas of converted problems, compiled into fast validators.
+
+The converters can emit structurally wrong data without failing: hydro writes
+null for a missing (funds), zenotravel fills missing airplane fields with 0,
+red car falls back to a 6x6 grid when it finds no cubes. Such files are only
+noticed when the planner's serde deserialization or search fails after the job
+was queued. SCHEMAS mirrors, per domain, the Rust state/problem structs the
+converters write for:
+
+  Int(min, max), Float(min, max)   i64 / f64 fields (a Float also takes integers,
+                                   never NaN or infinity); bool is not a number
+  BOOL, STR / Str(pattern)         bool and String fields
+  List(item), Tuple(*items)        Vec<T> and fixed tuples such as (i32, String)
+  Record({key: spec})              a struct: every key required, no other keys
+  Map(value, key)                  HashMap keyed by strings matching the key
+                                   pattern (integer keys of a Python dict count
+                                   as their decimal form)
+
+Every schema is compiled once into Python source with one straight-line check
+per field (see compile_schema), so a validation is a single pass without
+interpretation overhead. After the structure, CHECKS adds the cross-field
+constraints of the domain: positions inside grids and bounds, indices and names
+that must refer to existing objects, prefix arrays of the right length.
+
+validate() returns the list of problems ("path: message"), empty for a valid
+problem; check() raises SchemaError. batch.py --validate runs it inline on
+every conversion and does not write invalid outputs.
+
+Usage:
+    python -m fix_domains.schema zenotravel_fuel zenotravel_fuel_problem/problems_json
+    python -m fix_domains.schema red_car out/red_car_json --json report.json
+"""
+import re
+import json
+import time
+import argparse
+
+from fix_domains import output
+
+# Problems shown per invalid file by the CLI and in SchemaError messages.
+SHOWN_ERRORS = 5
+
+class SchemaError(ValueError):
+    """A converted problem does not match its domain's schema; errors lists every problem found."""
+
+    def __init__(self, domain, errors):
+        self.domain = domain
+        self.errors = errors
+        shown = "; ".join(errors[:SHOWN_ERRORS])
+        more = f" (and {len(errors) - SHOWN_ERRORS} more)" if len(errors) > SHOWN_ERRORS else ""
+        plural = "s" if len(errors) != 1 else ""
+        super().__init__(f"{len(errors)} {domain} schema violation{plural}: {shown}{more}")
+
+# ---------------------------------------------------------------------------
+# Specs. Each one emits the source that checks the value held in a variable.
+
+class _Compiler:
+    """Accumulates the lines of a generated validator."""
+
+    def __init__(self):
+        self.lines = []
+        self.constants = {}
+        self._names = 0
+
+    def name(self, prefix):
+        self._names += 1
+        return f"{prefix}{self._names}"
+
+    def constant(self, value):
+        name = self.name("_c")
+        self.constants[name] = value
+        return name
+
+    def emit(self, depth, line):
+        self.lines.append("    " * depth + line)
+
+    def error(self, depth, path, message):
+        # path is the body of an f-string; message may use {v} placeholders too.
+        self.emit(depth, f'errors.append(f"{path}: {message}")')
+
+def _static(text):
+    """Path text for use inside a generated f-string."""
+    return text.replace("\\", "\\\\").replace('"', '\\"').replace("{", "{{").replace("}", "}}")
+
+def _join(path, key):
+    return f"{path}.{key}" if path else key
+
+class Spec:
+    def emit(self, c, depth, var, path):
+        raise NotImplementedError
+
+class Int(Spec):
+    def __init__(self, min=None, max=None):
+        self.min = min
+        self.max = max
+
+    def emit(self, c, depth, var, path):
+        c.emit(depth, f"if type({var}) is not int:")
+        c.error(depth + 1, path, f"expected an integer, got {{_kind({var})}}")
+        _emit_range(c, depth, var, path, self.min, self.max)
+
+class Float(Spec):
+    def __init__(self, min=None, max=None):
+        self.min = min
+        self.max = max
+
+    def emit(self, c, depth, var, path):
+        c.emit(depth, f"if type({var}) is not float and type({var}) is not int:")
+        c.error(depth + 1, path, f"expected a number, got {{_kind({var})}}")
+        # x - x is 0 for every integer and finite float, NaN for NaN and infinities.
+        c.emit(depth, f"elif {var} - {var} != 0:")
+        c.error(depth + 1, path, f"{{{var}}} is not a finite number")
+        _emit_range(c, depth, var, path, self.min, self.max)
+
+def _emit_range(c, depth, var, path, low, high):
+    if low is not None:
+        c.emit(depth, f"elif {var} < {low!r}:")
+        c.error(depth + 1, path, f"{{{var}}} is below the minimum {low}")
+    if high is not None:
+        c.emit(depth, f"elif {var} > {high!r}:")
+        c.error(depth + 1, path, f"{{{var}}} is above the maximum {high}")
+
+class _Bool(Spec):
+    def emit(self, c, depth, var, path):
+        c.emit(depth, f"if type({var}) is not bool:")
+        c.error(depth + 1, path, f"expected a boolean, got {{_kind({var})}}")
+
+class Str(Spec):
+    def __init__(self, pattern=None):
+        self.pattern = pattern
+
+    def emit(self, c, depth, var, path):
+        c.emit(depth, f"if type({var}) is not str:")
+        c.error(depth + 1, path, f"expected a string, got {{_kind({var})}}")
+        if self.pattern is not None:
+            regex = c.constant(re.compile(self.pattern))
+            c.emit(depth, f"elif {regex}.fullmatch({var}) is None:")
+            c.error(depth + 1, path, f"{{{var}!r}} does not match {_static(self.pattern)}")
+
+BOOL = _Bool()
+STR = Str()
+
+class List(Spec):
+    def __init__(self, item, min_len=0):
+        self.item = item
+        self.min_len = min_len
+
+    def emit(self, c, depth, var, path):
+        c.emit(depth, f"if type({var}) is not list and type({var}) is not tuple:")
+        c.error(depth + 1, path, f"expected a list, got {{_kind({var})}}")
+        c.emit(depth, "else:")
+        if self.min_len:
+            c.emit(depth + 1, f"if len({var}) < {self.min_len}:")
+            c.error(depth + 2, path, f"expected at least {self.min_len} items, got {{len({var})}}")
+        index, item = c.name("i"), c.name("v")
+        c.emit(depth + 1, f"for {index}, {item} in enumerate({var}):")
+        self.item.emit(c, depth + 2, item, f"{path}[{{{index}}}]")
+
+class Tuple(Spec):
+    def __init__(self, *items):
+        self.items = items
+
+    def emit(self, c, depth, var, path):
+        c.emit(depth, f"if type({var}) is not list and type({var}) is not tuple:")
+        c.error(depth + 1, path, f"expected a list, got {{_kind({var})}}")
+        c.emit(depth, f"elif len({var}) != {len(self.items)}:")
+        c.error(depth + 1, path, f"expected {len(self.items)} items, got {{len({var})}}")
+        c.emit(depth, "else:")
+        for i, spec in enumerate(self.items):
+            item = c.name("v")
+            c.emit(depth + 1, f"{item} = {var}[{i}]")
+            spec.emit(c, depth + 1, item, f"{path}[{i}]")
+
+class Record(Spec):
+    def __init__(self, fields):
+        self.fields = fields
+
+    def emit(self, c, depth, var, path):
+        c.emit(depth, f"if not isinstance({var}, dict):")
+        c.error(depth + 1, path or "problem", f"expected an object, got {{_kind({var})}}")
+        c.emit(depth, "else:")
+        for key, spec in self.fields.items():
+            item = c.name("v")
+            field_path = _join(path, _static(key))
+            c.emit(depth + 1, f"{item} = {var}.get({key!r}, _MISSING)")
+            c.emit(depth + 1, f"if {item} is _MISSING:")
+            c.error(depth + 2, field_path, "missing")
+            c.emit(depth + 1, "else:")
+            spec.emit(c, depth + 2, item, field_path)
+        known = c.constant(frozenset(self.fields))
+        c.emit(depth + 1, f"if len({var}) > {len(self.fields)} or not {known}.issuperset({var}):")
+        c.emit(depth + 2, f"for k in {var}:")
+        c.emit(depth + 3, f"if k not in {known}:")
+        c.error(depth + 4, _join(path, "{k}"), "unexpected field")
+
+class Map(Spec):
+    def __init__(self, value, key=None):
+        self.value = value
+        self.key = key
+
+    def emit(self, c, depth, var, path):
+        c.emit(depth, f"if not isinstance({var}, dict):")
+        c.error(depth + 1, path, f"expected an object, got {{_kind({var})}}")
+        c.emit(depth, "else:")
+        key, item = c.name("k"), c.name("v")
+        if self.key is not None:
+            # All keys are matched in one regex call over the joined keys; only a
+            # failing map is searched key by key for the message.
+            joined = c.constant(re.compile(f"(?:{self.key})(?:\n(?:{self.key}))*"))
+            regex = c.constant(re.compile(self.key))
+            keys = c.name("s")
+            c.emit(depth + 1, f'{keys} = "\\n".join(map(str, {var}))')
+            c.emit(depth + 1, f'if {var} and ({joined}.fullmatch({keys}) is None or {keys}.count("\\n") != len({var}) - 1):')
+            c.emit(depth + 2, f"for {key} in {var}:")
+            c.emit(depth + 3, f"if {regex}.fullmatch(str({key})) is None:")
+            c.error(depth + 4, f"{path}[{{{key}!r}}]", f"key does not match {_static(self.key)}")
+        c.emit(depth + 1, f"for {key}, {item} in {var}.items():")
+        self.value.emit(c, depth + 2, item, f"{path}[{{{key}!r}}]")
+
+_MISSING = object()
+
+def _kind(value):
+    return "null" if value is None else type(value).__name__
+
+def compile_schema(spec, name="validate"):
+    """
+    Compiles a spec into a function problem -> list of error strings. The
+    generated source is kept as the function's source attribute.
+    """
+    c = _Compiler()
+    c.emit(0, f"def {name}(problem):")
+    c.emit(1, "errors = []")
+    spec.emit(c, 1, "problem", "")
+    c.emit(1, "return errors")
+    source = "\n".join(c.lines) + "\n"
+    namespace = dict(c.constants, _MISSING=_MISSING, _kind=_kind)
+    exec(compile(source, f"<schema {name}>", "exec"), namespace)
+    func = namespace[name]
+    func.source = source
+    return func
+
+# ---------------------------------------------------------------------------
+# Domain schemas.
+
+COUNT = Int(min=0)
+INDEX = Int(min=0)
+# Index of something that may be absent, e.g. the airplane a person is in.
+OPTIONAL_INDEX = Int(min=-1)
+NUMBER = Float()
+
+_LINEAR_EXPRESSION = Record({"terms": List(Tuple(Int(), STR)), "constant": Int()})
+_LINEAR_GOAL = Record({
+    "conditions": List(Record({
+        "left": _LINEAR_EXPRESSION,
+        "operator": Str(r'<=|>=|<|>|='),
+        "right": _LINEAR_EXPRESSION
+    }))
+})
+
+_VEHICLES = List(Record({"x": INDEX, "y": INDEX, "name": STR}))
+_RED_CAR_STATE = {
+    "grid": Record({"row_size": Int(min=1), "col_size": Int(min=1), "cells": Map(STR)}),
+    "horizontalcars": _VEHICLES,
+    "verticalcars": _VEHICLES,
+    "horizontaltrucks": _VEHICLES,
+    "verticaltrucks": _VEHICLES
+}
+
+_SAILING_BOAT = {"x": NUMBER, "y": NUMBER, "index": INDEX}
+_SAILING_PERSON = Record({"d": NUMBER, "saved": BOOL, "index": INDEX})
+_SAILING_GOAL = Record({"saved_persons": List(INDEX)})
+
+_REACTION = {
+    "molecule_1_name": STR,
+    "need_molecule_1": Int(min=1),
+    "molecule_2_name": STR,
+    "need_molecule_2": Int(min=1),
+    "molecule_3_name": STR,
+    "prod": Int(min=1)
+}
+_SELF_REACTION = {
+    "molecule_1_name": STR,
+    "need_molecule_1": Int(min=1),
+    "molecule_2_name": STR,
+    "prod": Int(min=1)
+}
+
+def _zenotravel(speeds, time_metric):
+    airplane = {"index": INDEX, "slow_burn": Int(min=1)}
+    if speeds:
+        airplane["slow_speed"] = Int(min=1)
+    airplane["fast_burn"] = Int(min=1)
+    if speeds:
+        airplane["fast_speed"] = Int(min=1)
+    airplane.update({
+        "capacity": Int(min=1),
+        "fuel": COUNT,
+        "location": INDEX,
+        "zoom_limit": Int(min=1),
+        "onboard": COUNT
+    })
+    state = {
+        "num_cities": Int(min=1),
+        "airplanes": List(Record(airplane)),
+        "distances": Map(COUNT, key=r'\d+,\d+'),
+        "persons": List(Record({"location": INDEX, "on_airplane": OPTIONAL_INDEX})),
+        "total_fuel_used": COUNT
+    }
+    minimize = {"fuel": COUNT}
+    if time_metric:
+        state["total_time"] = Float(min=0)
+        minimize["time"] = COUNT
+    return Record({
+        "state": Record(state),
+        "problem": Record({
+            "goal": Record({"airplanes": List(Tuple(INDEX, INDEX)), "persons": List(Tuple(INDEX, INDEX))}),
+            "minimize": Record(minimize)
+        })
+    })
+
+SCHEMAS = {
+    "block_grouping": Record({
+        "state": Record({
+            "blocks": List(Record({"index": INDEX, "color_group": INDEX, "x": Int(), "y": Int()}))
+        }),
+        "problem": Record({
+            "grid": Record({"max_x": Int(), "min_x": Int(), "max_y": Int(), "min_y": Int()})
+        })
+    }),
+    "counters": Record({
+        "state": Record({"counters": List(Record({"name": STR, "value": Int()}))}),
+        "problem": Record({"goal": _LINEAR_GOAL, "max_value": Int(min=0)})
+    }),
+    "delivery": Record({
+        "state": Record({
+            "bots": List(Record({
+                "location": INDEX,
+                "load_limit": COUNT,
+                "current_load": COUNT,
+                "index": INDEX,
+                "arms": List(Record({"is_free": BOOL, "side": INDEX}))
+            })),
+            "items": List(Record({
+                "location": OPTIONAL_INDEX,
+                "weight": COUNT,
+                "in_arm": OPTIONAL_INDEX,
+                "in_tray": OPTIONAL_INDEX,
+                "index": INDEX
+            })),
+            "cost": COUNT
+        }),
+        "problem": Record({
+            "goal_locations": Map(INDEX, key=r'\d+'),
+            "room_connections": Map(List(INDEX))
+        })
+    }),
+    "drone": Record({
+        "state": Record({
+            "battery_level": COUNT,
+            "battery_capacity": COUNT,
+            "x": Int(),
+            "y": Int(),
+            "z": Int(),
+            "visited": Map(BOOL, key=r'\d+'),
+            "locations": Map(Tuple(Int(), Int(), Int()), key=r'\d+'),
+            "bounds": Tuple(Tuple(Int(), Int()), Tuple(Int(), Int()), Tuple(Int(), Int()))
+        })
+    }),
+    "expedition": Record({
+        "state": Record({
+            "sleds": Map(Record({"location": STR, "supplies": COUNT})),
+            "waypoint_supplies": Map(COUNT)
+        }),
+        "problem": Record({
+            "goal_locations": Map(STR),
+            "waypoint_connections": Map(List(STR)),
+            "sled_capacity": Map(COUNT)
+        })
+    }),
+    "ext_plant_watering": Record({
+        "state": Record({
+            "robots": List(Record({"index": INDEX, "x": Int(), "y": Int(), "max_carry": COUNT, "carry": COUNT})),
+            "plants": List(Record({"index": INDEX, "x": Int(), "y": Int(), "poured": COUNT})),
+            "tap": Record({"x": Int(), "y": Int(), "water_amount": COUNT}),
+            "total_poured": COUNT,
+            "total_loaded": COUNT
+        }),
+        "problem": Record({
+            "goal": Record({
+                "conditions": List(Record({"plant_index": INDEX, "poured_amount": COUNT})),
+                "total_operator": Str(r'<=|>=|<|>|=')
+            }),
+            "max_x": Int(),
+            "max_y": Int(),
+            "min_x": Int(),
+            "min_y": Int()
+        })
+    }),
+    "fo_counters": Record({
+        "state": Record({"counters": List(Record({"name": STR, "value": Int(), "rate_value": Int()}))}),
+        "problem": Record({"goal": _LINEAR_GOAL, "max_value": Int(min=0)})
+    }),
+    "fo_sailing": Record({
+        "state": Record({
+            "boats": List(Record(dict(_SAILING_BOAT, v=NUMBER))),
+            "persons": List(_SAILING_PERSON)
+        }),
+        "problem": Record({"goal": _SAILING_GOAL})
+    }),
+    "hydro": Record({
+        "funds": Int(),
+        "goal_funds": Int(),
+        "capacity": COUNT,
+        "time_end": COUNT,
+        "demands": Map(COUNT, key=r'\d+'),
+        "demand": List(COUNT),
+        "demand_prefix": List(COUNT),
+        "revenue_prefix": List(Int()),
+        "revenue_suffix_max": List(Int()),
+        "max_reachable_funds": Int()
+    }),
+    "pathways": Record({
+        "state": Record({
+            "simples": List(Record({"name": STR, "chosen": BOOL, "possible": BOOL, "available": COUNT})),
+            "complexes": List(Record({"name": STR, "available": COUNT})),
+            "num_subs": COUNT
+        }),
+        "problem": Record({
+            "goal": Record({
+                "conditions": List(Record({"molecule_1_name": STR, "molecule_2_name": STR, "amount_condition": COUNT}))
+            }),
+            "association_reactions": List(Record(_REACTION)),
+            "catalyzed_association_reactions": List(Record(_REACTION)),
+            "catalyzed_self_association_reactions": List(Record(_SELF_REACTION)),
+            "synthesis_reactions": List(Record(_SELF_REACTION))
+        })
+    }),
+    "red_car": Record({"state": Record(_RED_CAR_STATE)}),
+    "red_car_numeric": Record({"state": Record(_RED_CAR_STATE)}),
+    "sailing": Record({
+        "boats": List(Record(_SAILING_BOAT)),
+        "persons": List(_SAILING_PERSON),
+        "goal": _SAILING_GOAL
+    }),
+    "tpp": Record({
+        "state": Record({
+            "trucks": List(Record({"name": STR, "location": OPTIONAL_INDEX})),
+            "markets": List(Record({
+                "location": Str(r'\d+'),
+                "items": Map(Record({"price": Float(min=0), "on_sale": COUNT}), key=r'\d+')
+            })),
+            "items_bought": Map(COUNT, key=r'\d+'),
+            "total_cost": Float(min=0)
+        }),
+        "problem": Record({
+            "distances": Map(Float(min=0), key=r'\(-?\d+,-?\d+\)'),
+            "goal": Record({"goal_requests": Map(COUNT, key=r'\d+')})
+        })
+    }),
+    "zenotravel_fuel": _zenotravel(speeds=False, time_metric=False),
+    "zenotravel_time": _zenotravel(speeds=True, time_metric=True),
+    "zenotravel_fuel_time": _zenotravel(speeds=True, time_metric=True)
+}
+
+# ---------------------------------------------------------------------------
+# Cross-field checks, run once the structure is valid. Each yields error strings.
+
+def _check_block_grouping(p):
+    grid = p["problem"]["grid"]
+    for i, block in enumerate(p["state"]["blocks"]):
+        if not (grid["min_x"] <= block["x"] <= grid["max_x"] and grid["min_y"] <= block["y"] <= grid["max_y"]):
+            yield f"state.blocks[{i}]: position ({block['x']}, {block['y']}) is outside the grid"
+
+def _check_counters(p):
+    names = {counter["name"] for counter in p["state"]["counters"]}
+    max_value = p["problem"]["max_value"]
+    for i, counter in enumerate(p["state"]["counters"]):
+        if not 0 <= counter["value"] <= max_value:
+            yield f"state.counters[{i}].value: {counter['value']} is outside 0..{max_value}"
+    for i, condition in enumerate(p["problem"]["goal"]["conditions"]):
+        for side in ("left", "right"):
+            for _, name in condition[side]["terms"]:
+                if name not in names:
+                    yield f"problem.goal.conditions[{i}].{side}: unknown counter {name!r}"
+
+def _check_delivery(p):
+    items = {str(item["index"]) for item in p["state"]["items"]}
+    for key in p["problem"]["goal_locations"]:
+        if str(key) not in items:
+            yield f"problem.goal_locations[{key!r}]: unknown item"
+
+def _check_drone(p):
+    state = p["state"]
+    bounds = state["bounds"]
+    for axis, (low, high) in zip("xyz", bounds):
+        if low > high:
+            yield f"state.bounds: {axis} range {low}..{high} is empty"
+        if not low <= state[axis] <= high:
+            yield f"state.{axis}: {state[axis]} is outside the bounds {low}..{high}"
+    for key, position in state["locations"].items():
+        if any(not low <= c <= high for c, (low, high) in zip(position, bounds)):
+            yield f"state.locations[{key!r}]: {list(position)} is outside the bounds"
+    if set(map(str, state["visited"])) != set(map(str, state["locations"])):
+        yield "state.visited: keys differ from state.locations"
+    if state["battery_level"] > state["battery_capacity"]:
+        yield "state.battery_level: above battery_capacity"
+
+def _check_expedition(p):
+    waypoints = p["state"]["waypoint_supplies"]
+    sleds = p["state"]["sleds"]
+    for name, sled in sleds.items():
+        if sled["location"] not in waypoints:
+            yield f"state.sleds[{name!r}].location: unknown waypoint {sled['location']!r}"
+    for name, target in p["problem"]["goal_locations"].items():
+        if name not in sleds:
+            yield f"problem.goal_locations[{name!r}]: unknown sled"
+        if target not in waypoints:
+            yield f"problem.goal_locations[{name!r}]: unknown waypoint {target!r}"
+    if set(p["problem"]["sled_capacity"]) != set(sleds):
+        yield "problem.sled_capacity: keys differ from state.sleds"
+
+def _check_ext_plant_watering(p):
+    problem = p["problem"]
+    state = p["state"]
+    def inside(thing):
+        return problem["min_x"] <= thing["x"] <= problem["max_x"] and problem["min_y"] <= thing["y"] <= problem["max_y"]
+    for group in ("robots", "plants"):
+        for i, thing in enumerate(state[group]):
+            if not inside(thing):
+                yield f"state.{group}[{i}]: position ({thing['x']}, {thing['y']}) is outside the grid"
+    if not inside(state["tap"]):
+        yield "state.tap: position is outside the grid"
+    plants = {plant["index"] for plant in state["plants"]}
+    for i, condition in enumerate(problem["goal"]["conditions"]):
+        if condition["plant_index"] not in plants:
+            yield f"problem.goal.conditions[{i}].plant_index: unknown plant {condition['plant_index']}"
+
+def _check_sailing(state, goal, prefix):
+    persons = {person["index"] for person in state["persons"]}
+    for i, index in enumerate(goal["saved_persons"]):
+        if index not in persons:
+            yield f"{prefix}goal.saved_persons[{i}]: unknown person {index}"
+
+def _check_hydro(p):
+    time_end = p["time_end"]
+    if len(p["demand"]) != time_end:
+        yield f"demand: {len(p['demand'])} entries for time_end {time_end}"
+    for key in ("demand_prefix", "revenue_prefix", "revenue_suffix_max"):
+        if len(p[key]) != time_end + 1:
+            yield f"{key}: {len(p[key])} entries, expected time_end + 1 = {time_end + 1}"
+
+def _check_pathways(p):
+    state, problem = p["state"], p["problem"]
+    molecules = {m["name"] for m in state["simples"]} | {m["name"] for m in state["complexes"]}
+    for i, condition in enumerate(problem["goal"]["conditions"]):
+        for key in ("molecule_1_name", "molecule_2_name"):
+            if condition[key] not in molecules:
+                yield f"problem.goal.conditions[{i}].{key}: unknown molecule {condition[key]!r}"
+    for group in ("association_reactions", "catalyzed_association_reactions",
+                  "catalyzed_self_association_reactions", "synthesis_reactions"):
+        for i, reaction in enumerate(problem[group]):
+            for key, name in reaction.items():
+                if key.endswith("_name") and name not in molecules:
+                    yield f"problem.{group}[{i}].{key}: unknown molecule {name!r}"
+
+# Vehicle list -> (length, horizontal).
+_VEHICLE_SHAPES = {
+    "horizontalcars": (2, True),
+    "verticalcars": (2, False),
+    "horizontaltrucks": (3, True),
+    "verticaltrucks": (3, False)
+}
+
+def _check_red_car(p):
+    state = p["state"]
+    rows, cols = state["grid"]["row_size"], state["grid"]["col_size"]
+    for group, (length, horizontal) in _VEHICLE_SHAPES.items():
+        for i, vehicle in enumerate(state[group]):
+            end_x = vehicle["x"] + (length - 1 if horizontal else 0)
+            end_y = vehicle["y"] + (0 if horizontal else length - 1)
+            if end_x >= cols or end_y >= rows:
+                yield f"state.{group}[{i}]: {vehicle['name']} does not fit in the {cols}x{rows} grid"
+    # Without cubes the converter falls back to a 6x6 grid and finds no vehicles either.
+    if not any(vehicle["name"].lower() == "red-car" for vehicle in state["horizontalcars"]):
+        yield "state.horizontalcars: no red-car"
+
+def _check_tpp(p):
+    state, problem = p["state"], p["problem"]
+    goods = set(map(str, state["items_bought"]))
+    for i, market in enumerate(state["markets"]):
+        for key in market["items"]:
+            if str(key) not in goods:
+                yield f"state.markets[{i}].items[{key!r}]: unknown goods"
+    for key in problem["goal"]["goal_requests"]:
+        if str(key) not in goods:
+            yield f"problem.goal.goal_requests[{key!r}]: unknown goods"
+
+def _check_zenotravel(p):
+    state, goal = p["state"], p["problem"]["goal"]
+    cities = state["num_cities"]
+    planes = len(state["airplanes"])
+    for i, plane in enumerate(state["airplanes"]):
+        if plane["location"] >= cities:
+            yield f"state.airplanes[{i}].location: city {plane['location']} of {cities}"
+        if plane["fuel"] > plane["capacity"]:
+            yield f"state.airplanes[{i}].fuel: above capacity"
+    for i, person in enumerate(state["persons"]):
+        if person["location"] >= cities:
+            yield f"state.persons[{i}].location: city {person['location']} of {cities}"
+        if person["on_airplane"] >= planes:
+            yield f"state.persons[{i}].on_airplane: airplane {person['on_airplane']} of {planes}"
+    for key in state["distances"]:
+        if any(int(c) >= cities for c in key.split(",")):
+            yield f"state.distances[{key!r}]: city out of range"
+    for group, count in (("airplanes", planes), ("persons", len(state["persons"]))):
+        for i, (index, city) in enumerate(goal[group]):
+            if index >= count or city >= cities:
+                yield f"problem.goal.{group}[{i}]: ({index}, {city}) is out of range"
+
+CHECKS = {
+    "block_grouping": _check_block_grouping,
+    "counters": _check_counters,
+    "delivery": _check_delivery,
+    "drone": _check_drone,
+    "expedition": _check_expedition,
+    "ext_plant_watering": _check_ext_plant_watering,
+    "fo_counters": _check_counters,
+    "fo_sailing": lambda p: _check_sailing(p["state"], p["problem"]["goal"], "problem."),
+    "hydro": _check_hydro,
+    "pathways": _check_pathways,
+    "red_car": _check_red_car,
+    "red_car_numeric": _check_red_car,
+    "sailing": lambda p: _check_sailing(p, p["goal"], ""),
+    "tpp": _check_tpp,
+    "zenotravel_fuel": _check_zenotravel,
+    "zenotravel_time": _check_zenotravel,
+    "zenotravel_fuel_time": _check_zenotravel
+}
+
+_validators = {}
+
+def validator(domain):
+    """The compiled structure validator of a domain (compiled on first use)."""
+    func = _validators.get(domain)
+    if func is None:
+        if domain not in SCHEMAS:
+            raise ValueError(f"Unknown domain '{domain}'. Known domains: {', '.join(sorted(SCHEMAS))}")
+        func = compile_schema(SCHEMAS[domain], "validate_" + domain)
+        _validators[domain] = func
+    return func
+
+def validate(domain, problem):
+    """List of schema violations of a converted problem ("path: message"); empty if it is valid."""
+    errors = validator(domain)(problem)
+    if not errors:
+        errors = list(CHECKS[domain](problem))
+    return errors
+
+def check(domain, problem):
+    """Raises SchemaError if a converted problem is invalid."""
+    errors = validate(domain, problem)
+    if errors:
+        raise SchemaError(domain, errors)
+
+def validate_files(domain, paths):
+    """Yields (path, errors) for converted files (any output format, delta files included)."""
+    for path in paths:
+        try:
+            problem = output.load_problem(path)
+        except (OSError, ValueError) as e:
+            yield path, [f"unreadable: {type(e).__name__}: {e}"]
+            continue
+        yield path, validate(domain, problem)
+
+def main():
+    parser = argparse.ArgumentParser(description="Validate converted problems against their domain's schema")
+    parser.add_argument("domain", choices=sorted(SCHEMAS), help="Domain of the problems")
+    parser.add_argument("inputs", nargs="+", help="Converted files or directories of them")
+    parser.add_argument("--json", help="Also write {file: [errors]} of the invalid files as JSON")
+    parser.add_argument("--show_source", action="store_true", help="Print the compiled validator and exit")
+    args = parser.parse_args()
+
+    if args.show_source:
+        print(validator(args.domain).source)
+        return
+    invalid = {}
+    count = 0
+    start = time.perf_counter()
+    for path, errors in validate_files(args.domain, output.problem_files(args.inputs)):
+        count += 1
+        if errors:
+            invalid[path] = errors
+            print(f"Invalid {path}:")
+            for error in errors[:SHOWN_ERRORS]:
+                print(f"  {error}")
+            if len(errors) > SHOWN_ERRORS:
+                print(f"  ... and {len(errors) - SHOWN_ERRORS} more")
+    elapsed = time.perf_counter() - start
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(invalid, f, indent=2)
+    print(f"Validated {count} problems in {elapsed:.2f} s: {count - len(invalid)} valid, {len(invalid)} invalid")
+    if invalid:
+        parser.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+Long-running conversion service over a Unix domain socket.
+
+The server keeps a pool of worker processes in which every domain converter is
+imported once and run on one shipped instance at start-up, so the regexes
+they use are compiled and cached before the first request arrives. Connections
+are served by threads (one per client, many requests per connection) and the
+conversions themselves run in the pool, so requests from different clients
+are converted in parallel.
+
+Wire format, in both directions: a 4-byte big-endian header length, the
+header as JSON, then header["payload_bytes"] bytes of payload.
+
+  request   {"op": "convert", "domain": ..., "path": ...}            no payload
+            {"op": "convert", "domain": ..., "payload_bytes": n}     PDDL bytes
+            optional "compression": "none" | "gzip" | "xz" | "zstd"
+            {"op": "ping"}
+  response  {"ok": true, "payload_bytes": n}    the problem as compact JSON
+                                                (compressed if requested)
+            {"ok": false, "error": "..."}
+
+Usage:
+    python -m fix_domains.service serve --socket /tmp/fix_domains.sock --workers 8
+    python -m fix_domains.service convert tpp tpp_problem/problems_pddl/pfile1.pddl --socket /tmp/fix_domains.sock
+
+From Python:
+    with service.Client("/tmp/fix_domains.sock") as client:
+        problem = client.convert("tpp", path="tpp_problem/problems_pddl/pfile1.pddl")
+"""
+import io
+import os
+import json
+import socket
+import signal
+import struct
+import argparse
+import contextlib
+import socketserver
+import concurrent.futures
+
+from fix_domains import registry
+from fix_domains import output
+
+DEFAULT_SOCKET = "/tmp/fix_domains.sock"
+
+_LENGTH = struct.Struct(">I")
+
+def _recv_exact(sock, size):
+    chunks = []
+    while size:
+        chunk = sock.recv(min(size, 1024 * 1024))
+        if not chunk:
+            raise ConnectionError("Connection closed mid-message")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+def send_message(sock, header, payload=b""):
+    header = dict(header, payload_bytes=len(payload))
+    encoded = json.dumps(header).encode()
+    sock.sendall(_LENGTH.pack(len(encoded)) + encoded)
+    if payload:
+        sock.sendall(payload)
+
+def recv_message(sock):
+    """Returns (header, payload), or (None, b"") if the peer closed the connection."""
+    first = sock.recv(_LENGTH.size)
+    if not first:
+        return None, b""
+    if len(first) < _LENGTH.size:
+        first += _recv_exact(sock, _LENGTH.size - len(first))
+    header = json.loads(_recv_exact(sock, _LENGTH.unpack(first)[0]))
+    payload = _recv_exact(sock, header.get("payload_bytes", 0))
+    return header, payload
+
+# ----- worker side -----
+
+def _init_worker(warm):
+    """Pool initializer: leaves Ctrl-C to the server, then imports every converter and runs it once."""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    if not warm:
+        return
+    for domain in registry.DOMAINS:
+        parse = registry.get_parser(domain)
+        files = registry.problem_files(domain)
+        if files:
+            with open(files[0], 'r') as f, contextlib.redirect_stdout(io.StringIO()):
+                try:
+                    parse(f.read())
+                except Exception:
+                    pass
+
+def convert_request(domain, path, pddl_bytes, compression):
+    """Runs in a worker: converts one problem and returns it encoded."""
+    if pddl_bytes is None:
+        with open(path, 'rb') as f:
+            pddl_bytes = f.read()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = registry.get_parser(domain)(pddl_bytes.decode())
+    return output.dumps_problem(result, compression=compression)
+
+# ----- server side -----
+
+class _Handler(socketserver.BaseRequestHandler):
+    def handle(self):
+        while True:
+            try:
+                header, payload = recv_message(self.request)
+            except (ConnectionError, ValueError):
+                return
+            if header is None:
+                return
+            try:
+                response = self.server.dispatch(header, payload)
+                send_message(self.request, {"ok": True}, response)
+            except (BrokenPipeError, ConnectionError):
+                return
+            except Exception as e:
+                send_message(self.request, {"ok": False, "error": f"{type(e).__name__}: {e}"})
+
+class ConversionServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path, workers=None, warm=True):
+        self.workers = workers or os.cpu_count() or 1
+        self.pool = concurrent.futures.ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_init_worker,
+            initargs=(warm,)
+        )
+        super().__init__(socket_path, _Handler)
+
+    def dispatch(self, header, payload):
+        op = header.get("op")
+        if op == "ping":
+            return b""
+        if op != "convert":
+            raise ValueError(f"Unknown op '{op}'")
+        domain = header.get("domain")
+        if domain not in registry.DOMAINS:
+            raise ValueError(f"Unknown domain '{domain}'. Known domains: {', '.join(sorted(registry.DOMAINS))}")
+        compression = header.get("compression", "none")
+        output.check_compression(compression)
+        if header.get("payload_bytes"):
+            future = self.pool.submit(convert_request, domain, None, payload, compression)
+        elif header.get("path"):
+            future = self.pool.submit(convert_request, domain, header["path"], None, compression)
+        else:
+            raise ValueError("A convert request needs a path or a PDDL payload")
+        return future.result()
+
+    def server_close(self):
+        super().server_close()
+        self.pool.shutdown()
+
+def _remove_stale_socket(socket_path):
+    if not os.path.exists(socket_path):
+        return
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(socket_path)
+    except OSError:
+        os.unlink(socket_path)
+    else:
+        raise RuntimeError(f"A server is already listening on {socket_path}")
+    finally:
+        probe.close()
+
+def serve(socket_path=DEFAULT_SOCKET, workers=None, warm=True):
+    """Runs the service until interrupted (Ctrl-C or SIGTERM); removes the socket file on exit."""
+    _remove_stale_socket(socket_path)
+    server = ConversionServer(socket_path, workers, warm)
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    try:
+        # Start (and warm) the workers now rather than on the first request.
+        for future in [server.pool.submit(os.getpid) for _ in range(server.workers)]:
+            future.result()
+        print(f"Serving conversions on {socket_path}")
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+# ----- client side -----
+
+class Client:
+    """Connection to a running service; requests on one connection are sequential."""
+
+    def __init__(self, socket_path=DEFAULT_SOCKET):
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._sock.connect(socket_path)
+
+    def _request(self, header, payload=b""):
+        send_message(self._sock, header, payload)
+        response, data = recv_message(self._sock)
+        if response is None:
+            raise ConnectionError("Server closed the connection")
+        if not response["ok"]:
+            raise RuntimeError(f"Conversion service error: {response['error']}")
+        return data
+
+    def ping(self):
+        self._request({"op": "ping"})
+
+    def convert_raw(self, domain, path=None, pddl=None, compression="none"):
+        """Converts a problem given by path (read by the server) or as str/bytes; returns the encoded problem."""
+        header = {"op": "convert", "domain": domain, "compression": compression}
+        if pddl is not None:
+            return self._request(header, pddl.encode() if isinstance(pddl, str) else pddl)
+        if path is None:
+            raise ValueError("Either path or pddl is required")
+        header["path"] = os.path.abspath(path)
+        return self._request(header)
+
+    def convert(self, domain, path=None, pddl=None, compression="none"):
+        """Same as convert_raw, decoded into the problem dict."""
+        return output.loads_problem(self.convert_raw(domain, path, pddl, compression))
+
+    def close(self):
+        self._sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def convert(domain, path=None, pddl=None, socket_path=DEFAULT_SOCKET):
+    """One-shot helper: converts a single problem through the service."""
+    with Client(socket_path) as client:
+        return client.convert(domain, path, pddl)
+
+def main():
+    parser = argparse.ArgumentParser(description="PDDL to JSON conversion service over a Unix domain socket")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    serve_parser = sub.add_parser("serve", help="Run the service")
+    serve_parser.add_argument("--socket", default=DEFAULT_SOCKET, help="Socket path")
+    serve_parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: one per CPU)")
+    serve_parser.add_argument("--no_warm", action="store_true", help="Skip running every converter at start-up")
+
+    convert_parser = sub.add_parser("convert", help="Convert problems through a running service")
+    convert_parser.add_argument("domain", choices=sorted(registry.DOMAINS))
+    convert_parser.add_argument("inputs", nargs="+", help="PDDL problem files")
+    convert_parser.add_argument("--socket", default=DEFAULT_SOCKET, help="Socket path")
+    convert_parser.add_argument("--output_dir", help="Write the JSON files here instead of printing them")
+
+    args = parser.parse_args()
+    if args.command == "serve":
+        serve(args.socket, args.workers, not args.no_warm)
+        return
+    with Client(args.socket) as client:
+        for path in args.inputs:
+            data = client.convert_raw(args.domain, path)
+            if args.output_dir:
+                os.makedirs(args.output_dir, exist_ok=True)
+                with open(os.path.join(args.output_dir, registry.output_filename(args.domain, path)), 'wb') as f:
+                    f.write(data)
+            else:
+                print(data.decode())
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,257 @@
+"""
+Shared-memory handoff of converted problems to a consumer on the same machine.
+
+publish() converts a problem and lays it out in one multiprocessing.shared_memory
+block; the consumer gets a small, JSON-serializable descriptor (pass it over a
+pipe, a socket or argv) and attach()es to the block without any file I/O or
+JSON parsing of the bulk data.
+
+Layout of the block:
+  - skeleton: the problem as compact JSON, with every large list replaced by a
+    placeholder, {"$field": i} or {"$table": {key: column, ...}}
+  - fields: typed arrays, 8-byte aligned, described in descriptor["fields"]:
+        {"path": "state/markets/*/location", "dtype": "int64" | "float64" | "str",
+         "offset": ..., "count": ...}
+    str fields also carry "data_offset" and "data_bytes": their offsets array
+    (int64, count + 1 entries) points into a UTF-8 blob.
+
+Lists of at least MIN_FIELD_LENGTH homogeneous ints, floats or strings become
+fields; lists of objects that all have the same keys (markets, reactions,
+locations, ...) become tables, i.e. one column per key, and their columns
+become fields in turn. Everything else stays in the skeleton.
+
+Publisher:
+    with shared.publish("hydro", pddl_text) as publication:
+        send(publication.descriptor)
+        ... wait for the consumer ...
+Consumer:
+    with shared.attach(descriptor) as problem:
+        problem.field("demand")        # memoryview of int64, zero-copy
+        problem.to_dict()              # same dict as the converter returns
+"""
+import io
+import json
+import struct
+import threading
+import contextlib
+from multiprocessing import shared_memory, resource_tracker
+
+from fix_domains import registry
+
+MIN_FIELD_LENGTH = 8
+
+_FORMATS = {"int64": "q", "float64": "d"}
+_INT64_MIN = -(1 << 63)
+_INT64_MAX = (1 << 63) - 1
+
+def _align(offset):
+    return (offset + 7) & ~7
+
+def _dtype_of(values):
+    """dtype for a homogeneous list of scalars, or None."""
+    first = type(values[0])
+    if first is int:
+        if all(type(v) is int for v in values) and _INT64_MIN <= min(values) and max(values) <= _INT64_MAX:
+            return "int64"
+    elif first is float:
+        if all(type(v) is float for v in values):
+            return "float64"
+    elif first is str:
+        if all(type(v) is str for v in values):
+            return "str"
+    return None
+
+def _table_keys(values):
+    """Keys shared (in the same order) by a list of objects, or None."""
+    if not isinstance(values[0], dict) or not values[0]:
+        return None
+    keys = list(values[0])
+    for v in values:
+        if not isinstance(v, dict) or list(v) != keys:
+            return None
+    return keys
+
+class _Layout:
+    """Splits a problem into a skeleton and typed fields and computes their offsets."""
+
+    def __init__(self):
+        self.fields = []
+        self.values = []
+        self.encoded_strings = []
+
+    def encode(self, value, path):
+        if isinstance(value, dict):
+            return {key: self.encode(item, f"{path}/{key}" if path else str(key)) for key, item in value.items()}
+        if isinstance(value, list):
+            if len(value) >= MIN_FIELD_LENGTH:
+                dtype = _dtype_of(value)
+                if dtype is not None:
+                    self.fields.append({"path": path, "dtype": dtype, "count": len(value)})
+                    self.values.append(value)
+                    return {"$field": len(self.fields) - 1}
+                keys = _table_keys(value)
+                if keys is not None:
+                    return {"$table": {
+                        key: self.encode([item[key] for item in value], f"{path}/*/{key}") for key in keys
+                    }}
+            return [self.encode(item, f"{path}/{i}") for i, item in enumerate(value)]
+        return value
+
+    def place(self, start):
+        """Assigns offsets from start on; returns the end offset."""
+        offset = _align(start)
+        for field, values in zip(self.fields, self.values):
+            field["offset"] = offset
+            offset = _align(offset + 8 * (field["count"] + (field["dtype"] == "str")))
+            if field["dtype"] == "str":
+                encoded = [v.encode() for v in values]
+                self.encoded_strings.append(encoded)
+                field["data_offset"] = offset
+                field["data_bytes"] = sum(len(e) for e in encoded)
+                offset = _align(offset + field["data_bytes"])
+        return offset
+
+    def write(self, buf):
+        strings = iter(self.encoded_strings)
+        for field, values in zip(self.fields, self.values):
+            offset = field["offset"]
+            if field["dtype"] == "str":
+                encoded = next(strings)
+                positions = [0]
+                for e in encoded:
+                    positions.append(positions[-1] + len(e))
+                struct.pack_into(f"<{len(positions)}q", buf, offset, *positions)
+                data_offset = field["data_offset"]
+                buf[data_offset:data_offset + field["data_bytes"]] = b"".join(encoded)
+            else:
+                struct.pack_into(f"<{len(values)}{_FORMATS[field['dtype']]}", buf, offset, *values)
+
+class Publication:
+    """A published problem. The block lives until close(), which also unlinks it."""
+
+    def __init__(self, shm, descriptor):
+        self.shm = shm
+        self.descriptor = descriptor
+
+    def close(self):
+        if self.shm is not None:
+            self.shm.close()
+            self.shm.unlink()
+            self.shm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def publish_problem(problem, name=None):
+    """Publishes an already converted problem into a new shared memory block."""
+    layout = _Layout()
+    skeleton = json.dumps(layout.encode(problem, ""), separators=(',', ':')).encode()
+    size = layout.place(len(skeleton))
+    shm = shared_memory.SharedMemory(name=name, create=True, size=max(size, 1))
+    try:
+        shm.buf[:len(skeleton)] = skeleton
+        layout.write(shm.buf)
+    except Exception:
+        shm.close()
+        shm.unlink()
+        raise
+    descriptor = {
+        "name": shm.name,
+        "size": size,
+        "skeleton": [0, len(skeleton)],
+        "fields": layout.fields
+    }
+    return Publication(shm, descriptor)
+
+def publish(domain, pddl_text, name=None):
+    """Converts a problem of a domain and publishes it; see publish_problem."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        problem = registry.get_parser(domain)(pddl_text)
+    return publish_problem(problem, name)
+
+_attach_lock = threading.Lock()
+
+def _attach_block(name):
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        pass
+    # Before Python 3.13 attaching registers the block with this process's
+    # resource tracker, which would unlink it when the consumer exits; skip the
+    # registration (unregistering afterwards would break a publisher in the same process).
+    with _attach_lock:
+        register = resource_tracker.register
+        resource_tracker.register = lambda name, rtype: None if rtype == "shared_memory" else register(name, rtype)
+        try:
+            return shared_memory.SharedMemory(name=name)
+        finally:
+            resource_tracker.register = register
+
+class SharedProblem:
+    """Consumer-side view of a published problem."""
+
+    def __init__(self, descriptor):
+        self.descriptor = descriptor
+        self._shm = _attach_block(descriptor["name"])
+        self._views = []
+        start, length = descriptor["skeleton"]
+        self.skeleton = json.loads(bytes(self._shm.buf[start:start + length]))
+        self.fields = {field["path"]: field for field in descriptor["fields"]}
+
+    def _read(self, field):
+        buf = self._shm.buf
+        if field["dtype"] == "str":
+            offset = field["offset"]
+            positions = struct.unpack_from(f"<{field['count'] + 1}q", buf, offset)
+            data = bytes(buf[field["data_offset"]:field["data_offset"] + field["data_bytes"]])
+            return [data[a:b].decode() for a, b in zip(positions, positions[1:])]
+        view = buf[field["offset"]:field["offset"] + 8 * field["count"]].cast(_FORMATS[field["dtype"]])
+        self._views.append(view)
+        return view
+
+    def field(self, path):
+        """
+        Values of one field: a zero-copy memoryview for int64/float64 (valid
+        until close()), a list for str.
+        """
+        if path not in self.fields:
+            raise KeyError(f"No field '{path}'. Fields: {', '.join(self.fields)}")
+        return self._read(self.fields[path])
+
+    def _decode(self, value):
+        if isinstance(value, dict):
+            if "$field" in value and len(value) == 1:
+                field = self.descriptor["fields"][value["$field"]]
+                values = self._read(field)
+                return values if isinstance(values, list) else values.tolist()
+            if "$table" in value and len(value) == 1:
+                columns = {key: self._decode(column) for key, column in value["$table"].items()}
+                keys = list(columns)
+                return [dict(zip(keys, row)) for row in zip(*columns.values())]
+            return {key: self._decode(item) for key, item in value.items()}
+        if isinstance(value, list):
+            return [self._decode(item) for item in value]
+        return value
+
+    def to_dict(self):
+        """The whole problem as the converter returned it (copied out of the block)."""
+        return self._decode(self.skeleton)
+
+    def close(self):
+        for view in self._views:
+            view.release()
+        self._views = []
+        self._shm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def attach(descriptor):
+    """Attaches to a problem published by publish()/publish_problem()."""
+    return SharedProblem(descriptor)
@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+"""
+Batch conversion with a per-file time and memory budget.
+
+Some converter patterns backtrack badly on malformed or very large input (e.g.
+the lazy, back-referencing location pattern of the drone converter), and a
+single such file would stall a whole batch run. Here every file is converted
+in a worker process that can be killed:
+
+  - each worker converts one file at a time and is restarted after a kill
+  - the time budget is wall time per file; a worker over it is killed and the
+    file is reported as timed out. Statistics (--manifest, --catalog) are taken
+    after the output is written; if the budget runs out while they are computed,
+    they get one more budget of their own, and if that runs out too the file
+    counts as converted without statistics (and is listed in the failures)
+  - outputs are written to a temporary file and renamed into place, so a worker
+    killed while writing never leaves a truncated output behind
+  - the memory budget is the worker's address-space limit (RLIMIT_AS), so an
+    over-budget file fails with MemoryError inside the worker instead of
+    exhausting the machine
+  - every function of the converter records itself as the current stage in
+    memory shared with the parent, so a timed-out file is reported with the
+    stage it was stuck in (e.g. "parse/convert_pddl_to_json/parse_locations")
+
+Results have the same form as fix_domains.batch.convert_sources. batch.py uses
+this module when --timeout or --memory_mb is given and then also writes the
+failed files, with their stage, to <output_dir>/failures.json.
+
+Usage:
+    python -m fix_domains.batch drone big_instances/ --output_dir out --timeout 30 --memory_mb 2048
+"""
+import os
+import io
+import time
+import contextlib
+import functools
+import inspect
+import tempfile
+import multiprocessing
+import multiprocessing.connection
+
+from fix_domains import registry
+from fix_domains import archives
+from fix_domains import output
+from fix_domains import instance_stats
+from fix_domains import schema
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows; the memory budget is then not enforced.
+    resource = None
+
+STAGE_BYTES = 256
+
+# Grace period for a terminated worker before it is killed outright.
+KILL_GRACE_S = 1.0
+
+# Exit code of a worker that could not even receive its file within the memory budget.
+NO_MEMORY_EXIT = 3
+
+class _StageTracker:
+    """Keeps the current stage path in a shared buffer the parent can read at any time."""
+
+    def __init__(self, buffer):
+        self._buffer = buffer
+        self._stack = []
+        # Innermost stage an exception was raised in (the stack is unwound by the time it is handled).
+        self.failed = None
+
+    def _publish(self):
+        self._buffer.value = "/".join(self._stack).encode()[-(STAGE_BYTES - 1):]
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        self._stack.append(name)
+        self._publish()
+        try:
+            yield
+        except BaseException:
+            if self.failed is None:
+                self.failed = "/".join(self._stack)
+            raise
+        finally:
+            self._stack.pop()
+            self._publish()
+
+def _staged(tracker, name, func):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with tracker.stage(name):
+            return func(*args, **kwargs)
+    return wrapper
+
+def _discard(*args, **kwargs):
+    pass
+
+def _tracked_parser(domain, tracker):
+    """A private converter copy whose functions report themselves as stages; print is silenced."""
+    module = registry.import_converter(domain)
+    for name, obj in list(vars(module).items()):
+        if inspect.isfunction(obj) and obj.__module__ == module.__name__:
+            setattr(module, name, _staged(tracker, name, obj))
+    module.print = _discard
+    return getattr(module, registry.DOMAINS[domain]["parse"])
+
+def _temporary_prefix(pid):
+    return f".tmp-{pid}-"
+
+def _sweep_temporary(output_dir, pid):
+    """Removes the temporary files of a killed worker, which had no chance to clean up after itself."""
+    prefix = _temporary_prefix(pid)
+    for entry in os.listdir(output_dir):
+        if entry.startswith(prefix):
+            try:
+                os.unlink(os.path.join(output_dir, entry))
+            except FileNotFoundError:
+                pass
+
+def _write_replace(result, path, indent, compact, compression):
+    """
+    Writes the output through a temporary file renamed into place, so a worker
+    killed while writing leaves no truncated file under the output's name. The
+    temporary file is named after the worker's pid, so what a killed worker
+    leaves behind can be swept (see _sweep_temporary).
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", prefix=_temporary_prefix(os.getpid()))
+    os.close(fd)
+    try:
+        output.write_problem(result, tmp_path, indent, compact, compression)
+        output.set_default_mode(tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+def _worker(domain, conn, stage_buffer, output_dir, compact, compression, stats, memory_mb, validate, fingerprint,
+            keep_result):
+    if memory_mb and resource is not None:
+        limit = memory_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    tracker = _StageTracker(stage_buffer)
+    parse = _tracked_parser(domain, tracker)
+    indent = registry.DOMAINS[domain]["indent"]
+    while True:
+        try:
+            task = conn.recv()
+        except MemoryError:
+            # The pipe is out of step after a partial read, so the worker cannot go on.
+            os._exit(NO_MEMORY_EXIT)
+        if task is None:
+            return
+        name, data = task
+        tracker.failed = None
+        try:
+            with tracker.stage("decode"):
+                text = data.decode()
+            del data
+            with tracker.stage("parse"), contextlib.redirect_stdout(io.StringIO()):
+                result = parse(text)
+            if validate:
+                with tracker.stage("validate"):
+                    schema.check(domain, result)
+            with tracker.stage("write"):
+                path = output.output_path(os.path.join(output_dir, registry.output_filename(domain, name)), compression)
+                _write_replace(result, path, indent, compact, compression)
+            with tracker.stage("stats"):
+                result_stats = instance_stats.source_stats(domain, result, text, fingerprint) if stats else None
+            conn.send((name, path, None, result_stats, None, result if keep_result else None))
+        except MemoryError:
+            # Drop what the conversion held before reporting, so the reply itself has room.
+            result = text = None
+            conn.send((name, None, f"MemoryError: over the {memory_mb} MB budget", None, tracker.failed, None))
+        except Exception as e:
+            conn.send((name, None, f"{type(e).__name__}: {e}", None, tracker.failed, None))
+        stage_buffer.value = b""
+
+class _Slot:
+    """One worker process with its pipe, shared stage buffer and current task."""
+
+    def __init__(self, ctx, args):
+        self.stage = ctx.Array('c', STAGE_BYTES, lock=False)
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(target=_worker, args=(args[0], child_conn, self.stage) + args[1:], daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.task = None
+        self.started = None
+        # Seconds added to the time budget of the current task (see convert_sources).
+        self.extended = 0.0
+
+    def submit(self, name, data):
+        """Sends a file to the worker; False if the worker died while receiving it."""
+        self.task = name
+        self.started = time.monotonic()
+        self.extended = 0.0
+        try:
+            self.conn.send((name, data))
+        except (BrokenPipeError, ConnectionResetError):
+            return False
+        return True
+
+    def death_reason(self):
+        self.process.join(KILL_GRACE_S)
+        code = self.process.exitcode
+        if code == NO_MEMORY_EXIT:
+            return "MemoryError: input over the memory budget"
+        return f"WorkerDied: exit code {code}"
+
+    def kill(self):
+        self.process.terminate()
+        self.process.join(KILL_GRACE_S)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+
+    def close(self):
+        try:
+            self.conn.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+        self.process.join(KILL_GRACE_S)
+        if self.process.is_alive():
+            self.kill()
+        else:
+            self.conn.close()
+
+def convert_sources(domain, inputs, output_dir, workers=None, timeout=None, memory_mb=None,
+                    compact=False, compression="none", stats=False, failures=None, validate=False,
+                    fingerprint=False, keep_result=False):
+    """
+    Converts every problem found in inputs under the budget and returns an
+    iterator of (name, output path, error, stats, result) as conversions
+    finish, as batch.convert_sources does. If failures is a list, a record
+    {"name", "error", "stage", "elapsed_s"} is appended to it for every file
+    that failed, timed out or crashed its worker. With validate, results
+    failing the domain's schema fail in the "validate" stage; fingerprint is
+    passed on to instance_stats.source_stats. A file whose statistics time out
+    is yielded as converted with stats and result None, and also recorded in
+    failures. Bad arguments and colliding outputs raise ValueError before
+    anything is converted.
+    """
+    if domain not in registry.DOMAINS:
+        raise ValueError(f"Unknown domain '{domain}'. Known domains: {', '.join(sorted(registry.DOMAINS))}")
+    output.check_compression(compression)
+    archives.check_outputs(inputs, domain)
+    os.makedirs(output_dir, exist_ok=True)
+    args = (domain, output_dir, compact, compression, stats, memory_mb, validate, fingerprint, keep_result)
+    return _convert_sources(archives.iter_sources(inputs), args, workers, timeout, failures)
+
+def _convert_sources(sources, args, workers, timeout, failures):
+    domain, output_dir, compression = args[0], args[1], args[3]
+    ctx = multiprocessing.get_context()
+    workers = workers or os.cpu_count() or 1
+    slots = []
+    exhausted = False
+
+    def fail(slot, error, stage):
+        elapsed = time.monotonic() - slot.started
+        if failures is not None:
+            failures.append({"name": slot.task, "error": error, "stage": stage, "elapsed_s": round(elapsed, 3)})
+        return slot.task, None, f"{error} (in {stage})" if stage else error, None, None
+
+    def replace(slot):
+        slot.kill()
+        _sweep_temporary(output_dir, slot.process.pid)
+        slots[slots.index(slot)] = _Slot(ctx, args)
+
+    try:
+        while True:
+            # Hand a file to every idle worker.
+            while not exhausted and (len(slots) < workers or any(slot.task is None for slot in slots)):
+                source = next(sources, None)
+                if source is None:
+                    exhausted = True
+                    break
+                slot = next((slot for slot in slots if slot.task is None), None)
+                if slot is None:
+                    slot = _Slot(ctx, args)
+                    slots.append(slot)
+                if not slot.submit(*source):
+                    result = fail(slot, slot.death_reason(), "receive")
+                    replace(slot)
+                    yield result
+            busy = [slot for slot in slots if slot.task is not None]
+            if not busy:
+                return
+            wait_s = None
+            if timeout:
+                now = time.monotonic()
+                wait_s = max(0.0, min(slot.started + slot.extended + timeout - now for slot in busy))
+            ready = multiprocessing.connection.wait([slot.conn for slot in busy], wait_s)
+            for slot in busy:
+                if slot.conn in ready:
+                    try:
+                        name, path, error, result_stats, stage, converted = slot.conn.recv()
+                    except (EOFError, OSError):
+                        # The worker died (e.g. killed by the OS for memory).
+                        result = fail(slot, slot.death_reason(), slot.stage.value.decode())
+                        replace(slot)
+                        yield result
+                        continue
+                    if error:
+                        result = fail(slot, error, stage)
+                    else:
+                        result = (name, path, None, result_stats, converted)
+                    slot.task = None
+                    yield result
+                elif timeout and time.monotonic() - slot.started - slot.extended >= timeout:
+                    stage = slot.stage.value.decode()
+                    if stage.startswith("stats") and not slot.extended:
+                        # The output is already written: the statistics get a budget of their own.
+                        slot.extended = time.monotonic() - slot.started
+                        continue
+                    result = fail(slot, f"Timeout: over {timeout:g} s", stage)
+                    if stage.startswith("stats"):
+                        # Only the statistics are lost; the file itself was converted.
+                        path = output.output_path(
+                            os.path.join(output_dir, registry.output_filename(domain, slot.task)), compression)
+                        result = (slot.task, path, None, None, None)
+                    replace(slot)
+                    yield result
+    finally:
+        for slot in slots:
+            slot.close()
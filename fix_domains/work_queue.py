@@ -0,0 +1,464 @@
+#!/usr/bin/env python3
+"""
+Distributed batch conversion through a work queue on a shared filesystem.
+
+Workers on any number of machines only need to see the same directory (NFS
+or similar); there is no broker. Everything is coordinated with operations
+that are atomic on such filesystems: exclusive file creation, rename and
+hard links.
+
+Queue directory layout:
+    tasks/<id>.json     one task per input: domain, input path, output path, format
+    leases/<id>.lease   claim of a task by a worker (published with link(), so
+                        only one claim can exist); holds the worker and a token
+                        unique to the claim, and its mtime is refreshed by a
+                        heartbeat while the task runs
+    done/<id>.json      completion record (published with link(), so a task
+                        can only ever be completed once); includes the output's sha256
+    failed/<id>.json    error record of a task whose conversion raised
+    duplicates/         completions that lost the race, e.g. after a lease was
+                        wrongly considered stale; kept for the report
+
+A lease whose mtime is older than --lease_seconds belongs to a dead or stuck
+worker. Any worker may break it: the lease is renamed away (only one rename
+can succeed) and the task is claimed again. A worker only refreshes or
+removes a lease that still holds its own token, so a worker whose lease was
+taken over cannot delete the new owner's lease. Leftover renamed leases are
+swept once they are older than --lease_seconds. Outputs are written to a
+temporary file and renamed into place, so readers never see partial files.
+
+Usage (paths must be visible under the same names on every node):
+    python -m fix_domains.work_queue init /shared/queue tpp /shared/tpp_pddl --output_dir /shared/tpp_json
+    python -m fix_domains.work_queue work /shared/queue          # on every node, as often as wanted
+    python -m fix_domains.work_queue report /shared/queue
+"""
+import os
+import sys
+import gzip
+import json
+import time
+import socket
+import hashlib
+import argparse
+import tempfile
+import threading
+import uuid
+
+from fix_domains import api
+from fix_domains import registry
+from fix_domains import archives
+from fix_domains import output
+
+DEFAULT_LEASE_SECONDS = 120
+DEFAULT_POLL_SECONDS = 2
+
+SUBDIRS = ("tasks", "leases", "done", "failed", "duplicates")
+
+def _path(queue_dir, kind, task_id):
+    suffix = ".lease" if kind == "leases" else ".json"
+    return os.path.join(queue_dir, kind, task_id + suffix)
+
+def _write_atomic(path, data):
+    """Writes bytes to path through a temporary file in the same directory and a rename."""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        output.set_default_mode(tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+def _publish_once(path, record):
+    """Creates path with the JSON record unless it already exists. Returns True if this call created it."""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(record, f, indent=4)
+        os.link(tmp_path, path)
+        return True
+    except FileExistsError:
+        return False
+    finally:
+        os.unlink(tmp_path)
+
+def _read_json(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+def default_worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+def _read_tasks(queue_dir):
+    """Tasks of a queue by id (none if the queue does not exist yet)."""
+    tasks_dir = os.path.join(queue_dir, "tasks")
+    if not os.path.isdir(tasks_dir):
+        return {}
+    tasks = {}
+    for entry in os.listdir(tasks_dir):
+        if entry.endswith(".json"):
+            task = _read_json(os.path.join(tasks_dir, entry))
+            tasks[task["id"]] = task
+    return tasks
+
+def init_queue(queue_dir, domain, inputs, output_dir, compact=False, compression="none"):
+    """
+    Creates the queue directory and one task per .pddl(.gz) input (domain files
+    in directories are skipped). Returns the number of new tasks. Raises
+    ValueError, before creating anything, if two inputs would be written to the
+    same output file.
+    """
+    if domain not in registry.DOMAINS:
+        raise ValueError(f"Unknown domain '{domain}'. Known domains: {', '.join(sorted(registry.DOMAINS))}")
+    output.check_compression(compression)
+    output_dir = os.path.abspath(output_dir)
+    files = []
+    for path in inputs:
+        if os.path.isdir(path):
+            files.extend(os.path.join(path, f) for f in os.listdir(path) if archives.is_problem_member(f))
+        else:
+            files.append(path)
+    tasks = []
+    # Outputs of tasks already queued count too; re-queueing the same input is not a collision.
+    outputs = {task["output"]: task["input"] for task in _read_tasks(queue_dir).values()}
+    for path in sorted(files, key=registry.natural_key):
+        path = os.path.abspath(path)
+        name = archives.member_name(path)
+        # Stable, readable id; the hash keeps equal file names from different directories apart.
+        task_id = f"{domain}-{os.path.splitext(name)[0]}-{hashlib.sha1(path.encode()).hexdigest()[:10]}"
+        task = {
+            "id": task_id,
+            "domain": domain,
+            "input": path,
+            "output": output.output_path(os.path.join(output_dir, registry.output_filename(domain, name)), compression),
+            "compact": compact,
+            "compression": compression
+        }
+        if outputs.get(task["output"], path) != path:
+            raise ValueError(f"{path} and {outputs[task['output']]} would both be written to {task['output']}; "
+                             f"queue them with separate output directories")
+        outputs[task["output"]] = path
+        tasks.append(task)
+    for sub in SUBDIRS:
+        os.makedirs(os.path.join(queue_dir, sub), exist_ok=True)
+    os.makedirs(output_dir, exist_ok=True)
+    created = 0
+    for task in tasks:
+        if _publish_once(_path(queue_dir, "tasks", task["id"]), task):
+            created += 1
+    return created
+
+def _remove(path):
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+def _restore(renamed_path, lease_path):
+    """Puts back a lease renamed away by mistake, unless a new lease already took its place."""
+    try:
+        os.link(renamed_path, lease_path)
+    except (FileExistsError, FileNotFoundError):
+        pass
+    _remove(renamed_path)
+
+def _lease_token(path):
+    """The token of the lease at path, or None if there is none."""
+    record = _read_json(path)
+    return record.get("token") if isinstance(record, dict) else None
+
+class _Heartbeat:
+    """Refreshes a lease's mtime in the background while a task runs, as long as the lease is ours."""
+
+    def __init__(self, lease_path, token, interval):
+        self._lease_path = lease_path
+        self._token = token
+        self._interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self._interval):
+            if _lease_token(self._lease_path) != self._token:
+                # Taken over by another worker: its lease is not ours to refresh.
+                return
+            try:
+                os.utime(self._lease_path, None)
+            except FileNotFoundError:
+                return
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+class Worker:
+    def __init__(self, queue_dir, worker_id=None, lease_seconds=DEFAULT_LEASE_SECONDS, poll_seconds=DEFAULT_POLL_SECONDS):
+        self.queue_dir = queue_dir
+        self.worker_id = worker_id or default_worker_id()
+        self.lease_seconds = lease_seconds
+        self.poll_seconds = poll_seconds
+        self.completed = 0
+        self.failed = 0
+        self.recovered = 0
+
+    def _finished(self, task_id):
+        return (os.path.exists(_path(self.queue_dir, "done", task_id))
+                or os.path.exists(_path(self.queue_dir, "failed", task_id)))
+
+    def _lease_is_stale(self, lease_path):
+        try:
+            return time.time() - os.stat(lease_path).st_mtime > self.lease_seconds
+        except FileNotFoundError:
+            return False
+
+    def _claim(self, task_id):
+        """
+        Tries to take the lease of a task, breaking it if stale. Returns the
+        token of the new lease, or None if the task is held by another worker.
+        """
+        lease_path = _path(self.queue_dir, "leases", task_id)
+        for _ in range(2):
+            token = uuid.uuid4().hex
+            if not _publish_once(lease_path, {"worker": self.worker_id, "token": token, "claimed_at": time.time()}):
+                if not self._lease_is_stale(lease_path):
+                    return None
+                # Rename the stale lease away; of several workers doing this, only one succeeds.
+                stale_path = f"{lease_path}.stale.{token}"
+                try:
+                    os.rename(lease_path, stale_path)
+                except FileNotFoundError:
+                    continue
+                if not self._lease_is_stale(stale_path):
+                    # Another worker recovered it first and what was renamed is its fresh lease: put it back.
+                    _restore(stale_path, lease_path)
+                    return None
+                _remove(stale_path)
+                self.recovered += 1
+                continue
+            return token
+        return None
+
+    def _release(self, task_id, token):
+        """Removes the lease of a task if it is still ours; a lease taken over by another worker is left alone."""
+        lease_path = _path(self.queue_dir, "leases", task_id)
+        if _lease_token(lease_path) != token:
+            return
+        # Rename it to a private name first, so a takeover in between is noticed rather than deleted.
+        private_path = f"{lease_path}.release.{token}"
+        try:
+            os.rename(lease_path, private_path)
+        except FileNotFoundError:
+            return
+        if _lease_token(private_path) != token:
+            _restore(private_path, lease_path)
+        else:
+            _remove(private_path)
+
+    def _sweep(self):
+        """
+        Removes renamed leases and temporary files left behind by workers that
+        died while claiming, breaking or releasing a lease. A rename updates a
+        file's ctime, so only files renamed more than --lease_seconds ago go.
+        """
+        leases_dir = os.path.join(self.queue_dir, "leases")
+        now = time.time()
+        for entry in os.listdir(leases_dir):
+            if ".lease." not in entry and not entry.startswith(".tmp-"):
+                continue
+            path = os.path.join(leases_dir, entry)
+            try:
+                if now - os.stat(path).st_ctime > self.lease_seconds:
+                    _remove(path)
+            except FileNotFoundError:
+                pass
+
+    def _run_task(self, task):
+        start = time.perf_counter()
+        record = {"id": task["id"], "worker": self.worker_id}
+        try:
+            with open(task["input"], 'rb') as f:
+                data = f.read()
+            if task["input"].endswith(".gz"):
+                data = gzip.decompress(data)
+            problem = api.convert(task["domain"], data)
+            encoded = output.dumps_problem(problem, registry.DOMAINS[task["domain"]]["indent"],
+                                           task["compact"], task["compression"])
+            _write_atomic(task["output"], encoded)
+        except Exception as e:
+            record["error"] = f"{type(e).__name__}: {e}"
+            record["seconds"] = time.perf_counter() - start
+            _publish_once(_path(self.queue_dir, "failed", task["id"]), record)
+            self.failed += 1
+            return
+        record["output"] = task["output"]
+        record["sha256"] = hashlib.sha256(encoded).hexdigest()
+        record["seconds"] = time.perf_counter() - start
+        if _publish_once(_path(self.queue_dir, "done", task["id"]), record):
+            self.completed += 1
+        else:
+            _publish_once(os.path.join(self.queue_dir, "duplicates", f"{task['id']}.{time.time():.6f}.json"), record)
+
+    def run(self, wait=True):
+        """
+        Processes tasks until none is left. With wait=True the worker keeps
+        polling while other workers hold leases, so it can take over their
+        tasks if they die; otherwise it stops as soon as nothing is claimable.
+        """
+        tasks_dir = os.path.join(self.queue_dir, "tasks")
+        while True:
+            self._sweep()
+            pending = 0
+            progressed = False
+            for entry in sorted(os.listdir(tasks_dir)):
+                if not entry.endswith(".json"):
+                    continue
+                task_id = entry[:-5]
+                if self._finished(task_id):
+                    continue
+                pending += 1
+                token = self._claim(task_id)
+                if token is None:
+                    continue
+                try:
+                    # Another worker may have finished the task between the check and the claim.
+                    if not self._finished(task_id):
+                        task = _read_json(_path(self.queue_dir, "tasks", task_id))
+                        with _Heartbeat(_path(self.queue_dir, "leases", task_id), token,
+                                        max(self.lease_seconds / 4, 0.05)):
+                            self._run_task(task)
+                        progressed = True
+                finally:
+                    self._release(task_id, token)
+            if pending == 0 or (not wait and not progressed):
+                return
+            if not progressed:
+                time.sleep(self.poll_seconds)
+
+def report(queue_dir, lease_seconds=DEFAULT_LEASE_SECONDS):
+    """
+    Consistency report of a queue: task counts per state plus problems found:
+    tasks sharing an output file, outputs that are missing or whose hash
+    differs from the done record, tasks both done and failed, duplicate
+    completions and stale leases.
+    """
+    tasks = _read_tasks(queue_dir)
+    done = {e[:-5] for e in os.listdir(os.path.join(queue_dir, "done")) if e.endswith(".json")}
+    failed = {e[:-5] for e in os.listdir(os.path.join(queue_dir, "failed")) if e.endswith(".json")}
+    now = time.time()
+    live_leases = []
+    stale_leases = []
+    for entry in os.listdir(os.path.join(queue_dir, "leases")):
+        if not entry.endswith(".lease"):
+            continue
+        try:
+            age = now - os.stat(os.path.join(queue_dir, "leases", entry)).st_mtime
+        except FileNotFoundError:
+            continue
+        (stale_leases if age > lease_seconds else live_leases).append(entry[:-6])
+
+    problems = []
+    writers = {}
+    for task_id in sorted(tasks):
+        writers.setdefault(tasks[task_id]["output"], []).append(task_id)
+    for path, task_ids in sorted(writers.items()):
+        if len(task_ids) > 1:
+            problems.append(f"{', '.join(task_ids)}: all write {path}")
+    for task_id in sorted(done):
+        record = _read_json(_path(queue_dir, "done", task_id))
+        if task_id not in tasks:
+            problems.append(f"{task_id}: done record without a task")
+            continue
+        try:
+            with open(record["output"], 'rb') as f:
+                digest = hashlib.sha256(f.read()).hexdigest()
+        except FileNotFoundError:
+            problems.append(f"{task_id}: output {record['output']} is missing")
+            continue
+        if digest != record["sha256"]:
+            problems.append(f"{task_id}: output {record['output']} does not match the recorded hash")
+    for task_id in sorted(done & failed):
+        problems.append(f"{task_id}: both done and failed")
+    duplicates = [e for e in os.listdir(os.path.join(queue_dir, "duplicates")) if e.endswith(".json")]
+    for entry in sorted(duplicates):
+        problems.append(f"{entry}: duplicate completion")
+    for task_id in sorted(stale_leases):
+        problems.append(f"{task_id}: stale lease")
+
+    pending = set(tasks) - done - failed
+    return {
+        "tasks": len(tasks),
+        "done": len(done & set(tasks)),
+        "failed": len(failed & set(tasks)),
+        "running": len(pending & set(live_leases)),
+        "pending": len(pending - set(live_leases)),
+        "failures": {task_id: _read_json(_path(queue_dir, "failed", task_id))["error"] for task_id in sorted(failed)},
+        "problems": problems,
+        "consistent": not problems and not pending
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Distributed PDDL to JSON conversion through a shared-directory work queue")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    init_parser = sub.add_parser("init", help="Create the queue and its tasks")
+    init_parser.add_argument("queue_dir")
+    init_parser.add_argument("domain", choices=sorted(registry.DOMAINS))
+    init_parser.add_argument("inputs", nargs="+", help="Directories or .pddl(.gz) files")
+    init_parser.add_argument("--output_dir", required=True, help="Shared directory for the outputs")
+    init_parser.add_argument("--compact", action="store_true", help="Write minified JSON instead of indented")
+    init_parser.add_argument("--compress", choices=output.COMPRESSIONS, default="none", help="Compress each output file")
+
+    work_parser = sub.add_parser("work", help="Process tasks until the queue is drained")
+    work_parser.add_argument("queue_dir")
+    work_parser.add_argument("--worker_id", help="Name of this worker (default: host:pid)")
+    work_parser.add_argument("--lease_seconds", type=float, default=DEFAULT_LEASE_SECONDS,
+                             help="Leases not refreshed for this long are considered stale")
+    work_parser.add_argument("--poll_seconds", type=float, default=DEFAULT_POLL_SECONDS,
+                             help="Wait between scans while other workers hold the remaining tasks")
+    work_parser.add_argument("--no_wait", action="store_true",
+                             help="Exit when nothing is claimable instead of waiting on other workers' leases")
+
+    report_parser = sub.add_parser("report", help="Print the consistency report")
+    report_parser.add_argument("queue_dir")
+    report_parser.add_argument("--lease_seconds", type=float, default=DEFAULT_LEASE_SECONDS)
+    report_parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+
+    args = parser.parse_args()
+    if args.command == "init":
+        try:
+            count = init_queue(args.queue_dir, args.domain, args.inputs, args.output_dir, args.compact, args.compress)
+        except ValueError as e:
+            parser.error(str(e))
+        print(f"Queued {count} tasks in {args.queue_dir}")
+    elif args.command == "work":
+        worker = Worker(args.queue_dir, args.worker_id, args.lease_seconds, args.poll_seconds)
+        worker.run(wait=not args.no_wait)
+        print(f"{worker.worker_id}: {worker.completed} completed, {worker.failed} failed, "
+              f"{worker.recovered} stale leases recovered")
+    else:
+        result = report(args.queue_dir, args.lease_seconds)
+        if args.json:
+            print(json.dumps(result, indent=4))
+        else:
+            print(f"{result['tasks']} tasks: {result['done']} done, {result['failed']} failed, "
+                  f"{result['running']} running, {result['pending']} pending")
+            for task_id, error in result["failures"].items():
+                print(f"  failed {task_id}: {error}")
+            for problem in result["problems"]:
+                print(f"  {problem}")
+            print("Consistent" if result["consistent"] else "NOT consistent")
+        sys.exit(0 if result["consistent"] else 1)
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,7 @@
+import os
 import re
 import json
+import argparse
 
 def extract_time_objects(pddl_string):
     """
@@ -59,33 +61,93 @@ def pddl_to_json(pddl_string):
         if value is not None:
             demands[idx] = value
 
-    return {
+    result = {
         "funds": funds,
         "goal_funds": goal_funds,
         "capacity": capacity,
         "time_end": time_end,
         "demands": demands
     }
+    result.update(precompute_bounds(demands, time_end, capacity, funds))
+    return result
 
-def main():
-    # Set the path to your PDDL file. Use a raw string to handle Windows paths.
-    pddl_file_path = "problems\pfile20.pddl"
-    output_json_path = "Problem20.json"
-    
-    try:
-        with open(pddl_file_path, "r", encoding="utf-8") as f:
-            pddl_content = f.read()
-    except FileNotFoundError:
-        print("Error: PDDL file not found. Please check the file path.")
-        return
+def precompute_bounds(demands, time_end, capacity, funds):
+    """
+    Builds the time-indexed tables the planner uses to bound remaining profit.
+
+      - "demand": dense array of length time_end (missing time points are 0).
+      - "demand_prefix": prefix sums, demand_prefix[t] = sum(demand[:t]), length time_end + 1.
+      - "revenue_prefix": the same prefix sums scaled by stored_capacity. At most
+        stored_capacity units can be generated in one time step, so
+        revenue_prefix[time_end] - revenue_prefix[t] is an upper bound on the
+        revenue still obtainable from time t onwards.
+      - "revenue_suffix_max": revenue_suffix_max[t] = stored_capacity * max(demand[t:]),
+        the best price a full reservoir can be sold at from time t (0 at time_end).
+      - "max_reachable_funds": funds plus the total revenue bound; if it is below
+        goal_funds the problem is unsolvable.
+
+    Pumping costs are ignored, so every bound is optimistic and safe for pruning:
+    a branch at time t with funds f can be cut when
+    f + revenue_prefix[time_end] - revenue_prefix[t] < goal_funds.
+    """
+    capacity = capacity or 0
+    demand = [0] * time_end
+    for idx, value in demands.items():
+        demand[idx] = value
+
+    demand_prefix = [0] * (time_end + 1)
+    for t in range(time_end):
+        demand_prefix[t + 1] = demand_prefix[t] + demand[t]
+    revenue_prefix = [capacity * total for total in demand_prefix]
+
+    revenue_suffix_max = [0] * (time_end + 1)
+    for t in range(time_end - 1, -1, -1):
+        revenue_suffix_max[t] = max(revenue_suffix_max[t + 1], capacity * demand[t])
+
+    max_reachable_funds = None
+    if funds is not None:
+        max_reachable_funds = funds + revenue_prefix[time_end]
+
+    return {
+        "demand": demand,
+        "demand_prefix": demand_prefix,
+        "revenue_prefix": revenue_prefix,
+        "revenue_suffix_max": revenue_suffix_max,
+        "max_reachable_funds": max_reachable_funds
+    }
 
+def convert_file(input_filepath, output_filepath):
+    with open(input_filepath, "r", encoding="utf-8") as infile:
+        pddl_content = infile.read()
     result = pddl_to_json(pddl_content)
- 
-    
-    with open(output_json_path, "w", encoding="utf-8") as f:
-        json.dump(result, f, indent=2)
-    
-    
+    with open(output_filepath, "w", encoding="utf-8") as outfile:
+        json.dump(result, outfile, indent=2)
+    print(f"Converted {input_filepath} to {output_filepath}")
+
+def output_filename(pddl_filename):
+    """
+    pfile20.pddl -> Problem20.json, matching the existing problems_json layout.
+    The number is the first one in the name (the whole stem if there is none),
+    as in fix_domains.registry.output_filename.
+    """
+    stem = os.path.splitext(pddl_filename)[0]
+    m = re.search(r'\d+', stem)
+    return "Problem" + (m.group(0) if m else stem) + ".json"
+
+def convert_directory(input_dir, output_dir):
+    os.makedirs(output_dir, exist_ok=True)
+    for filename in os.listdir(input_dir):
+        if filename.endswith(".pddl"):
+            input_filepath = os.path.join(input_dir, filename)
+            output_filepath = os.path.join(output_dir, output_filename(filename))
+            convert_file(input_filepath, output_filepath)
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert hydropower PDDL problems to JSON")
+    parser.add_argument("--input_dir", default="problems_pddl", help="Directory containing the PDDL files")
+    parser.add_argument("--output_dir", default="problems_json", help="Directory to store the JSON files")
+    args = parser.parse_args()
+    convert_directory(args.input_dir, args.output_dir)
 
 if __name__ == "__main__":
     main()
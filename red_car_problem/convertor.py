@@ -89,6 +89,9 @@ def partition_vehicles(vehicles):
 def parse_pddl_file(filepath):
     with open(filepath, 'r') as f:
         content = f.read()
+    return parse_pddl(content)
+
+def parse_pddl(content):
     content_clean = remove_comments(content)
     
     # Compute grid dimensions from all cubes in the file.
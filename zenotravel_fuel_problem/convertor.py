@@ -207,6 +207,10 @@ def convert_pddl_to_json(pddl_file_path):
     """
     with open(pddl_file_path, "r") as f:
         pddl_raw = f.read()
+    return convert_pddl_text_to_json(pddl_raw)
+
+def convert_pddl_text_to_json(pddl_raw):
+    """Same as convert_pddl_to_json, but takes the PDDL text instead of a file path."""
     pddl = remove_comments(pddl_raw)
     aircraft, persons, cities = parse_objects(pddl)
     aircraft_info, persons_info, distances, total_fuel_used = parse_init(pddl, aircraft, persons, cities)